@@ -0,0 +1,143 @@
+#!/usr/bin/env python3
+"""
+Benchmark: output tokens and latency of the full (v2) vs compact (v3) response schema
+
+Offline (default), reference analyses are encoded in both wire formats and
+their completion tokens counted; latency is estimated from a per-token decode
+time. References are the sample scenarios analyzed from a recorded cassette
+(--cassette, e.g. made with ``--live`` and LLM_CASSETTE_MODE=record), or
+stored analysis JSON files given with --analyses. Without either, only the
+demo analysis is measured: it does not depend on the conversation, so it
+gives one row for the format, not one per scenario. With --live, each sample
+scenario is analyzed through the API under both prompt versions and the
+reported completion tokens and latency are compared.
+
+    PYTHONPATH=src python3 benchmarks/output_schema.py
+    PYTHONPATH=src python3 benchmarks/output_schema.py --cassette scenarios.jsonl.gz
+    PYTHONPATH=src python3 benchmarks/output_schema.py --analyses out/
+    PYTHONPATH=src python3 benchmarks/output_schema.py --live --repeat 3
+"""
+
+import argparse
+import ast
+import glob
+import json
+import os
+import re
+import statistics
+import sys
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'src'))
+
+from ai_decision_assistant.core.cassette import REPLAY, CassetteClient
+from ai_decision_assistant.core.decision_analyzer import DecisionAnalyzer
+from ai_decision_assistant.core.models import DecisionAnalysis
+from ai_decision_assistant.core.prompts import to_wire
+from ai_decision_assistant.utils.exceptions import AIDecisionAssistantError
+
+SCENARIOS_PATH = os.path.join(os.path.dirname(__file__), '..', 'src', 'ai_decision_assistant', 'data',
+                              'sample_scenarios.py')
+_PIECE = re.compile(r"[A-Za-z]+|\d+|\S")
+
+
+def load_scenarios():
+    """(title, conversation) pairs from the sample scenarios module"""
+    with open(SCENARIOS_PATH, 'r', encoding='utf-8') as f:
+        source = f.read()
+    titles = [t.strip() for t in re.findall(r"^## (.*)$", source, re.MULTILINE)]
+    texts = [node.value.value.strip() for node in ast.parse(source).body
+             if isinstance(node, ast.Expr) and isinstance(node.value, ast.Constant)]
+    return list(zip(titles, texts))
+
+
+def token_counter(model: str):
+    """tiktoken when installed, otherwise an estimate of ~4 characters per token within words"""
+    try:
+        import tiktoken
+        encoding = tiktoken.encoding_for_model(model)
+        return (lambda text: len(encoding.encode(text))), "tiktoken"
+    except (ImportError, KeyError):
+        return (lambda text: sum(-(-len(piece) // 4) for piece in _PIECE.findall(text))), "estimated"
+
+
+def offline(args):
+    analyzer = DecisionAnalyzer(client=None)
+    count, method = token_counter(analyzer.model)
+    if args.analyses:
+        references = []
+        for path in sorted(glob.glob(os.path.join(args.analyses, '*.json'))):
+            with open(path, 'r', encoding='utf-8') as f:
+                references.append((os.path.basename(path), DecisionAnalysis.model_validate_json(f.read())))
+    elif args.cassette:
+        # The pipeline runs offline against the recorded responses, one real analysis per scenario
+        replay = DecisionAnalyzer(client=CassetteClient(args.cassette, REPLAY))
+        references = []
+        for title, text in load_scenarios():
+            try:
+                references.append((title, replay.analyze_conversation(text, raise_errors=True)))
+            except AIDecisionAssistantError as e:
+                print(f"skipped {title}: {e}")
+    else:
+        title, text = load_scenarios()[0]
+        references = [("demo analysis (same for every scenario)", analyzer._get_demo_analysis(text))]
+
+    print(f"Output tokens per analysis ({method}; latency at {args.ms_per_token:.0f} ms/token)\n")
+    print(f"{'analysis':<45} {'v2':>6} {'v3':>6} {'saved':>7} {'latency saved':>14}")
+    totals = [0, 0]
+    for name, analysis in references:
+        full = analysis.model_dump(mode='json', exclude={'metadata'})
+        for decision in full['decisions']:
+            decision.pop('canonical_id', None)
+        v2 = count(json.dumps(full, indent=args.indent))
+        v3 = count(json.dumps(to_wire(full), indent=args.indent))
+        totals[0] += v2
+        totals[1] += v3
+        print(f"{name[:45]:<45} {v2:>6} {v3:>6} {1 - v3 / v2:>7.1%} "
+              f"{(v2 - v3) * args.ms_per_token / 1000:>12.2f} s")
+    if references:
+        print(f"{'total':<45} {totals[0]:>6} {totals[1]:>6} {1 - totals[1] / totals[0]:>7.1%} "
+              f"{(totals[0] - totals[1]) * args.ms_per_token / 1000:>12.2f} s")
+
+
+def live(args):
+    # Repeats must each call the model, so nothing is reused from the near-duplicate index or view cache
+    analyzers = {version: DecisionAnalyzer(prompt_version=version, derive_high_stakes=False)
+                 for version in ('v2', 'v3')}
+    for analyzer in analyzers.values():
+        analyzer.near_duplicate_index = None
+    if any(analyzer.client is None for analyzer in analyzers.values()):
+        sys.exit("--live needs OPENAI_API_KEY (or a replay cassette via LLM_CASSETTE)")
+
+    print(f"Median of {args.repeat} run(s) per scenario\n")
+    print(f"{'scenario':<45} {'v2 tok':>7} {'v3 tok':>7} {'v2 s':>6} {'v3 s':>6} {'tokens saved':>13}")
+    for title, text in load_scenarios():
+        row = {}
+        for version, analyzer in analyzers.items():
+            runs = [analyzer.analyze_conversation(text, raise_errors=True).metadata for _ in range(args.repeat)]
+            if any(r.near_duplicate_of or r.derived_view or not r.completion_tokens for r in runs):
+                sys.exit(f"{title}: a {version} run was served without a model call; timings would be meaningless")
+            row[version] = (statistics.median(r.completion_tokens for r in runs),
+                            statistics.median(r.latency_seconds for r in runs))
+        (t2, s2), (t3, s3) = row['v2'], row['v3']
+        print(f"{title[:45]:<45} {t2:>7.0f} {t3:>7.0f} {s2:>6.2f} {s3:>6.2f} {1 - t3 / t2 if t2 else 0:>13.1%}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Compare output size of the v2 and v3 response schemas")
+    parser.add_argument('--live', action='store_true', help='Call the API for each scenario and prompt version')
+    parser.add_argument('--repeat', type=int, default=1, help='Runs per scenario and version with --live')
+    parser.add_argument('--analyses', type=str, metavar='DIR', help='Stored analysis JSON files to encode offline')
+    parser.add_argument('--cassette', type=str, metavar='FILE',
+                        help='Replay the sample scenarios from a recorded cassette and encode the analyses offline')
+    parser.add_argument('--indent', type=int, default=None, help='JSON indent assumed for model output offline')
+    parser.add_argument('--ms-per-token', type=float, default=30.0,
+                        help='Decode time per output token for offline latency estimates (default: 30)')
+    args = parser.parse_args()
+    if args.live:
+        live(args)
+    else:
+        offline(args)
+
+
+if __name__ == "__main__":
+    main()
@@ -4,18 +4,44 @@ Command-line interface for AI Decision Boundary Assistant
 """
 
 import argparse
+import json
 import sys
 import os
+import time
 from pathlib import Path
 
 # Add src to Python path
 sys.path.insert(0, os.path.join(os.path.dirname(__file__), 'src'))
 
-from ai_decision_assistant.core.decision_analyzer import DecisionAnalyzer
-from ai_decision_assistant.utils.helpers import format_confidence_score
+from ai_decision_assistant.utils.profiling import StageProfiler, stage
 
 
-def analyze_file(file_path: str, high_stakes: bool = False, output_file: str = None):
+def load_analyzer_class():
+    """Import the analysis stack lazily so --profile can attribute import cost"""
+    with stage("import"):
+        from ai_decision_assistant.core.decision_analyzer import DecisionAnalyzer
+    return DecisionAnalyzer
+
+
+def open_archive(archive_dir: str = None):
+    """The analysis archive in archive_dir, or None"""
+    if not archive_dir:
+        return None
+    with stage("import"):
+        from ai_decision_assistant.core.archive import AnalysisArchive
+    return AnalysisArchive(archive_dir)
+
+
+def print_token_reduction(result):
+    """One line on how much thread normalization shrank the prompt, if it ran"""
+    metadata = result.metadata
+    if metadata is not None and metadata.normalized_tokens_saved:
+        original = metadata.normalized_tokens + metadata.normalized_tokens_saved
+        print(f"   Prompt Tokens: ~{original} → ~{metadata.normalized_tokens} "
+              f"(-{metadata.normalized_tokens_saved / original:.0%} quoted history, signatures, disclaimers)")
+
+
+def analyze_file(file_path: str, high_stakes: bool = False, output_file: str = None, archive_dir: str = None):
     """Analyze a conversation from a file"""
     
     if not os.path.exists(file_path):
@@ -23,13 +49,14 @@ def analyze_file(file_path: str, high_stakes: bool = False, output_file: str = N
         sys.exit(1)
     
     # Read conversation
-    with open(file_path, 'r', encoding='utf-8') as f:
-        conversation = f.read()
+    with stage("parse"):
+        with open(file_path, 'r', encoding='utf-8') as f:
+            conversation = f.read()
     
     # Analyze
     print(f"🔍 Analyzing conversation from '{file_path}'...")
-    analyzer = DecisionAnalyzer()
-    result = analyzer.analyze_conversation(conversation, high_stakes)
+    analyzer = load_analyzer_class()()
+    result = analyzer.analyze_conversation(conversation, high_stakes, caller="cli")
     
     # Display results
     print(f"\n📊 Analysis Results:")
@@ -38,14 +65,27 @@ def analyze_file(file_path: str, high_stakes: bool = False, output_file: str = N
     print(f"   Assumptions: {len(result.assumptions)}")
     print(f"   Open Questions: {len(result.open_questions)}")
     print(f"   Critical Decision: {result.human_must_decide}")
+    print_token_reduction(result)
+    
+    # Nothing is approved on the command line; report what the approval gate still requires
+    with stage("import"):
+        from ai_decision_assistant.core.policy import default_policy
+    report = default_policy().check(result, {})
+    print(f"   Approval Gate: {len(report.violations)} open item(s)")
     
     # Export if requested
     if output_file:
-        log_content = analyzer.generate_decision_log(result, {})
+        log_content = analyzer.generate_decision_log(result, {}) + "\n" + report.to_markdown()
         with open(output_file, 'w', encoding='utf-8') as f:
             f.write(log_content)
         print(f"📄 Decision log exported to '{output_file}'")
     
+    archive = open_archive(archive_dir)
+    if archive is not None:
+        archive.append(conversation, result, source=file_path)
+        archive.close()
+        print(f"🗄️  Analysis archived in '{archive_dir}'")
+    
     return result
 
 
@@ -53,8 +93,10 @@ def analyze_text(text: str, high_stakes: bool = False):
     """Analyze conversation text directly"""
     
     print("🔍 Analyzing provided text...")
-    analyzer = DecisionAnalyzer()
-    result = analyzer.analyze_conversation(text, high_stakes)
+    analyzer = load_analyzer_class()()
+    with stage("import"):
+        from ai_decision_assistant.utils.helpers import format_confidence_score
+    result = analyzer.analyze_conversation(text, high_stakes, caller="cli")
     
     # Display detailed results
     print(f"\n🎯 DECISIONS ({len(result.decisions)} found):")
@@ -72,6 +114,254 @@ def analyze_text(text: str, high_stakes: bool = False):
     return result
 
 
+def analyze_thread_stream(threads, high_stakes: bool = False, output_dir: str = None, archive_dir: str = None):
+    """Analyze ingested threads one by one, optionally writing JSON analyses, decision logs and an archive"""
+    
+    with stage("import"):
+        from ai_decision_assistant.ingest.base import analyze_threads
+        from ai_decision_assistant.core.policy import default_policy
+    
+    analyzer = load_analyzer_class()()
+    if output_dir:
+        os.makedirs(output_dir, exist_ok=True)
+    archive = open_archive(archive_dir)
+    
+    count = 0
+    for thread, result in analyze_threads(analyzer, threads, high_stakes):
+        count += 1
+        print(f"🧵 {thread.thread_id} ({thread.message_count} messages) {thread.subject[:60]}")
+        print(f"   Decisions: {len(result.decisions)}  Risks: {len(result.risks)}  "
+              f"Open Questions: {len(result.open_questions)}")
+        print_token_reduction(result)
+        if output_dir:
+            base = os.path.join(output_dir, thread.thread_id)
+            with open(f"{base}.json", 'w', encoding='utf-8') as f:
+                f.write(result.model_dump_json(indent=2))
+            with open(f"{base}.md", 'w', encoding='utf-8') as f:
+                f.write(analyzer.generate_decision_log(result, {}) + "\n"
+                        + default_policy().check(result, {}).to_markdown())
+        if archive is not None:
+            archive.append(thread.text, result, source=f"{thread.source}:{thread.thread_id}")
+    
+    print(f"\n📊 Analyzed {count} threads")
+    if output_dir:
+        print(f"📄 Analyses and decision logs written to '{output_dir}'")
+    if archive is not None:
+        archive.close()
+        print(f"🗄️  Analyses archived in '{archive_dir}'")
+    return count
+
+
+def analyze_mailbox(path: str, high_stakes: bool = False, output_dir: str = None, archive_dir: str = None):
+    """Analyze every thread in an mbox file, .eml file/directory or Maildir"""
+    
+    if not os.path.exists(path):
+        print(f"❌ Error: Mailbox '{path}' not found")
+        sys.exit(1)
+    
+    with stage("import"):
+        from ai_decision_assistant.ingest.email_threads import iter_email_threads
+    
+    print(f"📬 Reading threads from '{path}'...")
+    return analyze_thread_stream(iter_email_threads(path), high_stakes, output_dir, archive_dir)
+
+
+def analyze_slack_export(export_dir: str, high_stakes: bool = False, output_dir: str = None,
+                         window_gap_minutes: float = 30, archive_dir: str = None):
+    """Analyze every thread and chatter window in a Slack export directory"""
+    
+    if not os.path.isdir(export_dir):
+        print(f"❌ Error: Slack export directory '{export_dir}' not found")
+        sys.exit(1)
+    
+    with stage("import"):
+        from ai_decision_assistant.ingest.slack_export import iter_slack_threads
+    
+    print(f"💬 Reading conversations from Slack export '{export_dir}'...")
+    threads = iter_slack_threads(export_dir, window_gap_seconds=window_gap_minutes * 60)
+    return analyze_thread_stream(threads, high_stakes, output_dir, archive_dir)
+
+
+def run_service(host: str, port: int, max_concurrency: int, max_queue: int):
+    """Run the asynchronous HTTP analysis service until interrupted"""
+    
+    import asyncio
+    from ai_decision_assistant.service.http_server import serve
+    
+    analyzer = load_analyzer_class()()
+    asyncio.run(serve(analyzer, host, port, max_concurrency=max_concurrency, max_queue=max_queue))
+
+
+def enqueue_files(paths, queue_db: str, high_stakes: bool = False):
+    """Add conversation files (or directories of .txt files) to the durable job queue"""
+    
+    from ai_decision_assistant.service.job_queue import JobQueue
+    
+    files = []
+    for path in paths:
+        if os.path.isdir(path):
+            files.extend(sorted(str(p) for p in Path(path).glob("*.txt")))
+        elif os.path.exists(path):
+            files.append(path)
+        else:
+            print(f"⚠️  Skipping '{path}': not found")
+    
+    queue = JobQueue(queue_db)
+    created = 0
+    for file_path in files:
+        with open(file_path, 'r', encoding='utf-8') as f:
+            _, is_new = queue.enqueue(f.read(), high_stakes, source=file_path)
+        created += is_new
+    print(f"📥 Enqueued {created} new jobs ({len(files) - created} already queued) in '{queue_db}'")
+    print_queue_stats(queue_db)
+
+
+def print_usage_report(ledger_path: str, hours: float):
+    """Print calls, tokens and estimated cost per caller and per model"""
+    
+    if not os.path.exists(ledger_path):
+        print(f"❌ Error: usage ledger '{ledger_path}' not found (set LEDGER_PATH to start recording)")
+        sys.exit(1)
+    
+    from ai_decision_assistant.core.ledger import UsageLedger
+    
+    ledger = UsageLedger(ledger_path)
+    since = time.time() - hours * 3600
+    for group in ("caller", "model"):
+        rows = ledger.summary(since, group_by=group)
+        print(f"\n💰 Usage by {group} (last {hours:g} h):")
+        for row in rows:
+            print(f"   {row[group]:<40} {row['calls']:>6} calls  {row['prompt_tokens']:>10} in "
+                  f"({row['cached_tokens']} cached)  {row['completion_tokens']:>9} out  ${row['cost_usd']:.4f}")
+        if not rows:
+            print("   (no calls)")
+    print(f"\n   Total: ${ledger.spent(since):.4f}")
+
+
+def print_queue_stats(queue_db: str):
+    """Print queue depth, retry and throughput statistics"""
+    
+    from ai_decision_assistant.service.job_queue import JobQueue
+    
+    stats = JobQueue(queue_db).stats()
+    print(f"\n📊 Queue '{queue_db}':")
+    print(f"   Queued: {stats['queued']}  Leased: {stats['leased']}  "
+          f"Done: {stats['done']}  Failed: {stats['failed']}")
+    print(f"   Retries: {stats['retries']}")
+    print(f"   Throughput: {stats['throughput_per_minute']:.1f} jobs/min "
+          f"(avg {stats['avg_job_seconds']:.1f}s per job)")
+    return stats
+
+
+def run_queue_workers(queue_db: str, processes: int, exit_when_empty: bool = False):
+    """Start worker processes that drain the durable job queue"""
+    
+    from ai_decision_assistant.service.job_queue import run_workers
+    from config.settings import Config
+    
+    if not Config.has_valid_api_key() and not Config.LLM_CASSETTE:
+        print("❌ Error: queue workers need OPENAI_API_KEY or a replay cassette (LLM_CASSETTE); "
+              "demo analyses would be stored as results")
+        sys.exit(1)
+    
+    print(f"👷 Starting {processes} workers on '{queue_db}'...")
+    run_workers(queue_db, processes=processes, exit_when_empty=exit_when_empty)
+    print_queue_stats(queue_db)
+
+
+def compact_archive(archive_dir: str, retention_days: float = None):
+    """Keep the latest analysis per conversation (and drop expired ones) in an archive"""
+    
+    if not os.path.isdir(archive_dir):
+        print(f"❌ Error: Archive '{archive_dir}' not found")
+        sys.exit(1)
+    
+    archive = open_archive(archive_dir)
+    before = time.time() - retention_days * 86400 if retention_days else None
+    print(f"🗜️  Compacting archive '{archive_dir}'...")
+    stats = archive.compact(before)
+    archive.close()
+    print(f"   Kept: {stats['kept']}  Removed: {stats['removed']}  "
+          f"Reclaimed: {stats['reclaimed_bytes'] / 1e6:.1f} MB")
+    return stats
+
+
+def watch_directory(directory: str, high_stakes: bool = False, output_dir: str = None, archive_dir: str = None,
+                    debounce: float = 1.0, poll_interval: float = 1.0):
+    """Re-analyze conversation files as they change, printing decision changes to stdout as JSON lines"""
+    
+    if not os.path.isdir(directory):
+        print(f"❌ Error: Directory '{directory}' not found")
+        sys.exit(1)
+    
+    with stage("import"):
+        from ai_decision_assistant.core.near_duplicates import NearDuplicateIndex
+        from ai_decision_assistant.ingest.watch import DirectoryWatcher, WatchSession
+        from config.settings import Config
+    
+    # One warm analyzer for the session: exact repeats are reused and edited threads get their
+    # previous analysis as context, but any change is analyzed again so new confirmations are seen
+    analyzer = load_analyzer_class()(near_duplicate_index=NearDuplicateIndex(
+        max_entries=Config.NEAR_DUPLICATE_MAX_ENTRIES))
+    archive = open_archive(archive_dir)
+    session = WatchSession(analyzer, directory, output_dir, high_stakes, archive)
+    watcher = DirectoryWatcher(directory, debounce_seconds=debounce, poll_seconds=poll_interval)
+    
+    def emit(events):
+        for event in events:
+            print(json.dumps(event), flush=True)
+    
+    # Progress goes to stderr so stdout carries only change events
+    print(f"👀 Watching '{directory}' ({watcher.backend.name}); press Ctrl+C to stop", file=sys.stderr)
+    try:
+        emit(session.start())
+        for paths in watcher.changes():
+            for path in paths:
+                print(f"🔄 {os.path.basename(path)} changed", file=sys.stderr)
+                emit(session.process(path))
+    except KeyboardInterrupt:
+        print("\n👋 Stopped watching", file=sys.stderr)
+    finally:
+        watcher.close()
+        if archive is not None:
+            archive.close()
+
+
+def link_decisions_in_directory(directory: str, threshold: float = 0.8):
+    """Link equivalent decisions across a directory of JSON analyses and write canonical IDs back"""
+    
+    paths = sorted(Path(directory).glob("*.json"))
+    if not paths:
+        print(f"❌ Error: No JSON analyses found in '{directory}'")
+        sys.exit(1)
+    
+    with stage("import"):
+        from ai_decision_assistant.core.clustering import DecisionClusterer, link_decisions
+        from ai_decision_assistant.core.models import DecisionAnalysis
+    
+    print(f"🔗 Linking decisions across {len(paths)} analyses in '{directory}'...")
+    with stage("parse"):
+        analyses = {
+            str(path): DecisionAnalysis.model_validate_json(path.read_text(encoding='utf-8'))
+            for path in paths
+        }
+    
+    clusters = link_decisions(analyses.items(), DecisionClusterer(similarity_threshold=threshold))
+    
+    with stage("log_render"):
+        for path, analysis in analyses.items():
+            Path(path).write_text(analysis.model_dump_json(indent=2), encoding='utf-8')
+    
+    shared = {cid: members for cid, members in clusters.items() if len({key for key, _ in members}) > 1}
+    decision_count = sum(len(members) for members in clusters.values())
+    print(f"\n📊 Linking Results:")
+    print(f"   Decisions: {decision_count}")
+    print(f"   Canonical decisions: {len(clusters)}")
+    print(f"   Shared across threads: {len(shared)}")
+    
+    return clusters
+
+
 def main():
     """Main CLI entry point"""
     
@@ -85,6 +375,19 @@ Examples:
   %(prog)s --file conversation.txt         # Analyze file
   %(prog)s --file notes.txt --high-stakes # High-stakes analysis
   %(prog)s --file notes.txt --output log.md # Export decision log
+  %(prog)s --file notes.txt --profile      # Profile the analysis run
+  %(prog)s --file notes.txt --replay runs.jsonl.gz  # Re-run offline from a recorded cassette
+  %(prog)s --slack-export slack/ -o out/   # Analyze a Slack workspace export
+  %(prog)s --link-decisions analyses/      # Link equivalent decisions across analyses
+  %(prog)s --serve --port 8080             # Run the HTTP analysis service
+  %(prog)s --enqueue threads/              # Queue .txt conversations for backfill
+  %(prog)s --worker --workers 8            # Drain the queue with 8 processes
+  %(prog)s --queue-stats                   # Show queue depth and throughput
+  %(prog)s --usage-report --ledger usage.db  # Show token spend per caller and model
+  %(prog)s --mailbox export.mbox --archive audit/  # Archive every analysis for audits
+  %(prog)s --compact-archive audit/ --retention-days 2555  # Keep 7 years, latest per conversation
+  %(prog)s --mailbox export.mbox -o out/   # Analyze every thread in a mailbox
+  %(prog)s --watch threads/ -o out/        # Re-analyze changed files, decision changes as JSON lines
         """
     )
     
@@ -96,21 +399,123 @@ Examples:
                            help='Conversation text to analyze')
     input_group.add_argument('--file', type=str,
                            help='File containing conversation to analyze')
+    input_group.add_argument('--mailbox', type=str, metavar='PATH',
+                           help='mbox file, .eml file/directory or Maildir to analyze thread by thread')
+    input_group.add_argument('--slack-export', type=str, metavar='DIR',
+                           help='Slack workspace export directory to analyze thread by thread')
+    input_group.add_argument('--serve', action='store_true',
+                           help='Run the HTTP analysis service (/analyze, /analyze/batch, /healthz)')
+    input_group.add_argument('--enqueue', type=str, nargs='+', metavar='PATH',
+                           help='Add conversation files (or directories of .txt files) to the job queue')
+    input_group.add_argument('--worker', action='store_true',
+                           help='Start worker processes that analyze queued jobs')
+    input_group.add_argument('--queue-stats', action='store_true',
+                           help='Show job queue depth, retries and throughput')
+    input_group.add_argument('--usage-report', action='store_true',
+                           help='Show token usage and estimated cost per caller and model from the usage ledger')
+    input_group.add_argument('--compact-archive', type=str, metavar='DIR',
+                           help='Compact an analysis archive to the latest analysis per conversation')
+    input_group.add_argument('--watch', type=str, metavar='DIR',
+                           help='Watch a directory of conversation files and re-analyze the ones that change')
+    input_group.add_argument('--link-decisions', type=str, metavar='DIR',
+                           help='Assign canonical IDs to equivalent decisions in a directory of JSON analyses')
     
     # Analysis options
     parser.add_argument('--high-stakes', action='store_true',
                        help='Enable high-stakes mode for conservative analysis')
     parser.add_argument('--output', '-o', type=str,
-                       help='Export decision log to file')
+                       help='Export decision log to file (a directory for batch modes)')
+    parser.add_argument('--slack-window-gap', type=float, default=30,
+                       help='Minutes of silence that split top-level Slack chatter into separate conversations (default: 30)')
+    parser.add_argument('--link-threshold', type=float, default=0.8,
+                       help='Minimum similarity for --link-decisions to treat decisions as equivalent (default: 0.8)')
+    
+    # Watch options
+    parser.add_argument('--debounce', type=float, default=1.0,
+                       help='Seconds a file must stay unchanged before --watch analyzes it (default: 1.0)')
+    parser.add_argument('--poll-interval', type=float, default=1.0,
+                       help='Polling interval in seconds for --watch where inotify is unavailable (default: 1.0)')
+    
+    # Service options
+    parser.add_argument('--host', type=str, default='127.0.0.1',
+                       help='Address for --serve to bind (default: 127.0.0.1)')
+    parser.add_argument('--port', type=int, default=8080,
+                       help='Port for --serve (default: 8080)')
+    parser.add_argument('--max-concurrency', type=int, default=8,
+                       help='Analyses run concurrently by --serve (default: 8)')
+    parser.add_argument('--max-queue', type=int, default=64,
+                       help='Analyses --serve queues before answering 503 (default: 64)')
+    
+    # Job queue options
+    parser.add_argument('--queue-db', type=str, default='decision_jobs.db',
+                       help='SQLite job queue database (default: decision_jobs.db)')
+    parser.add_argument('--workers', type=int, default=4,
+                       help='Worker processes started by --worker (default: 4)')
+    parser.add_argument('--exit-when-empty', action='store_true',
+                       help='Stop --worker processes once the queue is drained')
+    
+    # Usage ledger options
+    parser.add_argument('--ledger', type=str, metavar='PATH',
+                       help='Usage ledger database (default: LEDGER_PATH)')
+    parser.add_argument('--usage-hours', type=float, default=24,
+                       help='Window covered by --usage-report in hours (default: 24)')
+    
+    # Archive options
+    parser.add_argument('--archive', type=str, metavar='DIR',
+                       help='Also append analyses to a compressed, indexed archive (--file, --mailbox, --slack-export, --watch)')
+    parser.add_argument('--retention-days', type=float,
+                       help='With --compact-archive, also drop analyses archived more than this many days ago')
+    
+    # Cassette options
+    cassette_group = parser.add_mutually_exclusive_group()
+    cassette_group.add_argument('--record', type=str, metavar='CASSETTE',
+                               help='Record model requests and responses to a cassette (.jsonl.gz)')
+    cassette_group.add_argument('--replay', type=str, metavar='CASSETTE',
+                               help='Serve model responses from a cassette instead of the API')
+    parser.add_argument('--replay-latency', action='store_true',
+                       help='Reproduce recorded latencies when replaying')
+    
+    # Profiling options
+    parser.add_argument('--profile', action='store_true',
+                       help='Profile the run and write pstats, collapsed stacks and a stage summary')
+    parser.add_argument('--profile-dir', type=str, default='profile_output',
+                       help='Directory for profiling output (default: profile_output)')
     
     args = parser.parse_args()
     
+    if args.profile and (args.gui or args.serve or args.watch):
+        parser.error("--profile cannot be combined with --gui, --serve or --watch")
+    
+    if args.replay and not os.path.exists(args.replay):
+        parser.error(f"cassette not found: {args.replay}")
+    if args.record or args.replay:
+        # Set before the analyzer (and Config) is imported; inherited by worker processes
+        os.environ['LLM_CASSETTE'] = args.record or args.replay
+        os.environ['LLM_CASSETTE_MODE'] = 'record' if args.record else 'replay'
+        os.environ['LLM_CASSETTE_LATENCY'] = 'true' if args.replay_latency else 'false'
+    
+    if args.ledger:
+        # Like the cassette, read by Config when the analyzer is imported
+        os.environ['LEDGER_PATH'] = args.ledger
+    if args.usage_report and not (args.ledger or os.getenv('LEDGER_PATH')):
+        parser.error("--usage-report needs --ledger or LEDGER_PATH")
+    if args.record:
+        from config.settings import Config
+        if not Config.has_valid_api_key():
+            parser.error("--record needs OPENAI_API_KEY; without it there are no model responses to record")
+    
+    if args.watch and args.output and os.path.realpath(args.output) == os.path.realpath(args.watch):
+        parser.error("--output for --watch must not be the watched directory")
+    
+    profiler = StageProfiler(args.profile_dir) if args.profile else None
+    if profiler:
+        profiler.start()
+    
     try:
         if args.gui:
             # Launch Streamlit GUI
             print("🚀 Launching AI Decision Boundary Assistant...")
             import streamlit.web.cli as stcli
-            import sys
             
             app_path = os.path.join(os.path.dirname(__file__), 'src', 'ai_decision_assistant', 'ui', 'app.py')
             sys.argv = ["streamlit", "run", app_path]
@@ -122,7 +527,46 @@ Examples:
             
         elif args.file:
             # Analyze file
-            analyze_file(args.file, args.high_stakes, args.output)
+            analyze_file(args.file, args.high_stakes, args.output, args.archive)
+            
+        elif args.mailbox:
+            # Analyze a mailbox thread by thread
+            analyze_mailbox(args.mailbox, args.high_stakes, args.output, args.archive)
+            
+        elif args.slack_export:
+            # Analyze a Slack export thread by thread
+            analyze_slack_export(args.slack_export, args.high_stakes, args.output, args.slack_window_gap,
+                                 args.archive)
+            
+        elif args.serve:
+            # Run the HTTP service
+            run_service(args.host, args.port, args.max_concurrency, args.max_queue)
+            
+        elif args.enqueue:
+            # Queue conversations for background analysis
+            enqueue_files(args.enqueue, args.queue_db, args.high_stakes)
+            
+        elif args.worker:
+            # Drain the job queue with worker processes
+            run_queue_workers(args.queue_db, args.workers, args.exit_when_empty)
+            
+        elif args.queue_stats:
+            print_queue_stats(args.queue_db)
+            
+        elif args.usage_report:
+            print_usage_report(args.ledger or os.getenv('LEDGER_PATH'), args.usage_hours)
+            
+        elif args.compact_archive:
+            compact_archive(args.compact_archive, args.retention_days)
+            
+        elif args.watch:
+            # Long-running: re-analyze files as they change
+            watch_directory(args.watch, args.high_stakes, args.output, args.archive, args.debounce,
+                            args.poll_interval)
+            
+        elif args.link_decisions:
+            # Batch-link decisions across stored analyses
+            link_decisions_in_directory(args.link_decisions, args.link_threshold)
             
     except KeyboardInterrupt:
         print("\n👋 Analysis interrupted by user")
@@ -132,6 +576,13 @@ Examples:
         import traceback
         traceback.print_exc()
         sys.exit(1)
+    finally:
+        if profiler:
+            profiler.stop()
+            paths = profiler.write()
+            print(f"\n{profiler.summary()}")
+            print(f"\n🔬 Profile written to '{args.profile_dir}' "
+                  f"(pstats: {paths.get('pstats')}, flamegraph input: {paths['collapsed']})")
 
 
 if __name__ == "__main__":
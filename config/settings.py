@@ -22,13 +22,80 @@ class Config:
     MAX_TOKENS: int = 4000
     CONFIDENCE_THRESHOLD_LOW: float = 0.5
     CONFIDENCE_THRESHOLD_HIGH: float = 0.8
+    # Approval gate: decisions below this confidence always need review (see ai_decision_assistant.core.policy)
+    CONFIDENCE_FLOOR: float = float(os.getenv('CONFIDENCE_FLOOR', '0.3'))
+    APPROVAL_POLICY_FILE: Optional[str] = os.getenv('APPROVAL_POLICY_FILE')
+    
+    # Reuse of prior analyses for near-duplicate conversations (see ai_decision_assistant.core.near_duplicates).
+    # Opt-in: the index is shared by everyone using the analyzer. Without a reuse threshold only exact copies
+    # are reused and near-duplicates are context for the model.
+    NEAR_DUPLICATE_INDEX: bool = os.getenv('NEAR_DUPLICATE_INDEX', 'false').lower() == 'true'
+    NEAR_DUPLICATE_THRESHOLD: float = float(os.getenv('NEAR_DUPLICATE_THRESHOLD', '0.7'))
+    NEAR_DUPLICATE_REUSE_THRESHOLD: Optional[float] = (float(os.environ['NEAR_DUPLICATE_REUSE_THRESHOLD'])
+                                                       if os.getenv('NEAR_DUPLICATE_REUSE_THRESHOLD') else None)
+    NEAR_DUPLICATE_MAX_ENTRIES: int = int(os.getenv('NEAR_DUPLICATE_MAX_ENTRIES', '1000'))
+    
+    # Request deadlines and hedging (see ai_decision_assistant.core.hedging)
+    REQUEST_DEADLINE_SECONDS: float = float(os.getenv('REQUEST_DEADLINE_SECONDS', '60'))
+    HEDGE_PERCENTILE: float = float(os.getenv('HEDGE_PERCENTILE', '0.95'))
+    HEDGE_FALLBACK_MODEL: Optional[str] = os.getenv('HEDGE_FALLBACK_MODEL')
+    
+    # Record/replay cassette for model calls (see ai_decision_assistant.core.cassette)
+    LLM_CASSETTE: Optional[str] = os.getenv('LLM_CASSETTE')
+    LLM_CASSETTE_MODE: str = os.getenv('LLM_CASSETTE_MODE', 'replay')
+    LLM_CASSETTE_LATENCY: bool = os.getenv('LLM_CASSETTE_LATENCY', 'false').lower() == 'true'
+    
+    # Usage ledger and spend budgets (see ai_decision_assistant.core.ledger); disabled without LEDGER_PATH
+    LEDGER_PATH: Optional[str] = os.getenv('LEDGER_PATH')
+    LEDGER_PRICES: Optional[str] = os.getenv('LEDGER_PRICES')
+    LEDGER_COMPLETION_ESTIMATE: int = int(os.getenv('LEDGER_COMPLETION_ESTIMATE', '800'))
+    BUDGET_GLOBAL_USD: Optional[float] = float(os.environ['BUDGET_GLOBAL_USD']) if os.getenv('BUDGET_GLOBAL_USD') else None
+    BUDGET_CALLERS: Optional[str] = os.getenv('BUDGET_CALLERS')
+    BUDGET_WINDOW_SECONDS: float = float(os.getenv('BUDGET_WINDOW_SECONDS', '86400'))
+    BUDGET_INTERACTIVE_RESERVE: float = float(os.getenv('BUDGET_INTERACTIVE_RESERVE', '0.2'))
+    BUDGET_DOWNGRADE_MODEL: Optional[str] = os.getenv('BUDGET_DOWNGRADE_MODEL')
+    BUDGET_MAX_WAIT_SECONDS: float = float(os.getenv('BUDGET_MAX_WAIT_SECONDS', '30'))
+    
+    # Self-consistency sampling (see ai_decision_assistant.core.consistency); disabled below 2 samples
+    CONSISTENCY_SAMPLES: int = int(os.getenv('CONSISTENCY_SAMPLES', '1'))
+    CONSISTENCY_TEMPERATURE: float = float(os.getenv('CONSISTENCY_TEMPERATURE', '0.7'))
+    CONSISTENCY_MIN_SAMPLES: int = int(os.getenv('CONSISTENCY_MIN_SAMPLES', '3'))
+    CONSISTENCY_AGREEMENT: float = float(os.getenv('CONSISTENCY_AGREEMENT', '0.5'))
+    CONSISTENCY_SIMILARITY: float = float(os.getenv('CONSISTENCY_SIMILARITY', '0.35'))
+    
+    # PII redaction before prompts are sent (see ai_decision_assistant.core.redaction)
+    REDACT_PII: bool = os.getenv('REDACT_PII', 'false').lower() == 'true'
+    REDACT_CATEGORIES: str = os.getenv('REDACT_CATEGORIES', 'EMAIL,IBAN,GOV_ID,PHONE,ACCOUNT,PERSON,CUSTOMER')
+    REDACT_IDENTIFIERS_FILE: Optional[str] = os.getenv('REDACT_IDENTIFIERS_FILE')
+    REDACT_PROCESSES: int = int(os.getenv('REDACT_PROCESSES', '0'))
+    
+    # Quoted history, signature and disclaimer removal (see ai_decision_assistant.core.normalization)
+    NORMALIZE_THREADS: bool = os.getenv('NORMALIZE_THREADS', 'false').lower() == 'true'
+    NORMALIZE_MIN_BLOCK_LINES: int = int(os.getenv('NORMALIZE_MIN_BLOCK_LINES', '3'))
+    
+    # Re-ask the model for items that fail validation instead of dropping them
+    FIELD_REPAIR_ENABLED: bool = os.getenv('FIELD_REPAIR_ENABLED', 'true').lower() == 'true'
+    
+    # Prompt template version (see ai_decision_assistant.core.prompts)
+    PROMPT_VERSION: str = os.getenv('PROMPT_VERSION', 'v2')
     
     # High Stakes Mode Adjustments
     HIGH_STAKES_CONFIDENCE_PENALTY: float = 0.2
+    # Derive the high-stakes view locally from one dual-view call (see ai_decision_assistant.core.views)
+    DERIVE_HIGH_STAKES_VIEW: bool = os.getenv('DERIVE_HIGH_STAKES_VIEW', 'false').lower() == 'true'
+    VIEW_CACHE_SIZE: int = int(os.getenv('VIEW_CACHE_SIZE', '64'))
     
     # UI Configuration
     STREAMLIT_PAGE_TITLE: str = "AI Decision Boundary Assistant"
     STREAMLIT_PAGE_ICON: str = "⚖️"
+    # Background analyses shared by all UI sessions, and how often the page polls them
+    UI_MAX_WORKERS: int = int(os.getenv('UI_MAX_WORKERS', '4'))
+    UI_POLL_SECONDS: float = float(os.getenv('UI_POLL_SECONDS', '1.0'))
+    # Server-side analysis history (see ai_decision_assistant.ui.history). HISTORY_MEMORY_MB is the UI's memory
+    # budget: the history gets all of it, or three quarters when the near-duplicate index is enabled
+    HISTORY_DIR: str = os.getenv('HISTORY_DIR', 'analysis_history')
+    HISTORY_MEMORY_MB: int = int(os.getenv('HISTORY_MEMORY_MB', '256'))
+    HISTORY_MAX_PER_USER: int = int(os.getenv('HISTORY_MAX_PER_USER', '50'))
     
     @classmethod
     def has_valid_api_key(cls) -> bool:
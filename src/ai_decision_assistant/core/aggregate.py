@@ -0,0 +1,64 @@
+"""Aggregated view over many analyzed conversations.
+
+Used to triage a batch of threads at once: every decision across the batch
+in one list, ordered so the riskiest and least certain come first, and one
+queue of the human-boundary calls each thread requires. A decision's risk is
+the highest severity among the risks identified in its thread.
+"""
+
+from dataclasses import dataclass
+from typing import Iterable, List, Optional, Tuple
+
+from ai_decision_assistant.core.models import Decision, DecisionAnalysis, DecisionStatus, RiskSeverity
+
+SEVERITY_RANK = {"high": 0, "medium": 1, "low": 2}
+NO_RISK_RANK = len(SEVERITY_RANK)
+
+
+@dataclass
+class AggregatedDecision:
+    source: str
+    index: int
+    decision: Decision
+    severity: Optional[str]
+
+
+@dataclass
+class BoundaryItem:
+    source: str
+    human_must_decide: str
+    why_human: str
+    severity: Optional[str]
+    open_decisions: int
+
+
+def thread_severity(analysis: DecisionAnalysis) -> Optional[str]:
+    """Highest risk severity in an analysis, or None without risks"""
+    severities = [RiskSeverity(risk.severity).value for risk in analysis.risks]
+    return min(severities, key=lambda s: SEVERITY_RANK.get(s, NO_RISK_RANK), default=None)
+
+
+def _rank(severity: Optional[str]) -> int:
+    return SEVERITY_RANK.get(severity, NO_RISK_RANK) if severity else NO_RISK_RANK
+
+
+def aggregate_decisions(results: Iterable[Tuple[str, DecisionAnalysis]]) -> List[AggregatedDecision]:
+    """All decisions, by thread risk severity (highest first), then confidence (lowest first)"""
+    decisions = []
+    for source, analysis in results:
+        severity = thread_severity(analysis)
+        decisions.extend(AggregatedDecision(source, i, decision, severity)
+                         for i, decision in enumerate(analysis.decisions))
+    decisions.sort(key=lambda item: (_rank(item.severity), item.decision.confidence))
+    return decisions
+
+
+def boundary_queue(results: Iterable[Tuple[str, DecisionAnalysis]]) -> List[BoundaryItem]:
+    """The human-boundary call of each thread, riskiest threads first"""
+    queue = [
+        BoundaryItem(source, analysis.human_must_decide, analysis.why_human, thread_severity(analysis),
+                     sum(1 for d in analysis.decisions if d.status != DecisionStatus.CONFIRMED))
+        for source, analysis in results
+    ]
+    queue.sort(key=lambda item: (_rank(item.severity), -item.open_decisions))
+    return queue
@@ -0,0 +1,317 @@
+"""Append-only binary archive of analyses for audits.
+
+An archive is a directory of numbered segment files. Each segment holds
+length-prefixed records: a fixed header (payload length, CRC32, conversation
+key, timestamp) followed by the analysis as compact JSON, zlib-compressed
+against a preset dictionary of the analysis field names so that small
+records still compress well. Segments roll over at ``segment_bytes``.
+
+Every segment has a sidecar ``.idx`` file of fixed-width entries (key,
+timestamp, offset, length), written after the record itself. Lookups by
+conversation key or time range memory-map the index files as NumPy arrays
+and read only the matching records from memory-mapped segments. Full scans
+stream segments sequentially. Appending the same key again supersedes the
+earlier record; ``compact`` rewrites the archive keeping only the latest
+record per key and optionally dropping records older than a cutoff.
+
+A record whose index entry is missing (a crash between the two writes) is
+re-indexed when the archive is opened, and a torn record at the end of a
+segment is truncated. One process should append at a time.
+"""
+
+import json
+import mmap
+import os
+import struct
+import threading
+import time
+import zlib
+from dataclasses import dataclass
+from typing import Any, Dict, Iterator, List, Optional, Tuple, Union
+
+import numpy as np
+
+from ai_decision_assistant.core.models import DecisionAnalysis
+from ai_decision_assistant.utils.helpers import conversation_hash
+
+SEGMENT_MAGIC = b"DAR\x01"
+# Payload length, CRC32 of the payload, conversation key (first 16 bytes of its SHA-256), timestamp
+RECORD_HEADER = struct.Struct("<II16sd")
+INDEX_DTYPE = np.dtype([("key", "S16"), ("ts", "<f8"), ("offset", "<u8"), ("length", "<u4")])
+
+# Preset zlib dictionary (format version 1 in SEGMENT_MAGIC; never change it in place)
+ZDICT = (
+    '"high","medium","low","proposed","confirmed","unclear","unknown",'
+    '{"source":"","analysis":{"decisions":[{"decision":"","status":"","evidence_quotes":["'
+    '"],"owner":"","deadline":"","confidence":0.'
+    '"assumptions":[{"assumption":"","risk_if_wrong":""}],'
+    '"risks":[{"risk":"","severity":"","mitigation":""}],"open_questions":["'
+    '"human_must_decide":"","why_human":"","scale_concerns":["'
+    '"metadata":{"prompt_version":"v2","model":"gpt-4","prompt_tokens":,"completion_tokens":,'
+    '"cached_tokens":,"latency_seconds":,"canonical_id":"","evidence_spans":[{"ref":"L","start":,"end":,"text":"'
+).encode("utf-8")
+
+
+def archive_key(conversation: str) -> bytes:
+    """Archive key of a conversation: the first 16 bytes of its conversation hash"""
+    return bytes.fromhex(conversation_hash(conversation))[:16]
+
+
+def _compress(payload: bytes, level: int) -> bytes:
+    compressor = zlib.compressobj(level, zdict=ZDICT)
+    return compressor.compress(payload) + compressor.flush()
+
+
+def _decompress(data: bytes) -> bytes:
+    decompressor = zlib.decompressobj(zdict=ZDICT)
+    return decompressor.decompress(data) + decompressor.flush()
+
+
+@dataclass
+class ArchiveRecord:
+    key: str
+    ts: float
+    source: str
+    analysis: Union[DecisionAnalysis, Dict[str, Any]]
+
+
+class _Segment:
+    """One segment file, its index sidecar and their lazily created memory maps"""
+
+    def __init__(self, directory: str, number: int):
+        self.number = number
+        self.path = os.path.join(directory, f"{number:08d}.seg")
+        self.index_path = os.path.join(directory, f"{number:08d}.idx")
+        self._data: Optional[mmap.mmap] = None
+        self._index: Optional[np.ndarray] = None
+
+    @property
+    def size(self) -> int:
+        return os.path.getsize(self.path)
+
+    def index(self) -> np.ndarray:
+        if self._index is None:
+            count = os.path.getsize(self.index_path) // INDEX_DTYPE.itemsize if os.path.exists(self.index_path) else 0
+            self._index = (np.memmap(self.index_path, dtype=INDEX_DTYPE, mode="r", shape=(count,))
+                           if count else np.empty(0, dtype=INDEX_DTYPE))
+        return self._index
+
+    def data(self) -> mmap.mmap:
+        if self._data is None:
+            with open(self.path, "rb") as f:
+                self._data = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        return self._data
+
+    def invalidate(self) -> None:
+        """Drop the maps after the files grew (or before they are deleted)"""
+        if self._data is not None:
+            self._data.close()
+        self._data, self._index = None, None
+
+    def read(self, offset: int, length: int) -> Tuple[bytes, float, Dict[str, Any]]:
+        view = self.data()
+        size, crc, key, ts = RECORD_HEADER.unpack_from(view, offset)
+        start = offset + RECORD_HEADER.size
+        payload = view[start:start + size]
+        if size + RECORD_HEADER.size != length or zlib.crc32(payload) != crc:
+            raise ValueError(f"Corrupt archive record at {self.path}:{offset}")
+        return key, ts, json.loads(_decompress(payload))
+
+
+class AnalysisArchive:
+    """Segmented, compressed, indexed store of analyses keyed by conversation.
+
+    Args:
+        directory: Where segment and index files live.
+        segment_bytes: Size after which a new segment is started.
+        compression_level: zlib level for record payloads.
+    """
+
+    def __init__(self, directory: str, segment_bytes: int = 64 * 1024 * 1024, compression_level: int = 6):
+        self.directory = directory
+        self.segment_bytes = segment_bytes
+        self.compression_level = compression_level
+        self._lock = threading.RLock()
+        os.makedirs(directory, exist_ok=True)
+        numbers = sorted(int(name[:-4]) for name in os.listdir(directory) if name.endswith(".seg"))
+        self._segments: List[_Segment] = [_Segment(directory, n) for n in numbers]
+        if self._segments:
+            self._recover(self._segments[-1])
+
+    # Writing
+
+    def _recover(self, segment: _Segment) -> None:
+        """Index records appended after the last index entry; truncate a torn tail record"""
+        if os.path.exists(segment.index_path):
+            with open(segment.index_path, "r+b") as f:
+                f.truncate(os.path.getsize(segment.index_path) // INDEX_DTYPE.itemsize * INDEX_DTYPE.itemsize)
+        entries = segment.index()
+        offset = int(entries["offset"][-1] + entries["length"][-1]) if len(entries) else len(SEGMENT_MAGIC)
+        segment.invalidate()
+        size = segment.size
+        missing = []
+        with open(segment.path, "rb") as f:
+            while offset + RECORD_HEADER.size <= size:
+                f.seek(offset)
+                length, crc, key, ts = RECORD_HEADER.unpack(f.read(RECORD_HEADER.size))
+                payload = f.read(length)
+                if len(payload) < length or zlib.crc32(payload) != crc:
+                    break
+                missing.append((key, ts, offset, RECORD_HEADER.size + length))
+                offset += RECORD_HEADER.size + length
+        if missing:
+            with open(segment.index_path, "ab") as f:
+                f.write(np.array(missing, dtype=INDEX_DTYPE).tobytes())
+        if offset < size:
+            with open(segment.path, "r+b") as f:
+                f.truncate(max(offset, len(SEGMENT_MAGIC)))
+        segment.invalidate()
+
+    def _new_segment(self) -> _Segment:
+        segment = _Segment(self.directory, self._segments[-1].number + 1 if self._segments else 1)
+        with open(segment.path, "wb") as f:
+            f.write(SEGMENT_MAGIC)
+        self._segments.append(segment)
+        return segment
+
+    def _active(self, record_size: int) -> _Segment:
+        segment = self._segments[-1] if self._segments else None
+        if segment is None or (segment.size + record_size > self.segment_bytes and segment.size > len(SEGMENT_MAGIC)):
+            segment = self._new_segment()
+        return segment
+
+    def _append_raw(self, key: bytes, ts: float, body: Dict[str, Any]) -> None:
+        payload = _compress(json.dumps(body, separators=(",", ":"), ensure_ascii=False).encode("utf-8"),
+                            self.compression_level)
+        record = RECORD_HEADER.pack(len(payload), zlib.crc32(payload), key, ts) + payload
+        with self._lock:
+            segment = self._active(len(record))
+            with open(segment.path, "ab") as f:
+                offset = f.tell()
+                f.write(record)
+            # The record is on disk before it is indexed, so a crash leaves it recoverable
+            entry = np.array([(key, ts, offset, len(record))], dtype=INDEX_DTYPE)
+            with open(segment.index_path, "ab") as f:
+                f.write(entry.tobytes())
+            segment.invalidate()
+
+    def append(self, conversation: str, analysis: DecisionAnalysis, source: str = "",
+               ts: Optional[float] = None) -> None:
+        """Archive an analysis of a conversation; supersedes earlier records of the same conversation"""
+        self._append_raw(archive_key(conversation), time.time() if ts is None else ts,
+                         {"source": source, "analysis": analysis.model_dump(mode="json", exclude_defaults=True)})
+
+    # Reading
+
+    @staticmethod
+    def _record(key: bytes, ts: float, body: Dict[str, Any], raw: bool) -> ArchiveRecord:
+        analysis = body["analysis"] if raw else DecisionAnalysis.model_validate(body["analysis"])
+        return ArchiveRecord(key.hex(), ts, body.get("source", ""), analysis)
+
+    def history(self, conversation: str, raw: bool = False) -> List[ArchiveRecord]:
+        """Every archived analysis of a conversation, oldest first"""
+        key = archive_key(conversation)
+        found = []
+        with self._lock:
+            for segment in self._segments:
+                entries = segment.index()
+                for i in np.flatnonzero(entries["key"] == key):
+                    found.append(self._record(*segment.read(int(entries["offset"][i]), int(entries["length"][i])), raw))
+        return found
+
+    def get(self, conversation: str, raw: bool = False) -> Optional[ArchiveRecord]:
+        """The latest archived analysis of a conversation, or None"""
+        key = archive_key(conversation)
+        with self._lock:
+            for segment in reversed(self._segments):
+                entries = segment.index()
+                matches = np.flatnonzero(entries["key"] == key)
+                if len(matches):
+                    last = matches[-1]
+                    return self._record(*segment.read(int(entries["offset"][last]), int(entries["length"][last])), raw)
+        return None
+
+    def scan(self, since: Optional[float] = None, until: Optional[float] = None,
+             raw: bool = False) -> Iterator[ArchiveRecord]:
+        """Stream records in archive order, optionally limited to a time range.
+
+        ``raw`` yields analyses as plain dicts, skipping model validation, for
+        scans that should run at disk speed.
+        """
+        with self._lock:
+            segments = list(self._segments)
+        for segment in segments:
+            entries = segment.index()
+            if not len(entries):
+                continue
+            mask = np.ones(len(entries), dtype=bool)
+            if since is not None:
+                mask &= entries["ts"] >= since
+            if until is not None:
+                mask &= entries["ts"] < until
+            selected = np.flatnonzero(mask)
+            if not len(selected):
+                continue
+            if len(selected) == len(entries):
+                yield from self._stream(segment, len(entries), raw)
+            else:
+                for i in selected:
+                    with self._lock:
+                        record = segment.read(int(entries["offset"][i]), int(entries["length"][i]))
+                    yield self._record(*record, raw)
+
+    def _stream(self, segment: _Segment, count: int, raw: bool) -> Iterator[ArchiveRecord]:
+        """Read a whole segment sequentially through large buffered reads"""
+        with open(segment.path, "rb", buffering=1 << 20) as f:
+            f.seek(len(SEGMENT_MAGIC))
+            for _ in range(count):
+                length, crc, key, ts = RECORD_HEADER.unpack(f.read(RECORD_HEADER.size))
+                payload = f.read(length)
+                if zlib.crc32(payload) != crc:
+                    raise ValueError(f"Corrupt archive record in {segment.path}")
+                yield self._record(key, ts, json.loads(_decompress(payload)), raw)
+
+    # Maintenance
+
+    def compact(self, before: Optional[float] = None) -> Dict[str, int]:
+        """Rewrite the archive keeping the latest record per conversation.
+
+        Records older than ``before`` are dropped as well. Returns the number
+        of records kept and removed and the bytes reclaimed.
+        """
+        with self._lock:
+            old = list(self._segments)
+            if not old:
+                return {"kept": 0, "removed": 0, "reclaimed_bytes": 0}
+            size_before = sum(segment.size for segment in old)
+            total = sum(len(segment.index()) for segment in old)
+            latest: Dict[bytes, Tuple[int, int]] = {}
+            for position, segment in enumerate(old):
+                for i, key in enumerate(segment.index()["key"]):
+                    latest[bytes(key)] = (position, i)
+            # Copy into fresh segments, in archive order
+            self._new_segment()
+            for position, i in sorted(latest.values()):
+                segment = old[position]
+                entry = segment.index()[i]
+                if before is not None and entry["ts"] < before:
+                    continue
+                self._append_raw(*segment.read(int(entry["offset"]), int(entry["length"])))
+            for segment in old:
+                segment.invalidate()
+                os.remove(segment.path)
+                if os.path.exists(segment.index_path):
+                    os.remove(segment.index_path)
+                self._segments.remove(segment)
+            kept = sum(len(segment.index()) for segment in self._segments)
+            return {"kept": kept, "removed": total - kept,
+                    "reclaimed_bytes": size_before - sum(segment.size for segment in self._segments)}
+
+    def __len__(self) -> int:
+        with self._lock:
+            return sum(len(segment.index()) for segment in self._segments)
+
+    def close(self) -> None:
+        with self._lock:
+            for segment in self._segments:
+                segment.invalidate()
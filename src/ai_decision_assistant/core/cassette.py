@@ -0,0 +1,155 @@
+"""Record/replay cassettes for model calls.
+
+A cassette is a gzip-compressed JSON-lines file. In record mode every
+completion request made through a CassetteClient is forwarded to a real
+client, and the request fingerprint, the raw response and the observed
+latency are appended to the cassette. In replay mode the same requests are
+answered from the cassette without network access, through the same
+``client.chat.completions.create`` interface, so the full analysis pipeline
+(prompt building, parsing, validation) runs offline. Replay is
+deterministic: repeated requests cycle through their recorded responses in
+order, and recorded latencies are only reproduced when asked for.
+"""
+
+import gzip
+import hashlib
+import json
+import os
+import threading
+import time
+from types import SimpleNamespace
+from typing import Any, Dict, List
+
+from ai_decision_assistant.utils.exceptions import APIError, ConfigurationError
+
+RECORD = "record"
+REPLAY = "replay"
+
+# Transport options that do not change what the model is asked
+_UNFINGERPRINTED = ("timeout", "extra_headers", "extra_query")
+
+
+def request_fingerprint(request: Dict[str, Any]) -> str:
+    """Stable hash of a completion request, ignoring transport-only options"""
+    relevant = {k: v for k, v in request.items() if k not in _UNFINGERPRINTED}
+    canonical = json.dumps(relevant, sort_keys=True, separators=(",", ":"), ensure_ascii=False, default=str)
+    return hashlib.sha256(canonical.encode("utf-8")).hexdigest()
+
+
+def _to_plain(value: Any) -> Any:
+    """Convert an SDK response (pydantic models or namespaces) to JSON-compatible data"""
+    if hasattr(value, "model_dump"):
+        return value.model_dump(mode="json")
+    if isinstance(value, SimpleNamespace):
+        value = vars(value)
+    if isinstance(value, dict):
+        return {k: _to_plain(v) for k, v in value.items()}
+    if isinstance(value, (list, tuple)):
+        return [_to_plain(v) for v in value]
+    return value
+
+
+def _to_response(value: Any) -> Any:
+    """Rebuild attribute access (response.choices[0].message.content) from plain data"""
+    if isinstance(value, dict):
+        return SimpleNamespace(**{k: _to_response(v) for k, v in value.items()})
+    if isinstance(value, list):
+        return [_to_response(v) for v in value]
+    return value
+
+
+class CassetteMiss(APIError):
+    """A replayed request has no recording in the cassette"""
+    pass
+
+
+class CassetteClient:
+    """Drop-in stand-in for openai.OpenAI that records to or replays from a cassette.
+
+    Args:
+        path: Cassette file (``.jsonl.gz``).
+        mode: ``"record"`` or ``"replay"``.
+        client: Real client to forward to when recording.
+        replay_latency: Sleep for the recorded latency when replaying.
+        latency_scale: Multiplier applied to recorded latencies.
+    """
+
+    def __init__(self, path: str, mode: str = REPLAY, client: Any = None,
+                 replay_latency: bool = False, latency_scale: float = 1.0):
+        if mode not in (RECORD, REPLAY):
+            raise ValueError(f"Unknown cassette mode: {mode}")
+        if mode == RECORD and client is None:
+            raise ValueError("Recording requires a client to forward requests to")
+        self.path = path
+        self.mode = mode
+        self.client = client
+        self.replay_latency = replay_latency
+        self.latency_scale = latency_scale
+        self._lock = threading.Lock()
+        self._recordings: Dict[str, List[Dict[str, Any]]] = {}
+        self._cursor: Dict[str, int] = {}
+        if mode == REPLAY:
+            self._recordings = self.load(path)
+        self.chat = SimpleNamespace(completions=SimpleNamespace(create=self.create))
+
+    @staticmethod
+    def load(path: str) -> Dict[str, List[Dict[str, Any]]]:
+        """Recorded entries grouped by fingerprint, in recording order"""
+        recordings: Dict[str, List[Dict[str, Any]]] = {}
+        with gzip.open(path, "rt", encoding="utf-8") as f:
+            for line in f:
+                if line.strip():
+                    entry = json.loads(line)
+                    recordings.setdefault(entry["fingerprint"], []).append(entry)
+        return recordings
+
+    def __len__(self) -> int:
+        return sum(len(entries) for entries in self._recordings.values())
+
+    def create(self, **request) -> Any:
+        fingerprint = request_fingerprint(request)
+        if self.mode == RECORD:
+            return self._record(fingerprint, request)
+        return self._replay(fingerprint, request)
+
+    def _record(self, fingerprint: str, request: Dict[str, Any]) -> Any:
+        started = time.perf_counter()
+        response = self.client.chat.completions.create(**request)
+        entry = {
+            "fingerprint": fingerprint,
+            "model": request.get("model"),
+            "latency": time.perf_counter() - started,
+            "response": _to_plain(response),
+        }
+        line = json.dumps(entry, ensure_ascii=False) + "\n"
+        with self._lock:
+            self._recordings.setdefault(fingerprint, []).append(entry)
+            directory = os.path.dirname(self.path)
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+            # Each append is its own gzip member, so a crash never loses earlier recordings
+            with gzip.open(self.path, "at", encoding="utf-8") as f:
+                f.write(line)
+        return response
+
+    def _replay(self, fingerprint: str, request: Dict[str, Any]) -> Any:
+        with self._lock:
+            entries = self._recordings.get(fingerprint)
+            if not entries:
+                raise CassetteMiss(f"No recording for request {fingerprint[:12]} (model {request.get('model')})")
+            index = self._cursor.get(fingerprint, 0)
+            self._cursor[fingerprint] = index + 1
+            entry = entries[index % len(entries)]
+        if self.replay_latency and entry.get("latency"):
+            time.sleep(entry["latency"] * self.latency_scale)
+        return _to_response(entry["response"])
+
+
+def cassette_client(path: str, mode: str, client: Any = None, **options) -> CassetteClient:
+    """Build a CassetteClient; recording needs a real client and replay an existing cassette"""
+    if mode == REPLAY and not os.path.exists(path):
+        raise FileNotFoundError(f"Cassette not found: {path}")
+    if mode == RECORD and client is None:
+        # Without a client the analyzer would fall back to demo output and record nothing
+        raise ConfigurationError(f"Recording to {path} needs OPENAI_API_KEY")
+    return CassetteClient(path, mode, client=client, **options)
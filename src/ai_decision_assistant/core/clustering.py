@@ -0,0 +1,167 @@
+"""Cross-thread decision linking.
+
+The same decision ("BTC only, $5K daily limits") is usually discussed in
+several threads. This batch job vectorizes each decision's text and evidence
+quotes as hashed word n-gram TF-IDF vectors, finds near neighbours with
+random-hyperplane signatures (sorted-permutation blocking, so every pass is
+a vectorized O(n log n) sort plus a fixed window of comparisons), links
+pairs above a cosine threshold and writes a canonical ID back onto every
+decision in a cluster.
+"""
+
+import hashlib
+import re
+import zlib
+from dataclasses import dataclass
+from typing import Dict, Iterable, List, Optional, Sequence, Tuple
+
+import numpy as np
+from scipy import sparse
+from scipy.sparse.csgraph import connected_components
+
+from ai_decision_assistant.core.models import Decision, DecisionAnalysis
+
+_TOKEN = re.compile(r"[\w$%.]+")
+
+
+def decision_text(decision: Decision) -> str:
+    """Text used to compare decisions: the decision plus its evidence"""
+    return " ".join([decision.decision, *decision.evidence_quotes])
+
+
+def _tokens(text: str) -> List[str]:
+    words = [w.strip(".") for w in _TOKEN.findall(text.lower())]
+    words = [w for w in words if w]
+    return words + [f"{a} {b}" for a, b in zip(words, words[1:])]
+
+
+def hashed_tfidf(texts: Sequence[str], n_features: int = 1 << 18) -> sparse.csr_matrix:
+    """L2-normalized TF-IDF matrix over hashed word unigrams and bigrams"""
+    indptr = [0]
+    indices: List[int] = []
+    for text in texts:
+        indices.extend(zlib.crc32(token.encode("utf-8")) % n_features for token in _tokens(text))
+        indptr.append(len(indices))
+    data = np.ones(len(indices), dtype=np.float32)
+    matrix = sparse.csr_matrix(
+        (data, np.asarray(indices, dtype=np.int32), np.asarray(indptr, dtype=np.int64)),
+        shape=(len(texts), n_features),
+    )
+    matrix.sum_duplicates()
+
+    # Sublinear term frequency and smoothed inverse document frequency
+    matrix.data = 1.0 + np.log(matrix.data)
+    doc_freq = np.bincount(matrix.indices, minlength=n_features)
+    idf = np.log((1.0 + len(texts)) / (1.0 + doc_freq)).astype(np.float32) + 1.0
+    matrix.data *= idf[matrix.indices]
+
+    norms = np.sqrt(np.asarray(matrix.multiply(matrix).sum(axis=1)).ravel())
+    norms[norms == 0] = 1.0
+    return sparse.csr_matrix(sparse.diags(1.0 / norms).dot(matrix), dtype=np.float32)
+
+
+def _rowwise_cosine(matrix: sparse.csr_matrix, left: np.ndarray, right: np.ndarray) -> np.ndarray:
+    """Cosine similarity of row pairs (rows are already L2-normalized)"""
+    return np.asarray(matrix[left].multiply(matrix[right]).sum(axis=1)).ravel()
+
+
+@dataclass
+class ClusterResult:
+    """Cluster labels for a batch of decisions"""
+    labels: np.ndarray
+    canonical_ids: List[str]
+    n_clusters: int
+    n_links: int
+
+
+class DecisionClusterer:
+    """Clusters equivalent decision texts with hyperplane LSH and a cosine threshold.
+
+    Args:
+        similarity_threshold: Minimum TF-IDF cosine for two decisions to be linked.
+        n_bits: Random hyperplanes per signature.
+        n_permutations: Sorted passes over permuted signatures; more passes raise recall.
+        window: Neighbours compared after sorting; larger raises recall at linear cost.
+        n_features: Size of the hashed feature space.
+        chunk_size: Rows projected at a time, bounding peak memory.
+    """
+
+    def __init__(self, similarity_threshold: float = 0.8, n_bits: int = 64, n_permutations: int = 8,
+                 window: int = 8, n_features: int = 1 << 18, chunk_size: int = 200_000, seed: int = 0):
+        if n_bits % 8:
+            raise ValueError("n_bits must be a multiple of 8")
+        self.similarity_threshold = similarity_threshold
+        self.n_bits = n_bits
+        self.n_permutations = n_permutations
+        self.window = window
+        self.n_features = n_features
+        self.chunk_size = chunk_size
+        self.seed = seed
+
+    def _signatures(self, matrix: sparse.csr_matrix) -> np.ndarray:
+        """Sign bits of random projections, one boolean row per decision"""
+        rng = np.random.RandomState(self.seed)
+        planes = rng.standard_normal((self.n_features, self.n_bits)).astype(np.float32)
+        bits = np.empty((matrix.shape[0], self.n_bits), dtype=bool)
+        for start in range(0, matrix.shape[0], self.chunk_size):
+            stop = start + self.chunk_size
+            bits[start:stop] = matrix[start:stop].dot(planes) > 0
+        return bits
+
+    def _candidate_links(self, matrix: sparse.csr_matrix) -> Tuple[np.ndarray, np.ndarray]:
+        n = matrix.shape[0]
+        bits = self._signatures(matrix)
+        rng = np.random.RandomState(self.seed + 1)
+        sources, targets = [], []
+        for _ in range(self.n_permutations):
+            permuted = bits[:, rng.permutation(self.n_bits)]
+            keys = np.packbits(permuted, axis=1)
+            order = np.lexsort(keys.T[::-1])
+            for offset in range(1, min(self.window, n - 1) + 1):
+                left, right = order[:-offset], order[offset:]
+                similar = _rowwise_cosine(matrix, left, right) >= self.similarity_threshold
+                sources.append(left[similar])
+                targets.append(right[similar])
+        if not sources:
+            return np.empty(0, dtype=np.int64), np.empty(0, dtype=np.int64)
+        return np.concatenate(sources), np.concatenate(targets)
+
+    def fit(self, texts: Sequence[str]) -> ClusterResult:
+        n = len(texts)
+        if n == 0:
+            return ClusterResult(np.empty(0, dtype=np.int64), [], 0, 0)
+        matrix = hashed_tfidf(texts, self.n_features)
+        sources, targets = self._candidate_links(matrix)
+        graph = sparse.coo_matrix((np.ones(len(sources), dtype=np.int8), (sources, targets)), shape=(n, n))
+        n_clusters, labels = connected_components(graph, directed=False)
+
+        # The first decision seen in each cluster names it, so IDs are stable
+        # as long as earlier decisions stay in the store
+        first_member = np.full(n_clusters, n, dtype=np.int64)
+        np.minimum.at(first_member, labels, np.arange(n))
+        canonical_ids = [
+            "D-" + hashlib.sha1(" ".join(_tokens(texts[i])[:64]).encode("utf-8")).hexdigest()[:12]
+            for i in first_member
+        ]
+        return ClusterResult(labels, canonical_ids, n_clusters, int(len(sources)))
+
+
+def link_decisions(analyses: Iterable[Tuple[str, DecisionAnalysis]],
+                   clusterer: Optional[DecisionClusterer] = None) -> Dict[str, List[Tuple[str, int]]]:
+    """Assign canonical IDs to equivalent decisions across analyses.
+
+    Sets ``Decision.canonical_id`` in place and returns a mapping from
+    canonical ID to (analysis key, decision index) members.
+    """
+    clusterer = clusterer or DecisionClusterer()
+    refs: List[Tuple[str, int, Decision]] = []
+    for key, analysis in analyses:
+        refs.extend((key, i, decision) for i, decision in enumerate(analysis.decisions))
+
+    result = clusterer.fit([decision_text(decision) for _, _, decision in refs])
+    clusters: Dict[str, List[Tuple[str, int]]] = {}
+    for (key, i, decision), label in zip(refs, result.labels):
+        canonical_id = result.canonical_ids[label]
+        decision.canonical_id = canonical_id
+        clusters.setdefault(canonical_id, []).append((key, i))
+    return clusters
@@ -0,0 +1,132 @@
+"""Self-consistency sampling for calibrated decision confidence.
+
+A single model call reports whatever confidence it likes. In this mode the
+same request is issued K times concurrently at a higher temperature. The
+first valid sample becomes the analysis. Each later sample's decisions are
+aligned to it by text similarity (hashed TF-IDF cosine, greedy one-to-one),
+and a decision's confidence becomes the share of samples that contain it.
+
+Sampling stops as soon as agreement is decisive: once ``min_samples`` have
+arrived and no outstanding sample could move any decision across the
+``agreement`` threshold. Samples that have not started are cancelled, and
+running ones are abandoned with their deadline as timeout (see hedging).
+Latency therefore tracks the ``min_samples``-th fastest call rather than
+the slowest of K.
+"""
+
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from dataclasses import dataclass, field
+from typing import Any, Callable, Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+from ai_decision_assistant.core.clustering import hashed_tfidf
+from ai_decision_assistant.utils.exceptions import APIError, BudgetExceededError
+
+
+def decision_texts(result_json: Dict[str, Any]) -> List[str]:
+    """Comparable text of each decision in salvaged analysis fields"""
+    return [" ".join([d.get("decision", ""), *d.get("evidence_quotes", [])]) for d in result_json.get("decisions", [])]
+
+
+def match(base: Sequence[str], sample: Sequence[str], threshold: float) -> np.ndarray:
+    """Index of each base decision's counterpart in sample (-1 if none), matching each sample decision at most once"""
+    counterpart = np.full(len(base), -1, dtype=int)
+    if not base or not sample:
+        return counterpart
+    vectors = hashed_tfidf(list(base) + list(sample), n_features=1 << 16)
+    similarity = (vectors[:len(base)] @ vectors[len(base):].T).toarray()
+    used = np.zeros(len(sample), dtype=bool)
+    for flat in np.argsort(similarity, axis=None)[::-1]:
+        i, j = divmod(int(flat), len(sample))
+        if similarity[i, j] < threshold:
+            break
+        if counterpart[i] < 0 and not used[j]:
+            counterpart[i] = j
+            used[j] = True
+    return counterpart
+
+
+def align(base: Sequence[str], sample: Sequence[str], threshold: float) -> np.ndarray:
+    """Which base decisions have a counterpart in sample"""
+    return match(base, sample, threshold) >= 0
+
+
+@dataclass
+class ConsistencyResult:
+    response: Any
+    hedged: bool
+    support: np.ndarray
+    samples: int
+    responses: List[Any] = field(default_factory=list)
+    cancelled: int = 0
+
+    @property
+    def agreement(self) -> np.ndarray:
+        return self.support / max(1, self.samples)
+
+
+class SelfConsistencySampler:
+    """Concurrent samples of one request, stopped early once agreement is decisive.
+
+    Args:
+        samples: Maximum number of samples (K) issued per analysis.
+        temperature: Sampling temperature for every sample.
+        min_samples: Valid samples required before stopping early.
+        agreement: Share of samples a decision needs to count as agreed.
+        similarity: Cosine similarity at which two decisions are the same.
+        max_workers: Threads shared by all in-flight samples.
+    """
+
+    def __init__(self, samples: int = 5, temperature: float = 0.7, min_samples: int = 3,
+                 agreement: float = 0.5, similarity: float = 0.35, max_workers: int = 32):
+        self.samples = samples
+        self.temperature = temperature
+        self.min_samples = max(1, min(min_samples, samples))
+        self.agreement = agreement
+        self.similarity = similarity
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="consistency-sample")
+
+    def _decisive(self, support: np.ndarray, valid: int, outstanding: int) -> bool:
+        if valid < self.min_samples and outstanding:
+            return not len(support) and valid > 0
+        final = valid + outstanding
+        lowest, highest = support / final, (support + outstanding) / final
+        return bool(np.all((lowest >= self.agreement) | (highest < self.agreement)))
+
+    def run(self, call: Callable[[float], Tuple[Any, bool]],
+            parse: Callable[[Any], Optional[Dict[str, Any]]]) -> ConsistencyResult:
+        """Issue ``call(temperature)`` up to K times; ``parse`` returns a sample's analysis fields or None"""
+        pending = {self._executor.submit(call, self.temperature) for _ in range(self.samples)}
+        result: Optional[ConsistencyResult] = None
+        base: List[str] = []
+        errors: List[BaseException] = []
+        try:
+            while pending:
+                done, pending = wait(pending, return_when=FIRST_COMPLETED)
+                for future in done:
+                    try:
+                        response, hedged = future.result()
+                        parsed = parse(response)
+                    except Exception as e:
+                        errors.append(e)
+                        continue
+                    if parsed is None:
+                        errors.append(ValueError("Model returned an invalid response"))
+                    elif result is None:
+                        base = decision_texts(parsed)
+                        result = ConsistencyResult(response, hedged, np.ones(len(base), dtype=int), 1, [response])
+                    else:
+                        result.support += align(base, decision_texts(parsed), self.similarity)
+                        result.samples += 1
+                        result.responses.append(response)
+                if result is not None and self._decisive(result.support, result.samples, len(pending)):
+                    break
+        finally:
+            cancelled = sum(future.cancel() or future.running() for future in pending)
+        if result is None:
+            if all(isinstance(e, BudgetExceededError) for e in errors):
+                raise errors[-1]
+            raise APIError(f"All {self.samples} samples failed: {errors[-1]}") from errors[-1]
+        result.cancelled = cancelled
+        return result
@@ -1,6 +1,7 @@
 import json
+import time
 import openai
-from typing import Dict, Any
+from typing import Callable, Dict, Any, List, Optional, Sequence, Tuple
 import sys
 import os
 from dotenv import load_dotenv
@@ -10,16 +11,117 @@ current_file = os.path.abspath(__file__)
 core_dir = os.path.dirname(current_file)
 ai_decision_assistant_dir = os.path.dirname(core_dir)
 src_dir = os.path.dirname(ai_decision_assistant_dir)
+project_root = os.path.dirname(src_dir)
 
 if src_dir not in sys.path:
     sys.path.insert(0, src_dir)
+if project_root not in sys.path:
+    sys.path.append(project_root)
 
-from ai_decision_assistant.core.models import DecisionAnalysis
+from config.settings import Config
+from ai_decision_assistant.core.cassette import cassette_client
+from ai_decision_assistant.core.consistency import SelfConsistencySampler
+from ai_decision_assistant.core.evidence import anchor_conversation
+from ai_decision_assistant.core.field_repair import apply_repairs, build_repair_messages, is_repairable
+from ai_decision_assistant.core.hedging import HedgedCaller
+from ai_decision_assistant.core.json_repair import repair_json, salvage_analysis
+from ai_decision_assistant.core.ledger import AdmissionController, UsageLedger, load_prices
+from ai_decision_assistant.core.models import AnalysisMetadata, DecisionAnalysis
+from ai_decision_assistant.core.near_duplicates import NearDuplicateIndex
+from ai_decision_assistant.core.prompts import PROMPT_REGISTRY, PromptTemplate
+from ai_decision_assistant.core.normalization import ThreadNormalizer
+from ai_decision_assistant.core.redaction import Redaction, Redactor
+from ai_decision_assistant.core.views import ViewCache, derive_views, pop_high_stakes_extras
+from ai_decision_assistant.utils.exceptions import AnalysisCancelled, AnalysisError, BudgetExceededError
+from ai_decision_assistant.utils.helpers import conversation_hash
+from ai_decision_assistant.utils.profiling import stage
 
 load_dotenv()
 
+
+def _usage_value(obj: Any, name: str) -> Any:
+    """Read a usage field from either an SDK object or a plain dict"""
+    if obj is None:
+        return None
+    if isinstance(obj, dict):
+        return obj.get(name)
+    return getattr(obj, name, None)
+
+
+def usage_metadata(usage: Any) -> Dict[str, int]:
+    """Extract prompt, completion and cached token counts from a response usage block"""
+    details = _usage_value(usage, "prompt_tokens_details")
+    return {
+        "prompt_tokens": _usage_value(usage, "prompt_tokens") or 0,
+        "completion_tokens": _usage_value(usage, "completion_tokens") or 0,
+        "cached_tokens": _usage_value(details, "cached_tokens") or 0,
+    }
+
+
+def _has_json_content(response: Any) -> bool:
+    """Whether a completion carries (repairable) JSON; used to pick a hedging winner"""
+    try:
+        json.loads(repair_json(response.choices[0].message.content))
+        return True
+    except (ValueError, TypeError, AttributeError, IndexError):
+        return False
+
+
 class DecisionAnalyzer:
-    def __init__(self):
+    def __init__(self, client: Optional[Any] = None, prompt_version: Optional[str] = None,
+                 near_duplicate_index: Optional[NearDuplicateIndex] = None,
+                 hedger: Optional[HedgedCaller] = None, derive_high_stakes: Optional[bool] = None,
+                 admission: Optional[AdmissionController] = None,
+                 consistency: Optional[SelfConsistencySampler] = None,
+                 redactor: Optional[Redactor] = None, normalizer: Optional[ThreadNormalizer] = None):
+        # Fail fast on an unknown prompt version
+        self.prompt_template: PromptTemplate = PROMPT_REGISTRY.get(prompt_version or Config.PROMPT_VERSION)
+        self.model = Config.OPENAI_MODEL
+        # Prior analyses of near-duplicate conversations are reused or given to the model as context
+        self.near_duplicate_index = near_duplicate_index
+        if self.near_duplicate_index is None and Config.NEAR_DUPLICATE_INDEX:
+            self.near_duplicate_index = NearDuplicateIndex(Config.NEAR_DUPLICATE_THRESHOLD,
+                                                           Config.NEAR_DUPLICATE_REUSE_THRESHOLD,
+                                                           max_entries=Config.NEAR_DUPLICATE_MAX_ENTRIES)
+        self.hedger = hedger
+        # One call serves both modes; the high-stakes view is derived locally and both are cached
+        self.derive_high_stakes = Config.DERIVE_HIGH_STAKES_VIEW if derive_high_stakes is None else derive_high_stakes
+        self.views = ViewCache(Config.VIEW_CACHE_SIZE)
+        # Every call is recorded in the usage ledger and must fit the configured budgets
+        self.admission = admission
+        if self.admission is None and Config.LEDGER_PATH:
+            self.admission = AdmissionController(
+                UsageLedger(Config.LEDGER_PATH, load_prices(Config.LEDGER_PRICES)),
+                global_budget=Config.BUDGET_GLOBAL_USD,
+                caller_budgets=json.loads(Config.BUDGET_CALLERS) if Config.BUDGET_CALLERS else None,
+                window_seconds=Config.BUDGET_WINDOW_SECONDS,
+                interactive_reserve=Config.BUDGET_INTERACTIVE_RESERVE,
+                downgrade_model=Config.BUDGET_DOWNGRADE_MODEL,
+                max_wait_seconds=Config.BUDGET_MAX_WAIT_SECONDS,
+            )
+        # Confidence from agreement across concurrent samples instead of the model's own number
+        self.consistency = consistency
+        if self.consistency is None and Config.CONSISTENCY_SAMPLES > 1:
+            self.consistency = SelfConsistencySampler(
+                samples=Config.CONSISTENCY_SAMPLES,
+                temperature=Config.CONSISTENCY_TEMPERATURE,
+                min_samples=Config.CONSISTENCY_MIN_SAMPLES,
+                agreement=Config.CONSISTENCY_AGREEMENT,
+                similarity=Config.CONSISTENCY_SIMILARITY,
+            )
+        # PII is replaced with placeholders before any text is sent and restored in the result
+        self.redactor = redactor
+        if self.redactor is None and Config.REDACT_PII:
+            self.redactor = Redactor.from_file(Config.REDACT_CATEGORIES.split(","), Config.REDACT_IDENTIFIERS_FILE)
+        # Quoted history, signatures and disclaimers are removed as whole lines before redaction
+        self.normalizer = normalizer
+        if self.normalizer is None and Config.NORMALIZE_THREADS:
+            self.normalizer = ThreadNormalizer(Config.NORMALIZE_MIN_BLOCK_LINES)
+        
+        if client is not None:
+            self.client = client
+            return
+        
         api_key = os.getenv('OPENAI_API_KEY')
         if not api_key or api_key == 'your-openai-key-here':
             # Create a mock client for demo purposes
@@ -27,112 +129,200 @@ class DecisionAnalyzer:
         else:
             try:
                 self.client = openai.OpenAI(api_key=api_key)
+                if self.hedger is None:
+                    self.hedger = HedgedCaller(
+                        deadline_seconds=Config.REQUEST_DEADLINE_SECONDS,
+                        hedge_percentile=Config.HEDGE_PERCENTILE,
+                        fallback_model=Config.HEDGE_FALLBACK_MODEL,
+                    )
             except Exception as e:
                 print(f"⚠️  OpenAI client initialization failed: {e}")
                 print("🔧 Falling back to demo mode...")
                 self.client = None
         
+        if Config.LLM_CASSETTE:
+            # Record through the real client, or replay without any network access
+            self.client = cassette_client(Config.LLM_CASSETTE, Config.LLM_CASSETTE_MODE, self.client,
+                                          replay_latency=Config.LLM_CASSETTE_LATENCY)
+        
     def get_system_prompt(self, high_stakes_mode: bool = False) -> str:
-        base_prompt = """You are a Decision Intelligence Assistant for a regulated fintech company (like example).
-
-Your role is to extract structured decision information from messy conversation threads while being:
-- PRECISE: Only extract what is explicitly stated
-- CONSERVATIVE: When in doubt, mark as "unknown" or express uncertainty  
-- EVIDENCE-BASED: Always cite exact quotes to support your analysis
-- RISK-AWARE: Surface potential risks and regulatory concerns
-
-Core Rules:
-1. If no explicit decision is present, do not invent one
-2. Always separate facts from assumptions  
-3. Quote exact text when identifying decisions or commitments
-4. For fintech contexts, be extra cautious about regulatory implications
-5. Mark confidence levels honestly - high uncertainty = low confidence
-
-For the "human_must_decide" field, identify the ONE most critical decision that requires human judgment, typically involving:
-- Policy interpretation
-- Regulatory compliance
-- Client-impacting communications  
-- Financial risk acceptance
-- Strategic direction changes"""
-
+        """Full instruction text for a mode.
+        
+        Requests keep the high-stakes addendum out of the system message so the
+        static prefix stays identical across modes; see PromptTemplate.build_messages.
+        """
         if high_stakes_mode:
-            base_prompt += """
-
-HIGH-STAKES MODE ACTIVE:
-- Lower confidence scores by 0.2 
-- Flag additional risks
-- Refuse to make definitive statements about unclear decisions
-- Ask more clarifying questions
-- Be more conservative about decision finality"""
+            return f"{self.prompt_template.system_prompt}\n\n{self.prompt_template.high_stakes_addendum}"
+        return self.prompt_template.system_prompt
 
-        return base_prompt
-
-    def analyze_conversation(self, conversation: str, high_stakes_mode: bool = False) -> DecisionAnalysis:
+    def analyze_conversation(self, conversation: str, high_stakes_mode: bool = False,
+                             raise_errors: bool = False,
+                             progress: Optional[Callable[[str], None]] = None,
+                             caller: str = "default", participants: Sequence[str] = (),
+                             redaction: Optional[Redaction] = None) -> DecisionAnalysis:
+        """Analyze a conversation.
+        
+        Failures return a placeholder analysis asking for human review, unless
+        ``raise_errors`` is set, in which case they raise AnalysisError so
+        callers such as queue workers can retry. A call refused by the budget
+        raises BudgetExceededError either way. ``progress`` is called with the
+        name of each stage as it starts; an exception raised from it aborts the
+        analysis (used for cancellation). ``caller`` identifies who is spending
+        tokens (``ui:<session>``, ``batch:<session>``, ``cli``) for the usage
+        ledger and budgets. With a redactor, ``participants`` (names known from
+        ingestion) are redacted too; batch callers may pass a ``redaction``
+        computed ahead of time, of the normalized text if a normalizer is set.
+        """
+        report = progress or (lambda name: None)
         try:
             # Check if we have a valid OpenAI client
             if self.client is None:
                 # Return a demo analysis when no API key is provided
                 return self._get_demo_analysis(conversation, high_stakes_mode)
             
-            system_prompt = self.get_system_prompt(high_stakes_mode)
+            if self.derive_high_stakes:
+                cached = self.views.get(conversation_hash(conversation), high_stakes_mode)
+                if cached is not None:
+                    return cached
             
-            user_prompt = f"""Analyze this conversation thread and extract decision information:
-
-{conversation}
-
-Return a JSON response following this exact schema:
-{{
-  "decisions": [
-    {{
-      "decision": "specific decision text",
-      "status": "proposed|confirmed|unclear", 
-      "evidence_quotes": ["exact quote supporting this decision"],
-      "owner": "person name or unknown",
-      "deadline": "timeline or unknown", 
-      "confidence": 0.85
-    }}
-  ],
-  "assumptions": [
-    {{
-      "assumption": "assumption text",
-      "risk_if_wrong": "potential impact"
-    }}
-  ],
-  "risks": [
-    {{
-      "risk": "risk description", 
-      "severity": "low|medium|high",
-      "mitigation": "suggested approach"
-    }}
-  ],
-  "open_questions": ["unresolved question"],
-  "human_must_decide": "most critical decision requiring human judgment",
-  "why_human": "explanation of why human judgment is required",
-  "scale_concerns": ["what would break first at scale"]
-}}
-
-Be extremely careful to return valid JSON only."""
-
-            response = self.client.chat.completions.create(
-                model="gpt-4",
-                messages=[
-                    {"role": "system", "content": system_prompt},
-                    {"role": "user", "content": user_prompt}
-                ],
-                temperature=0.1,
-                response_format={"type": "json_object"}
-            )
-            
-            result_json = json.loads(response.choices[0].message.content)
+            report("parse")
+            with stage("parse"):
+                context, match = None, None
+                if self.near_duplicate_index is not None:
+                    # A same-mode match can be reused; one from the other mode is still useful context
+                    match = (self.near_duplicate_index.best_match(conversation, high_stakes_mode)
+                             or self.near_duplicate_index.best_match(conversation))
+                    if match and self.near_duplicate_index.reusable(match, high_stakes_mode):
+                        return self._reuse_near_duplicate(match)
+                    if match:
+                        context = match.analysis.model_dump_json(exclude={"metadata"})
+                normalized = self.normalizer.normalize(conversation) if self.normalizer is not None else None
+                text = normalized.text if normalized else conversation
+                # Only redacted text leaves the process, including prior-analysis context
+                prompt_text = text
+                if self.redactor is not None:
+                    redaction = redaction or self.redactor.redact(text, participants)
+                    prompt_text = redaction.text
+                    # Context from another thread is redacted with that thread's names; without them it is dropped
+                    if context and match.names is not None:
+                        context = self.redactor.extend(redaction, context, match.names)
+                    else:
+                        context = None
+                else:
+                    redaction = None
+                # Reference-mode prompts get line IDs and cite them instead of quoting. Redaction keeps
+                # lines intact, so references resolve against the unredacted text; after normalization
+                # the resolved offsets are mapped back so spans and quotes refer to the conversation as given.
+                anchored = None
+                if self.prompt_template.evidence_refs:
+                    anchored = (anchor_conversation(text, conversation, normalized.original_ranges) if normalized
+                                else anchor_conversation(text))
+                messages = self.prompt_template.build_messages(
+                    anchor_conversation(prompt_text).render() if anchored else prompt_text, high_stakes_mode,
+                    context, dual_view=self.derive_high_stakes
+                )
+                extras: Dict[str, Any] = {}
+                
+                def prepare(raw: Dict[str, Any]) -> None:
+                    if anchored:
+                        anchored.resolve_decisions(raw)
+                    if self.derive_high_stakes:
+                        extras.update(pop_high_stakes_extras(raw))
+
+            report("api_wait")
+            with stage("api_wait"):
+                started = time.perf_counter()
+                sampled = None
+                if self.consistency is not None:
+                    sampled = self.consistency.run(
+                        lambda temperature: self._complete(messages, caller, temperature=temperature),
+                        lambda sample: self._parse_sample(sample, anchored),
+                    )
+                    response, hedged = sampled.response, sampled.hedged
+                else:
+                    response, hedged = self._complete(messages, caller)
+                latency = time.perf_counter() - started
             
-            # Apply high-stakes adjustments if enabled
-            if high_stakes_mode:
-                for decision in result_json.get("decisions", []):
-                    decision["confidence"] = max(0.0, decision["confidence"] - 0.2)
+            report("validation")
+            with stage("validation"):
+                # Keep every valid item even if the output is malformed or partly invalid
+                result_json, dropped, repaired = salvage_analysis(response.choices[0].message.content, prepare)
+                if sampled is not None:
+                    for decision, agreement in zip(result_json["decisions"], sampled.agreement):
+                        decision["confidence"] = round(float(agreement), 3)
+                repair = {}
+                if Config.FIELD_REPAIR_ENABLED and any(is_repairable(item) for item in dropped):
+                    report("repair")
+                    dropped, repair = self._repair_fields(prompt_text, result_json, dropped, caller)
+                if redaction is not None:
+                    result_json, extras = redaction.restore(result_json), redaction.restore(extras)
+                    for item in dropped:
+                        item.fragment = redaction.restore(item.fragment)
+                
+                if self.derive_high_stakes:
+                    standard_json, high_json, dropped_extras = derive_views(
+                        result_json, extras, Config.HIGH_STAKES_CONFIDENCE_PENALTY
+                    )
+                    dropped = dropped + dropped_extras
+                elif high_stakes_mode:
+                    # Apply high-stakes adjustments if enabled
+                    for decision in result_json["decisions"]:
+                        decision["confidence"] = max(0.0, decision["confidence"] - Config.HIGH_STAKES_CONFIDENCE_PENALTY)
+                
+                model = getattr(response, "model", None) or self.model
+                usage = usage_metadata(getattr(response, "usage", None))
+                cost = 0.0
+                if sampled is not None:
+                    # Every sample that was waited for is billed to this analysis
+                    sample_usage = [usage_metadata(getattr(r, "usage", None)) for r in sampled.responses]
+                    usage = {key: sum(u[key] for u in sample_usage) for key in usage}
+                    if self.admission is not None:
+                        cost = sum(self.admission.ledger.cost(getattr(r, "model", None) or model, u["prompt_tokens"],
+                                                              u["completion_tokens"], u["cached_tokens"])
+                                   for r, u in zip(sampled.responses, sample_usage))
+                elif self.admission is not None:
+                    cost = self.admission.ledger.cost(model, usage["prompt_tokens"], usage["completion_tokens"],
+                                                      usage["cached_tokens"])
+                if self.admission is not None and repair:
+                    cost += self.admission.ledger.cost(model, repair["repair_prompt_tokens"],
+                                                       repair["repair_completion_tokens"])
+                metadata = AnalysisMetadata(
+                    prompt_version=self.prompt_template.version,
+                    model=model,
+                    cost_usd=cost,
+                    latency_seconds=latency,
+                    hedged=hedged,
+                    consistency_samples=sampled.samples if sampled else 0,
+                    consistency_cancelled=sampled.cancelled if sampled else 0,
+                    redacted_items=len(redaction.originals) if redaction else 0,
+                    normalized_tokens=normalized.tokens if normalized else 0,
+                    normalized_tokens_saved=normalized.saved_tokens if normalized else 0,
+                    near_duplicate_of=match.key if match else "",
+                    near_duplicate_similarity=match.similarity if match else 0.0,
+                    repaired=repaired,
+                    dropped_items=dropped,
+                    **repair,
+                    **usage
+                )
+                if self.derive_high_stakes:
+                    standard = DecisionAnalysis(**standard_json, metadata=metadata)
+                    high = DecisionAnalysis(**high_json, metadata=metadata.model_copy(update={"derived_view": True}))
+                    self.views.put(conversation_hash(conversation), standard, high)
+                    analysis = high if high_stakes_mode else standard
+                else:
+                    analysis = DecisionAnalysis(**result_json, metadata=metadata)
             
-            return DecisionAnalysis(**result_json)
+            if self.near_duplicate_index is not None:
+                self.near_duplicate_index.add(conversation_hash(conversation), conversation, analysis, high_stakes_mode,
+                                              redaction.values("PERSON") if redaction is not None else None)
+            return analysis
             
+        except (AnalysisCancelled, BudgetExceededError):
+            # Refused for budget: nothing was analyzed, so callers must retry or report it, not show a placeholder
+            raise
         except Exception as e:
+            if raise_errors:
+                raise AnalysisError(f"Error analyzing conversation: {e}") from e
             # Return a safe fallback response
             return DecisionAnalysis(
                 decisions=[],
@@ -141,9 +331,85 @@ Be extremely careful to return valid JSON only."""
                 open_questions=[f"Error analyzing conversation: {str(e)}"],
                 human_must_decide="Full conversation review required due to analysis error",
                 why_human="AI analysis failed - human review necessary for safety",
-                scale_concerns=["Error handling and fallback procedures"]
+                scale_concerns=["Error handling and fallback procedures"],
+                metadata=AnalysisMetadata(prompt_version=self.prompt_template.version, model=self.model)
             )
     
+    def _complete(self, messages, caller: str = "default", purpose: str = "analysis",
+                  temperature: Optional[float] = None):
+        """Call the model within the configured deadline and budgets; returns (response, hedged)"""
+        request = {
+            "model": self.model,
+            "messages": messages,
+            "temperature": Config.DEFAULT_TEMPERATURE if temperature is None else temperature,
+            "response_format": {"type": "json_object"},
+        }
+        reserve = settle = None
+        if self.admission is not None:
+            prompt_estimate = sum(len(message["content"]) for message in messages) // 4
+
+            def reserve(model: str):
+                # May wait for budget, switch to the downgrade model, or raise BudgetExceededError
+                return self.admission.admit(caller, model, prompt_estimate, Config.LEDGER_COMPLETION_ESTIMATE)
+
+            def settle(ticket, model: str, response) -> None:
+                usage = usage_metadata(getattr(response, "usage", None)) if response is not None else None
+                self.admission.release(ticket, caller, getattr(response, "model", None) or model, usage, purpose)
+
+        if self.hedger is not None:
+            # Every attempt, hedges included, is admitted and billed on its own
+            return self.hedger.call(self.client.chat.completions.create, request, validate=_has_json_content,
+                                    reserve=reserve, settle=settle)
+        ticket, response = None, None
+        if reserve is not None:
+            ticket, request["model"] = reserve(request["model"])
+        try:
+            response = self.client.chat.completions.create(timeout=Config.REQUEST_DEADLINE_SECONDS, **request)
+            return response, False
+        finally:
+            if settle is not None:
+                settle(ticket, request["model"], response)
+    
+    @staticmethod
+    def _parse_sample(response: Any, anchored) -> Optional[Dict[str, Any]]:
+        """Analysis fields of one self-consistency sample, or None if nothing is recoverable"""
+        def prepare(raw: Dict[str, Any]) -> None:
+            if anchored:
+                anchored.resolve_decisions(raw)
+        try:
+            return salvage_analysis(response.choices[0].message.content, prepare)[0]
+        except (ValueError, TypeError, AttributeError, IndexError):
+            return None
+    
+    def _repair_fields(self, conversation: str, result_json: Dict[str, Any], dropped, caller: str = "default"):
+        """Re-ask for just the invalid items and splice valid corrections into result_json"""
+        repairable = [item for item in dropped if is_repairable(item)]
+        try:
+            with stage("api_wait"):
+                response, _ = self._complete(build_repair_messages(conversation, repairable), caller, "repair")
+        except Exception:
+            # A failed repair must not cost the salvaged analysis
+            return dropped, {}
+        remaining, fixed = apply_repairs(result_json, repairable, response.choices[0].message.content)
+        usage = usage_metadata(getattr(response, "usage", None))
+        unrepairable = [item for item in dropped if not is_repairable(item)]
+        return unrepairable + remaining, {
+            "repaired_items": fixed,
+            "repair_prompt_tokens": usage["prompt_tokens"],
+            "repair_completion_tokens": usage["completion_tokens"],
+        }
+    
+    def _reuse_near_duplicate(self, match) -> DecisionAnalysis:
+        """Return a prior analysis for a near-identical conversation without calling the model"""
+        reused = match.analysis.model_copy(deep=True)
+        reused.metadata = AnalysisMetadata(
+            prompt_version=self.prompt_template.version,
+            model=match.analysis.metadata.model if match.analysis.metadata else self.model,
+            near_duplicate_of=match.key,
+            near_duplicate_similarity=match.similarity,
+        )
+        return reused
+    
     def _get_demo_analysis(self, conversation: str, high_stakes_mode: bool = False) -> DecisionAnalysis:
         """Return a demo analysis when no OpenAI API key is available"""
         from ai_decision_assistant.core.models import Decision, Risk, Assumption, DecisionStatus, RiskSeverity
@@ -182,11 +448,28 @@ Be extremely careful to return valid JSON only."""
             open_questions=["What are the specific FINTRAC reporting requirements?"],
             human_must_decide="Final approval for crypto trading feature launch",
             why_human="Regulatory compliance and financial risk decisions require human accountability",
-            scale_concerns=["Manual compliance review process", "Legal team capacity for reviews"]
+            scale_concerns=["Manual compliance review process", "Legal team capacity for reviews"],
+            metadata=AnalysisMetadata(prompt_version=self.prompt_template.version, model="demo")
         )
     
     def generate_decision_log(self, analysis: DecisionAnalysis, approvals: Dict[int, Any]) -> str:
         """Generate a formatted decision log for export"""
+        with stage("log_render"):
+            return self._render_decision_log(analysis, approvals)
+    
+    def generate_bulk_decision_log(self, results: List[Tuple[str, DecisionAnalysis]],
+                                   approvals: Optional[Dict[str, Dict[int, Any]]] = None) -> str:
+        """One decision log for a batch of analyses, each section headed by its source"""
+        approvals = approvals or {}
+        with stage("log_render"):
+            sections = [
+                f"# {source}\n" + self._render_decision_log(analysis, approvals.get(source, {}))
+                .replace("# DECISION LOG\n", "", 1)
+                for source, analysis in results
+            ]
+        return f"# BULK DECISION LOG\nThreads: {len(sections)}\n\n" + "\n---\n\n".join(sections)
+
+    def _render_decision_log(self, analysis: DecisionAnalysis, approvals: Dict[int, Any]) -> str:
         log = "# DECISION LOG\n"
         log += f"Generated: {analysis.__class__.__name__}\n\n"
         
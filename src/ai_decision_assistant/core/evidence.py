@@ -0,0 +1,121 @@
+"""Line-anchored evidence references.
+
+In reference mode the conversation is sent with a stable ID on every
+non-blank line (``L12| ...``). Instead of re-typing quotes, the model cites
+line ranges (``"L12"`` or ``"L12-L14"``). They are resolved locally into
+the exact conversation text and character offsets, so evidence cannot drift
+from the source and the UI can highlight it without searching.
+
+When the lines sent were derived from a longer source (a normalized
+thread), a ``relocate`` function maps resolved offsets back to ranges of
+the source, so spans and quotes always refer to the conversation as given.
+"""
+
+import re
+from dataclasses import dataclass
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+from ai_decision_assistant.core.models import EvidenceSpan
+
+_REF = re.compile(r"^\s*L?(\d+)\s*(?:[-–:]\s*L?(\d+))?\s*$", re.IGNORECASE)
+
+# Keys the model may use for decisions and their references (full and compact wire keys)
+DECISION_KEYS = ("decisions", "d")
+REF_KEYS = ("evidence_refs", "er")
+
+
+@dataclass
+class AnchoredConversation:
+    """A conversation with 1-based line IDs and the character span of each line.
+
+    With ``source`` and ``relocate`` set, ``text`` was derived from ``source``
+    and resolved evidence is quoted from the source.
+    """
+    text: str
+    lines: List[Tuple[int, int]]
+    source: Optional[str] = None
+    relocate: Optional[Callable[[int, int], List[Tuple[int, int]]]] = None
+
+    def render(self) -> str:
+        """The conversation as sent to the model, one ID per non-blank line"""
+        return "\n".join(
+            f"L{number}| {self.text[start:end]}"
+            for number, (start, end) in enumerate(self.lines, 1)
+            if start < end
+        )
+
+    def resolve(self, ref: Any) -> Optional[EvidenceSpan]:
+        """Resolve 'L12' or 'L12-L14' to the exact text and offsets, or None if invalid"""
+        match = _REF.match(str(ref))
+        if not match:
+            return None
+        first = int(match.group(1))
+        last = int(match.group(2) or first)
+        if first > last:
+            first, last = last, first
+        if first < 1 or last > len(self.lines):
+            return None
+        start, end = self.lines[first - 1][0], self.lines[last - 1][1]
+        if start >= end:
+            return None
+        label = f"L{first}" if first == last else f"L{first}-L{last}"
+        return EvidenceSpan(ref=label, start=start, end=end, text=self.text[start:end])
+
+    def resolve_decisions(self, raw: Dict[str, Any]) -> None:
+        """Replace evidence references in parsed model output with quotes and spans, in place"""
+        for key in DECISION_KEYS:
+            decisions = raw.get(key)
+            if not isinstance(decisions, list):
+                continue
+            for decision in decisions:
+                if not isinstance(decision, dict):
+                    continue
+                refs = next((decision.pop(k) for k in REF_KEYS if k in decision), None)
+                if refs is None:
+                    continue
+                refs = refs if isinstance(refs, list) else [refs]
+                spans = [span for span in (self.resolve(ref) for ref in refs) if span is not None]
+                if self.relocate is not None:
+                    # One span per part of the source, which may be split where lines were removed
+                    spans = [EvidenceSpan(ref=span.ref, start=start, end=end, text=self.source[start:end])
+                             for span in spans for start, end in self.relocate(span.start, span.end)]
+                decision["evidence_quotes"] = [span.text for span in spans]
+                decision["evidence_spans"] = [span.model_dump() for span in spans]
+
+
+def highlight_spans(text: str, spans: List[EvidenceSpan], before: str = ":orange[**", after: str = "**]") -> str:
+    """Markdown of the conversation with evidence spans marked (overlapping spans are merged)"""
+    merged: List[List[int]] = []
+    for span in sorted(spans, key=lambda s: s.start):
+        if merged and span.start <= merged[-1][1]:
+            merged[-1][1] = max(merged[-1][1], span.end)
+        else:
+            merged.append([span.start, span.end])
+
+    def markdown(segment: str, marked: bool) -> str:
+        lines = segment.split("\n")
+        if marked:
+            lines = [f"{before}{line}{after}" if line.strip() else line for line in lines]
+        return "  \n".join(lines)
+
+    parts, position = [], 0
+    for start, end in merged:
+        parts.append(markdown(text[position:start], False))
+        parts.append(markdown(text[start:end], True))
+        position = end
+    parts.append(markdown(text[position:], False))
+    return "".join(parts)
+
+
+def anchor_conversation(text: str, source: Optional[str] = None,
+                        relocate: Optional[Callable[[int, int], List[Tuple[int, int]]]] = None) -> AnchoredConversation:
+    """Number the lines of a conversation, trimming surrounding whitespace from each span"""
+    lines = []
+    offset = 0
+    for line in text.splitlines(keepends=True):
+        content = line.rstrip("\r\n")
+        start = offset + len(content) - len(content.lstrip())
+        end = offset + len(content.rstrip())
+        lines.append((start, max(start, end)))
+        offset += len(line)
+    return AnchoredConversation(text=text, lines=lines, source=source, relocate=relocate)
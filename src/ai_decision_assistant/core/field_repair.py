@@ -0,0 +1,140 @@
+"""Targeted re-asks for analysis items that failed validation.
+
+Instead of re-running the whole analysis, the model is sent only the
+invalid fragments, their validation errors, the schema they must satisfy
+and a short span of the conversation they came from. Corrected values are
+validated again and spliced back into the analysis in their original
+positions; anything still invalid stays dropped.
+"""
+
+import json
+import re
+from typing import Any, Dict, List, Tuple
+
+from pydantic import ValidationError
+
+from ai_decision_assistant.core.json_repair import ITEM_MODELS, REQUIRED_TEXT, repair_json
+from ai_decision_assistant.core.models import DroppedItem
+from ai_decision_assistant.core.prompts import response_json_schema
+
+REPAIR_INSTRUCTIONS = """You correct individual fields of a decision analysis that failed validation.
+For each item you receive the invalid JSON, its validation errors, the schema it must satisfy and
+the part of the conversation it was extracted from. Fix only what the errors require and keep
+everything else as given. Use only the evidence shown. Respond with JSON:
+{"repairs": [{"id": <item id>, "value": <corrected value>}]}"""
+
+_WORD = re.compile(r"[a-z0-9$%]+")
+
+
+def is_repairable(item: DroppedItem) -> bool:
+    """Single list items and required text fields can be re-asked; whole malformed lists cannot"""
+    return item.index is not None or item.field in REQUIRED_TEXT
+
+
+def item_label(item: DroppedItem) -> str:
+    return item.field if item.index is None else f"{item.field}[{item.index}]"
+
+
+def _fragment_text(fragment: str) -> str:
+    """All string content of a fragment, used to locate its evidence"""
+    try:
+        value = json.loads(fragment)
+    except ValueError:
+        return fragment
+    strings: List[str] = []
+    pending = [value]
+    while pending:
+        current = pending.pop()
+        if isinstance(current, str):
+            strings.append(current)
+        elif isinstance(current, dict):
+            pending.extend(current.values())
+        elif isinstance(current, list):
+            pending.extend(current)
+    return " ".join(strings)
+
+
+def evidence_span(conversation: str, text: str, max_chars: int = 1200, context_lines: int = 2) -> str:
+    """The lines of the conversation that best match text, with a little surrounding context"""
+    lines = conversation.splitlines()
+    words = set(_WORD.findall(text.lower()))
+    if not lines or not words:
+        return conversation[:max_chars]
+    scores = [len(words & set(_WORD.findall(line.lower()))) for line in lines]
+    best = max(range(len(lines)), key=lambda i: scores[i])
+    if scores[best] == 0:
+        return conversation[:max_chars]
+    span = "\n".join(lines[max(0, best - context_lines):best + context_lines + 1])
+    return span[:max_chars]
+
+
+def _item_schema(field: str) -> Dict[str, Any]:
+    if field in ITEM_MODELS:
+        schema = response_json_schema()
+        definitions = schema["$defs"]
+        item = dict(definitions[ITEM_MODELS[field].__name__])
+        enums = {name: definitions[name] for name in ("DecisionStatus", "RiskSeverity")
+                 if name in json.dumps(item)}
+        if enums:
+            item["$defs"] = enums
+        return item
+    return {"type": "string", "minLength": 1}
+
+
+def build_repair_messages(conversation: str, dropped: List[DroppedItem]) -> List[Dict[str, str]]:
+    """Chat messages asking for corrected values of the dropped items only"""
+    items = []
+    for i, item in enumerate(dropped):
+        items.append({
+            "id": i,
+            "field": item_label(item),
+            "errors": item.errors,
+            "invalid_value": item.fragment,
+            "schema": _item_schema(item.field),
+            "evidence": evidence_span(conversation, _fragment_text(item.fragment) or item.field),
+        })
+    return [
+        {"role": "system", "content": REPAIR_INSTRUCTIONS},
+        {"role": "user", "content": json.dumps({"items": items}, ensure_ascii=False, separators=(",", ":"))},
+    ]
+
+
+def apply_repairs(result_json: Dict[str, Any], dropped: List[DroppedItem],
+                  content: str) -> Tuple[List[DroppedItem], List[str]]:
+    """Splice valid repaired values into result_json.
+
+    Returns (items still dropped, labels of the items repaired).
+    """
+    try:
+        repairs = json.loads(repair_json(content)).get("repairs", [])
+    except (ValueError, AttributeError):
+        return dropped, []
+    values = {r.get("id"): r.get("value") for r in repairs if isinstance(r, dict)}
+
+    remaining: List[DroppedItem] = []
+    fixed: List[Tuple[DroppedItem, Any]] = []
+    for i, item in enumerate(dropped):
+        value = values.get(i)
+        try:
+            if item.field in ITEM_MODELS and item.index is not None:
+                value = ITEM_MODELS[item.field].model_validate(value).model_dump(mode="json", exclude_none=True)
+            elif item.field in REQUIRED_TEXT and isinstance(value, str) and value.strip():
+                pass
+            else:
+                raise ValueError("no usable correction")
+        except (ValidationError, ValueError) as e:
+            errors = [str(e).splitlines()[0]] if value is not None else ["no correction returned"]
+            remaining.append(item.model_copy(update={"errors": item.errors + errors}))
+            continue
+        fixed.append((item, value))
+
+    # Reinsert list items in original order; positions shift past items that stay dropped
+    for item, value in sorted(fixed, key=lambda pair: (pair[0].field, pair[0].index or 0)):
+        if item.index is None:
+            result_json[item.field] = value
+            continue
+        still_missing_before = sum(
+            1 for other in remaining if other.field == item.field and other.index is not None and other.index < item.index
+        )
+        result_json[item.field].insert(item.index - still_missing_before, value)
+    return remaining, [item_label(item) for item, _ in fixed]
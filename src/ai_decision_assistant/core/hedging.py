@@ -0,0 +1,156 @@
+"""Per-call deadlines and hedged requests for model calls.
+
+Model latency has a long tail. HedgedCaller issues the request, and if it has
+not answered within a chosen percentile of recently observed latency, issues
+a duplicate (optionally to a fallback model). The first valid response wins.
+Every attempt carries the remaining deadline as its client timeout, so a
+losing attempt is abandoned and stops at that bound at the latest; attempts
+that have not started yet are cancelled outright. If nothing valid arrives
+before the deadline, APIError is raised.
+
+Callers that pay per attempt pass ``reserve`` and ``settle``. ``reserve``
+admits every attempt, the hedge included, before it is issued; a hedge that
+cannot be admitted is skipped and the call keeps waiting on the attempts it
+has. ``settle`` runs when each attempt finishes, so an abandoned attempt that
+still completes is accounted for with its own response.
+"""
+
+import threading
+import time
+from collections import deque
+from concurrent.futures import FIRST_COMPLETED, Future, ThreadPoolExecutor, wait
+from typing import Any, Callable, Deque, Dict, List, Optional, Tuple
+
+from ai_decision_assistant.utils.exceptions import APIError, BudgetExceededError
+
+
+class LatencyTracker:
+    """Rolling window of observed call latencies"""
+
+    def __init__(self, window: int = 200):
+        self._samples: Deque[float] = deque(maxlen=window)
+        self._lock = threading.Lock()
+
+    def record(self, seconds: float) -> None:
+        with self._lock:
+            self._samples.append(seconds)
+
+    def __len__(self) -> int:
+        return len(self._samples)
+
+    def percentile(self, fraction: float) -> Optional[float]:
+        with self._lock:
+            if not self._samples:
+                return None
+            ordered = sorted(self._samples)
+        index = min(len(ordered) - 1, int(round(fraction * (len(ordered) - 1))))
+        return ordered[index]
+
+
+class HedgedCaller:
+    """Runs a request with a deadline, hedging slow attempts.
+
+    Args:
+        deadline_seconds: Total time allowed for the call, including hedges.
+        hedge_percentile: Observed-latency percentile after which a hedge is issued.
+        initial_hedge_delay: Hedge delay used until ``min_samples`` latencies are known.
+        min_samples: Observations needed before the percentile is trusted.
+        max_hedges: Extra attempts allowed per call.
+        fallback_model: Model used for hedged attempts (defaults to the request's model).
+        max_workers: Threads shared by all in-flight attempts.
+    """
+
+    def __init__(self, deadline_seconds: float = 60.0, hedge_percentile: float = 0.95,
+                 initial_hedge_delay: float = 20.0, min_samples: int = 20, max_hedges: int = 1,
+                 fallback_model: Optional[str] = None, max_workers: int = 32):
+        self.deadline_seconds = deadline_seconds
+        self.hedge_percentile = hedge_percentile
+        self.initial_hedge_delay = initial_hedge_delay
+        self.min_samples = min_samples
+        self.max_hedges = max_hedges
+        self.fallback_model = fallback_model
+        self.latencies = LatencyTracker()
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="hedged-call")
+
+    def hedge_delay(self) -> float:
+        if len(self.latencies) < self.min_samples:
+            return self.initial_hedge_delay
+        return self.latencies.percentile(self.hedge_percentile)
+
+    def _attempt(self, create: Callable[..., Any], request: Dict[str, Any], timeout: float) -> Tuple[Any, float]:
+        started = time.perf_counter()
+        response = create(timeout=timeout, **request)
+        latency = time.perf_counter() - started
+        # Abandoned attempts still count, so the tail stays visible to the tracker
+        self.latencies.record(latency)
+        return response, latency
+
+    def call(self, create: Callable[..., Any], request: Dict[str, Any],
+             validate: Callable[[Any], bool] = lambda response: True,
+             reserve: Optional[Callable[[str], Tuple[Any, str]]] = None,
+             settle: Optional[Callable[[Any, str, Optional[Any]], None]] = None) -> Tuple[Any, bool]:
+        """Return (first valid response, whether it came from a hedged attempt).
+
+        ``reserve(model)`` returns (ticket, model to use) or raises BudgetExceededError;
+        ``settle(ticket, model, response)`` gets None for attempts that failed or never ran.
+        """
+        deadline = time.monotonic() + self.deadline_seconds
+        attempts: List[Future] = []
+        hedged: Dict[Future, bool] = {}
+        errors: List[BaseException] = []
+        refused = False
+
+        def launch(is_hedge: bool) -> bool:
+            nonlocal refused
+            attempt_request = dict(request)
+            if is_hedge and self.fallback_model:
+                attempt_request["model"] = self.fallback_model
+            ticket = None
+            if reserve is not None:
+                try:
+                    ticket, attempt_request["model"] = reserve(attempt_request["model"])
+                except BudgetExceededError as e:
+                    if not is_hedge:
+                        raise
+                    refused = True
+                    errors.append(e)
+                    return False
+            future = self._executor.submit(self._attempt, create, attempt_request, max(0.1, deadline - time.monotonic()))
+            if settle is not None:
+                future.add_done_callback(lambda done, ticket=ticket, model=attempt_request["model"]: settle(
+                    ticket, model, None if done.cancelled() or done.exception() else done.result()[0]))
+            attempts.append(future)
+            hedged[future] = is_hedge
+            return True
+
+        launch(False)
+        next_hedge_at = time.monotonic() + self.hedge_delay()
+        pending = set(attempts)
+        try:
+            while True:
+                now = time.monotonic()
+                if now >= deadline:
+                    raise APIError(f"Model call exceeded its {self.deadline_seconds:.0f}s deadline")
+                can_hedge = len(attempts) <= self.max_hedges and not refused
+                wake_at = min(deadline, next_hedge_at) if can_hedge else deadline
+                done, pending = wait(pending, timeout=max(0.0, wake_at - now), return_when=FIRST_COMPLETED)
+
+                for future in done:
+                    try:
+                        response, _ = future.result()
+                    except Exception as e:
+                        errors.append(e)
+                        continue
+                    if validate(response):
+                        return response, hedged[future]
+                    errors.append(ValueError("Model returned an invalid response"))
+
+                if can_hedge and (time.monotonic() >= next_hedge_at or not pending) and launch(True):
+                    # Hedge a slow attempt, or retry at once when every attempt has failed
+                    pending.add(attempts[-1])
+                    next_hedge_at = time.monotonic() + self.hedge_delay()
+                elif not pending:
+                    raise APIError(f"All {len(attempts)} model attempts failed: {errors[-1]}") from errors[-1]
+        finally:
+            for future in attempts:
+                future.cancel()
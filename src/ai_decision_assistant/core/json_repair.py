@@ -0,0 +1,207 @@
+"""Tolerant parsing of model output into a DecisionAnalysis.
+
+Model output is occasionally almost-JSON: cut off at ``max_tokens``, wrapped
+in a Markdown fence, with trailing commas or with unescaped quotes inside
+strings. ``repair_json`` fixes those defects in a single pass over the
+text. ``salvage_analysis`` then validates every decision, assumption and
+risk on its own, keeping the valid items and reporting the rest as
+DroppedItem entries, so one bad item no longer costs the whole analysis.
+"""
+
+import json
+from typing import Any, Callable, Dict, List, Optional, Tuple, Type
+
+from pydantic import BaseModel, ValidationError
+
+from ai_decision_assistant.core.models import Assumption, Decision, DecisionAnalysis, DroppedItem, Risk
+
+# Item lists validated one element at a time
+ITEM_MODELS: Dict[str, Type[BaseModel]] = {
+    "decisions": Decision,
+    "assumptions": Assumption,
+    "risks": Risk,
+}
+STRING_LISTS = ("open_questions", "scale_concerns")
+REQUIRED_TEXT = ("human_must_decide", "why_human")
+MISSING_TEXT = "Not provided by the model - human review required"
+
+_CLOSERS = {"{": "}", "[": "]"}
+_VALUE_START = set('"{[-0123456789tfn')
+
+
+def _next_significant(text: str, index: int) -> Tuple[str, int]:
+    """First non-whitespace character at or after index ('' at the end) and its position"""
+    n = len(text)
+    while index < n and text[index] in " \t\r\n":
+        index += 1
+    return (text[index] if index < n else ""), index
+
+
+def _closes_string(text: str, index: int, in_object: bool) -> bool:
+    """Whether the quote at index ends the current string rather than sitting inside it"""
+    following, position = _next_significant(text, index + 1)
+    if following in ("", ":", "}", "]"):
+        return True
+    if following == ",":
+        # A real separator is followed by the next key (objects) or value (arrays)
+        after, _ = _next_significant(text, position + 1)
+        return after == "" or (after in '"}' if in_object else after in _VALUE_START or after == "]")
+    return False
+
+
+def _strip_fence(text: str) -> str:
+    text = text.strip()
+    if text.startswith("```"):
+        text = text.split("\n", 1)[1] if "\n" in text else ""
+        if text.rstrip().endswith("```"):
+            text = text.rstrip()[:-3]
+    return text
+
+
+def repair_json(text: str) -> str:
+    """Return a parseable version of almost-JSON text.
+
+    Handles Markdown fences, text around the JSON, trailing commas, raw
+    control characters and unescaped quotes in strings, and truncation (the
+    incomplete tail is cut back to the last complete value and open
+    brackets are closed). Raises ValueError if there is no JSON at all.
+    """
+    text = _strip_fence(text)
+    starts = [i for i in (text.find("{"), text.find("[")) if i >= 0]
+    if not starts:
+        raise ValueError("No JSON object in model output")
+
+    out: List[str] = []
+    stack: List[str] = []
+    # Last position where the output was a complete prefix: (length of out, open brackets)
+    safe = (0, [])
+    in_string = escape = False
+
+    for i in range(min(starts), len(text)):
+        c = text[i]
+        if in_string:
+            if escape:
+                escape = False
+                out.append(c)
+            elif c == "\\":
+                escape = True
+                out.append(c)
+            elif c == '"':
+                if _closes_string(text, i, bool(stack) and stack[-1] == "{"):
+                    in_string = False
+                    out.append(c)
+                else:
+                    out.append('\\"')
+            elif c == "\n":
+                out.append("\\n")
+            elif c < " ":
+                out.append(f"\\u{ord(c):04x}")
+            else:
+                out.append(c)
+            continue
+
+        if c == '"':
+            in_string = True
+            out.append(c)
+        elif c in _CLOSERS:
+            stack.append(c)
+            out.append(c)
+            safe = (len(out), list(stack))
+        elif c in "}]":
+            if not stack:
+                break
+            while out and out[-1] in (" ", "\t", "\r", "\n", ","):
+                out.pop()
+            out.append(_CLOSERS[stack.pop()])
+            safe = (len(out), list(stack))
+            if not stack:
+                return "".join(out)
+        elif c == ",":
+            safe = (len(out), list(stack))
+            out.append(c)
+        else:
+            out.append(c)
+
+    # Truncated: drop the incomplete tail and close whatever is still open
+    length, stack = safe
+    out = out[:length]
+    while out and out[-1] in (" ", "\t", "\r", "\n", ","):
+        out.pop()
+    out.extend(_CLOSERS[opener] for opener in reversed(stack))
+    return "".join(out)
+
+
+def field_keys(field: str) -> List[str]:
+    """Keys a top-level analysis field may appear under (full name, compact wire key)"""
+    alias = DecisionAnalysis.model_fields[field].validation_alias
+    return list(getattr(alias, "choices", [field]))
+
+
+def _raw_field(raw: Dict[str, Any], field: str, default: Any = None) -> Any:
+    for key in field_keys(field):
+        if key in raw:
+            return raw[key]
+    return default
+
+
+def _error_summary(error: ValidationError) -> List[str]:
+    return [
+        f"{'.'.join(str(part) for part in detail['loc']) or 'value'}: {detail['msg']}"
+        for detail in error.errors()
+    ]
+
+
+def salvage_analysis(content: str, prepare: Optional[Callable[[Dict[str, Any]], None]] = None
+                     ) -> Tuple[Dict[str, Any], List[DroppedItem], bool]:
+    """Parse model output leniently.
+
+    ``prepare`` may rewrite the parsed JSON in place before validation (e.g.
+    resolving evidence references). Returns (analysis fields holding only
+    valid items, dropped items, whether the text needed repair). Raises
+    ValueError when nothing can be recovered.
+    """
+    try:
+        raw = json.loads(content)
+        repaired = False
+    except ValueError:
+        raw = json.loads(repair_json(content))
+        repaired = True
+    if not isinstance(raw, dict):
+        raise ValueError("Model output is not a JSON object")
+    if not any(key in raw for field in (*ITEM_MODELS, *STRING_LISTS, *REQUIRED_TEXT) for key in field_keys(field)):
+        raise ValueError("No analysis fields could be recovered from model output")
+    if prepare is not None:
+        prepare(raw)
+
+    result: Dict[str, Any] = {}
+    dropped: List[DroppedItem] = []
+
+    for field, model in ITEM_MODELS.items():
+        items = _raw_field(raw, field, [])
+        if not isinstance(items, list):
+            dropped.append(DroppedItem(field=field, errors=["expected a list"], fragment=json.dumps(items)))
+            items = []
+        kept = []
+        for index, item in enumerate(items):
+            try:
+                kept.append(model.model_validate(item).model_dump(mode="json", exclude_none=True))
+            except ValidationError as e:
+                dropped.append(DroppedItem(field=field, index=index, errors=_error_summary(e),
+                                           fragment=json.dumps(item, ensure_ascii=False)))
+        result[field] = kept
+
+    for field in STRING_LISTS:
+        items = _raw_field(raw, field, [])
+        items = items if isinstance(items, list) else [items]
+        result[field] = [str(item) for item in items if isinstance(item, (str, int, float)) and str(item).strip()]
+
+    for field in REQUIRED_TEXT:
+        value = _raw_field(raw, field)
+        if isinstance(value, str) and value.strip():
+            result[field] = value
+        else:
+            result[field] = MISSING_TEXT
+            dropped.append(DroppedItem(field=field, errors=[f"{field}: missing or not a string"],
+                                       fragment=json.dumps(value, ensure_ascii=False)))
+
+    return result, dropped, repaired
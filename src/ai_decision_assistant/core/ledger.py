@@ -0,0 +1,219 @@
+"""Token and cost ledger with budget-based admission control.
+
+Every model call is recorded in a local SQLite ledger with its caller,
+model, prompt/completion/cached tokens and estimated cost. Callers are
+strings of the form ``kind:id`` (``ui:<session>``, ``batch:<session>``,
+``cli``, ``worker:<id>``, ``service``).
+
+Before each call the admission controller checks the caller's budget and
+the global budget over a rolling window, counting calls still in flight.
+A call that does not fit is downgraded to a cheaper model if one is
+configured and fits. Otherwise it waits for budget to free up, and it is
+rejected with BudgetExceededError once the wait runs out. Non-interactive
+callers can spend only the part of the global budget not reserved for
+interactive reviewers, so a runaway batch cannot starve the UI.
+"""
+
+import json
+import os
+import sqlite3
+import threading
+import time
+from typing import Any, Dict, List, Optional, Tuple
+
+from ai_decision_assistant.utils.exceptions import BudgetExceededError
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS usage (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    ts REAL NOT NULL,
+    caller TEXT NOT NULL,
+    kind TEXT NOT NULL,
+    model TEXT NOT NULL,
+    purpose TEXT NOT NULL DEFAULT 'analysis',
+    prompt_tokens INTEGER NOT NULL,
+    completion_tokens INTEGER NOT NULL,
+    cached_tokens INTEGER NOT NULL,
+    cost_usd REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS usage_caller ON usage (caller, ts);
+CREATE INDEX IF NOT EXISTS usage_kind ON usage (kind, ts);
+CREATE INDEX IF NOT EXISTS usage_ts ON usage (ts);
+"""
+
+# USD per million tokens: (prompt, cached prompt, completion)
+DEFAULT_PRICES: Dict[str, Tuple[float, float, float]] = {
+    "gpt-4": (30.0, 30.0, 60.0),
+    "gpt-4-turbo": (10.0, 10.0, 30.0),
+    "gpt-4o": (2.5, 1.25, 10.0),
+    "gpt-4o-mini": (0.15, 0.075, 0.6),
+    "gpt-3.5-turbo": (0.5, 0.5, 1.5),
+}
+
+INTERACTIVE_KINDS = ("ui", "cli")
+
+
+def caller_kind(caller: str) -> str:
+    return caller.split(":", 1)[0]
+
+
+class UsageLedger:
+    """SQLite record of model usage and cost; opened lazily per process like JobQueue"""
+
+    def __init__(self, path: str, prices: Optional[Dict[str, Tuple[float, float, float]]] = None):
+        self.path = path
+        self.prices = dict(DEFAULT_PRICES, **(prices or {}))
+        self._conn: Optional[sqlite3.Connection] = None
+        self._pid: Optional[int] = None
+        self._lock = threading.Lock()
+
+    @property
+    def conn(self) -> sqlite3.Connection:
+        if self._conn is None or self._pid != os.getpid():
+            self._conn = sqlite3.connect(self.path, timeout=30.0, isolation_level=None, check_same_thread=False)
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.execute("PRAGMA synchronous=NORMAL")
+            self._conn.executescript(SCHEMA)
+            self._pid = os.getpid()
+        return self._conn
+
+    def price(self, model: str) -> Tuple[float, float, float]:
+        """Prices of a model, matching dated snapshots (gpt-4o-2024-08-06) by their longest known prefix"""
+        if model in self.prices:
+            return self.prices[model]
+        prefixes = [name for name in self.prices if model.startswith(name)]
+        return self.prices[max(prefixes, key=len)] if prefixes else self.prices["gpt-4"]
+
+    def cost(self, model: str, prompt_tokens: int, completion_tokens: int, cached_tokens: int = 0) -> float:
+        prompt, cached, completion = self.price(model)
+        uncached = max(0, prompt_tokens - cached_tokens)
+        return (uncached * prompt + cached_tokens * cached + completion_tokens * completion) / 1_000_000
+
+    def record(self, caller: str, model: str, usage: Dict[str, int], purpose: str = "analysis") -> float:
+        """Store one call's usage; returns its estimated cost in USD"""
+        cost = self.cost(model, usage.get("prompt_tokens", 0), usage.get("completion_tokens", 0),
+                         usage.get("cached_tokens", 0))
+        with self._lock:
+            self.conn.execute(
+                "INSERT INTO usage (ts, caller, kind, model, purpose, prompt_tokens, completion_tokens,"
+                " cached_tokens, cost_usd) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                (time.time(), caller, caller_kind(caller), model, purpose, usage.get("prompt_tokens", 0),
+                 usage.get("completion_tokens", 0), usage.get("cached_tokens", 0), cost),
+            )
+        return cost
+
+    def spent(self, since: float, caller: Optional[str] = None, kinds: Optional[Tuple[str, ...]] = None) -> float:
+        """Cost since a timestamp, for one caller, some caller kinds, or everyone"""
+        query, params = "SELECT COALESCE(SUM(cost_usd), 0) FROM usage WHERE ts >= ?", [since]
+        if caller is not None:
+            query += " AND caller = ?"
+            params.append(caller)
+        if kinds is not None:
+            query += f" AND kind IN ({','.join('?' * len(kinds))})"
+            params.extend(kinds)
+        with self._lock:
+            return self.conn.execute(query, params).fetchone()[0]
+
+    def summary(self, since: float = 0.0, group_by: str = "caller") -> List[Dict[str, Any]]:
+        """Calls, tokens and cost per caller, kind or model since a timestamp"""
+        if group_by not in ("caller", "kind", "model"):
+            raise ValueError(f"Cannot group usage by {group_by}")
+        with self._lock:
+            rows = self.conn.execute(
+                f"SELECT {group_by}, COUNT(*), SUM(prompt_tokens), SUM(completion_tokens), SUM(cached_tokens),"
+                f" SUM(cost_usd) FROM usage WHERE ts >= ? GROUP BY {group_by} ORDER BY SUM(cost_usd) DESC",
+                (since,),
+            ).fetchall()
+        return [
+            {group_by: row[0], "calls": row[1], "prompt_tokens": row[2], "completion_tokens": row[3],
+             "cached_tokens": row[4], "cost_usd": row[5]}
+            for row in rows
+        ]
+
+
+class AdmissionController:
+    """Budget checks before each model call.
+
+    Args:
+        ledger: Where usage is recorded and spend is read from.
+        global_budget: USD per window across all callers (None for unlimited).
+        caller_budgets: USD per window for each caller, keyed by exact caller, caller kind or "*".
+        window_seconds: Length of the rolling budget window.
+        interactive_reserve: Share of the global budget only interactive callers may use.
+        downgrade_model: Cheaper model used when the requested one does not fit.
+        max_wait_seconds: How long a call waits for budget before it is rejected.
+    """
+
+    def __init__(self, ledger: UsageLedger, global_budget: Optional[float] = None,
+                 caller_budgets: Optional[Dict[str, float]] = None, window_seconds: float = 86400.0,
+                 interactive_reserve: float = 0.2, downgrade_model: Optional[str] = None,
+                 max_wait_seconds: float = 0.0, poll_seconds: float = 1.0):
+        self.ledger = ledger
+        self.global_budget = global_budget
+        self.caller_budgets = caller_budgets or {}
+        self.window_seconds = window_seconds
+        self.interactive_reserve = interactive_reserve
+        self.downgrade_model = downgrade_model
+        self.max_wait_seconds = max_wait_seconds
+        self.poll_seconds = poll_seconds
+        # Estimated cost of admitted calls not yet recorded: (caller, cost)
+        self._in_flight: Dict[int, Tuple[str, float]] = {}
+        self._tickets = 0
+        self._released = threading.Condition()
+
+    def caller_budget(self, caller: str) -> Optional[float]:
+        for key in (caller, caller_kind(caller), "*"):
+            if key in self.caller_budgets:
+                return self.caller_budgets[key]
+        return None
+
+    def _fits(self, caller: str, cost: float) -> bool:
+        since = time.time() - self.window_seconds
+        pending = list(self._in_flight.values())
+        limit = self.caller_budget(caller)
+        if limit is not None:
+            used = self.ledger.spent(since, caller=caller) + sum(c for who, c in pending if who == caller)
+            if used + cost > limit:
+                return False
+        if self.global_budget is not None:
+            total = self.ledger.spent(since)
+            if total + sum(c for _, c in pending) + cost > self.global_budget:
+                return False
+            if caller_kind(caller) not in INTERACTIVE_KINDS:
+                background = total - self.ledger.spent(since, kinds=INTERACTIVE_KINDS)
+                background += sum(c for who, c in pending if caller_kind(who) not in INTERACTIVE_KINDS)
+                if background + cost > self.global_budget * (1 - self.interactive_reserve):
+                    return False
+        return True
+
+    def admit(self, caller: str, model: str, prompt_tokens: int, completion_tokens: int) -> Tuple[int, str]:
+        """Reserve budget for a call; returns (ticket, model to use) or raises BudgetExceededError"""
+        deadline = time.time() + self.max_wait_seconds
+        candidates = [model] + ([self.downgrade_model] if self.downgrade_model and self.downgrade_model != model else [])
+        with self._released:
+            while True:
+                for candidate in candidates:
+                    cost = self.ledger.cost(candidate, prompt_tokens, completion_tokens)
+                    if self._fits(caller, cost):
+                        self._tickets += 1
+                        self._in_flight[self._tickets] = (caller, cost)
+                        return self._tickets, candidate
+                remaining = deadline - time.time()
+                if remaining <= 0:
+                    raise BudgetExceededError(f"Budget exhausted for {caller} (window {self.window_seconds:.0f}s)")
+                self._released.wait(min(remaining, self.poll_seconds))
+
+    def release(self, ticket: int, caller: str, model: str, usage: Optional[Dict[str, int]],
+                purpose: str = "analysis") -> float:
+        """Record the actual usage of an admitted call and free its reservation; returns its cost"""
+        try:
+            return self.ledger.record(caller, model, usage, purpose) if usage is not None else 0.0
+        finally:
+            with self._released:
+                self._in_flight.pop(ticket, None)
+                self._released.notify_all()
+
+
+def load_prices(text: Optional[str]) -> Dict[str, Tuple[float, float, float]]:
+    """Price overrides from JSON: {"model": [prompt, cached, completion]} in USD per million tokens"""
+    return {model: tuple(values) for model, values in json.loads(text).items()} if text else {}
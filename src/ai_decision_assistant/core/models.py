@@ -1,5 +1,5 @@
-from pydantic import BaseModel, Field
-from typing import List, Literal
+from pydantic import AliasChoices, BaseModel, Field, field_validator
+from typing import List, Literal, Optional
 from enum import Enum
 
 class DecisionStatus(str, Enum):
@@ -12,31 +12,87 @@ class RiskSeverity(str, Enum):
     MEDIUM = "medium" 
     HIGH = "high"
 
+# One-letter codes accepted for enums in the compact wire schema
+STATUS_CODES = {"p": "proposed", "c": "confirmed", "u": "unclear"}
+SEVERITY_CODES = {"l": "low", "m": "medium", "h": "high"}
+
+def wire(name: str, short: str) -> AliasChoices:
+    """Accept a field under its full name or its compact wire key"""
+    return AliasChoices(name, short)
+
+class EvidenceSpan(BaseModel):
+    ref: str = Field(description="Line reference cited by the model, e.g. 'L12-L14'")
+    start: int = Field(description="Character offset of the evidence in the conversation")
+    end: int = Field(description="Character offset just past the evidence")
+    text: str = Field(description="Conversation text at those offsets")
+
 class Decision(BaseModel):
-    decision: str = Field(description="The specific decision made or proposed")
-    status: DecisionStatus = Field(description="Current status of the decision")
-    evidence_quotes: List[str] = Field(description="Direct quotes from conversation supporting this decision")
-    owner: str = Field(description="Person responsible for the decision or 'unknown'")
-    deadline: str = Field(description="Timeline for implementation or 'unknown'")
-    confidence: float = Field(ge=0.0, le=1.0, description="AI confidence in extraction accuracy")
+    decision: str = Field(validation_alias=wire("decision", "t"), description="The specific decision made or proposed")
+    status: DecisionStatus = Field(validation_alias=wire("status", "st"), description="Current status of the decision")
+    evidence_quotes: List[str] = Field(validation_alias=wire("evidence_quotes", "eq"), description="Direct quotes from conversation supporting this decision")
+    owner: str = Field(validation_alias=wire("owner", "o"), description="Person responsible for the decision or 'unknown'")
+    deadline: str = Field(validation_alias=wire("deadline", "dl"), description="Timeline for implementation or 'unknown'")
+    confidence: float = Field(ge=0.0, le=1.0, validation_alias=wire("confidence", "cf"), description="AI confidence in extraction accuracy")
+    canonical_id: Optional[str] = Field(default=None, description="ID shared by equivalent decisions across threads")
+    evidence_spans: List[EvidenceSpan] = Field(default_factory=list, description="Resolved locations of line-referenced evidence")
+    
+    @field_validator("status", mode="before")
+    @classmethod
+    def _expand_status_code(cls, value):
+        return STATUS_CODES.get(value, value) if isinstance(value, str) else value
 
 class Assumption(BaseModel):
-    assumption: str = Field(description="Key assumption being made")
-    risk_if_wrong: str = Field(description="Potential impact if assumption proves incorrect")
+    assumption: str = Field(validation_alias=wire("assumption", "t"), description="Key assumption being made")
+    risk_if_wrong: str = Field(validation_alias=wire("risk_if_wrong", "rw"), description="Potential impact if assumption proves incorrect")
 
 class Risk(BaseModel):
-    risk: str = Field(description="Identified risk or concern")
-    severity: RiskSeverity = Field(description="Risk severity level")
-    mitigation: str = Field(description="Suggested mitigation approach")
+    risk: str = Field(validation_alias=wire("risk", "t"), description="Identified risk or concern")
+    severity: RiskSeverity = Field(validation_alias=wire("severity", "sv"), description="Risk severity level")
+    mitigation: str = Field(validation_alias=wire("mitigation", "m"), description="Suggested mitigation approach")
+    
+    @field_validator("severity", mode="before")
+    @classmethod
+    def _expand_severity_code(cls, value):
+        return SEVERITY_CODES.get(value, value) if isinstance(value, str) else value
+
+class DroppedItem(BaseModel):
+    field: str = Field(description="Analysis field the item belonged to")
+    index: Optional[int] = Field(default=None, description="Position within a list field")
+    errors: List[str] = Field(default_factory=list, description="Validation errors that caused the drop")
+    fragment: str = Field(default="", description="Raw JSON of the dropped value")
+
+class AnalysisMetadata(BaseModel):
+    prompt_version: str = Field(default="", description="Prompt template version used for the call")
+    model: str = Field(default="", description="Model that produced the analysis")
+    prompt_tokens: int = Field(default=0, description="Prompt tokens billed for the call")
+    completion_tokens: int = Field(default=0, description="Completion tokens billed for the call")
+    cached_tokens: int = Field(default=0, description="Prompt tokens served from the provider prompt cache")
+    latency_seconds: float = Field(default=0.0, description="Wall-clock time spent waiting for the model")
+    hedged: bool = Field(default=False, description="Whether the result came from a hedged duplicate request")
+    consistency_samples: int = Field(default=0, description="Self-consistency samples that decision confidence was derived from")
+    consistency_cancelled: int = Field(default=0, description="Samples cancelled or abandoned once agreement was decisive")
+    redacted_items: int = Field(default=0, description="Distinct PII values replaced with placeholders before the call")
+    normalized_tokens: int = Field(default=0, description="Estimated tokens of the conversation after normalization")
+    normalized_tokens_saved: int = Field(default=0, description="Estimated tokens removed as quoted history, signatures and disclaimers")
+    cost_usd: float = Field(default=0.0, description="Estimated cost of the calls in USD, when the usage ledger is enabled")
+    near_duplicate_of: str = Field(default="", description="Key of the prior analysis reused or given as context")
+    near_duplicate_similarity: float = Field(default=0.0, description="Estimated similarity to that prior conversation")
+    repaired: bool = Field(default=False, description="Whether malformed JSON output had to be repaired")
+    dropped_items: List[DroppedItem] = Field(default_factory=list, description="Items discarded because they failed validation")
+    repaired_items: List[str] = Field(default_factory=list, description="Items corrected by a targeted re-ask")
+    repair_prompt_tokens: int = Field(default=0, description="Prompt tokens spent on targeted re-asks")
+    repair_completion_tokens: int = Field(default=0, description="Completion tokens spent on targeted re-asks")
+    derived_view: bool = Field(default=False, description="High-stakes view derived locally from a dual-view call")
 
 class DecisionAnalysis(BaseModel):
-    decisions: List[Decision] = Field(description="Extracted decisions from conversation")
-    assumptions: List[Assumption] = Field(description="Key assumptions identified")
-    risks: List[Risk] = Field(description="Risks and concerns surfaced")
-    open_questions: List[str] = Field(description="Unresolved questions requiring follow-up")
-    human_must_decide: str = Field(description="Critical decision that requires human judgment")
-    why_human: str = Field(description="Explanation of why this decision must remain human")
-    scale_concerns: List[str] = Field(description="What would break first if scaling this process")
+    decisions: List[Decision] = Field(validation_alias=wire("decisions", "d"), description="Extracted decisions from conversation")
+    assumptions: List[Assumption] = Field(validation_alias=wire("assumptions", "a"), description="Key assumptions identified")
+    risks: List[Risk] = Field(validation_alias=wire("risks", "r"), description="Risks and concerns surfaced")
+    open_questions: List[str] = Field(validation_alias=wire("open_questions", "q"), description="Unresolved questions requiring follow-up")
+    human_must_decide: str = Field(validation_alias=wire("human_must_decide", "h"), description="Critical decision that requires human judgment")
+    why_human: str = Field(validation_alias=wire("why_human", "w"), description="Explanation of why this decision must remain human")
+    scale_concerns: List[str] = Field(validation_alias=wire("scale_concerns", "s"), description="What would break first if scaling this process")
+    metadata: Optional[AnalysisMetadata] = Field(default=None, description="Call details recorded locally, not produced by the model")
     
 class HumanApproval(BaseModel):
     decision_index: int
@@ -0,0 +1,255 @@
+"""Near-duplicate conversation detection with MinHash and LSH banding.
+
+Forwarded emails and cross-posted threads differ in headers, quoting and
+whitespace but carry the same decisions. Conversations are normalized,
+shingled into word n-grams and summarized by MinHash signatures; LSH banding
+then finds candidate prior analyses without comparing against every entry.
+
+Similarity is an estimate, and a near-duplicate can differ in the one fact
+that matters ("$5K" vs "$10K"), so by default only an exact copy of an
+analyzed conversation is reused; near-duplicates are offered to the model as
+context. The index keeps at most ``max_entries`` analyses, evicting the least
+recently used.
+"""
+
+import hashlib
+import re
+import threading
+import zlib
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Dict, List, Optional, Sequence, Set, Tuple
+
+import numpy as np
+
+from ai_decision_assistant.core.models import DecisionAnalysis
+
+_MERSENNE_PRIME = np.uint64((1 << 61) - 1)
+_MAX_HASH = np.uint64((1 << 32) - 1)
+
+_HEADER_LINE = re.compile(r"^\s*(from|to|cc|bcc|sent|date|subject|reply)\s*:.*$", re.IGNORECASE | re.MULTILINE)
+_FORWARD_MARKERS = re.compile(r"^\s*(-+\s*(forwarded|original) message\s*-+|(fwd?|re)\s*:)", re.IGNORECASE | re.MULTILINE)
+_QUOTE_PREFIX = re.compile(r"^[\s>]+", re.MULTILINE)
+_NON_WORD = re.compile(r"[^\w$%.]+")
+
+
+def normalize_conversation(conversation: str) -> str:
+    """Reduce a thread to lowercase words, dropping headers, quote markers and punctuation"""
+    text = _QUOTE_PREFIX.sub("", conversation)
+    text = _FORWARD_MARKERS.sub(" ", text)
+    text = _HEADER_LINE.sub(" ", text)
+    text = _NON_WORD.sub(" ", text.lower())
+    return " ".join(text.split())
+
+
+def shingle_hashes(normalized: str, shingle_size: int = 3) -> np.ndarray:
+    """32-bit hashes of the distinct word n-grams of a normalized text"""
+    words = normalized.split()
+    if len(words) < shingle_size:
+        grams: Set[str] = {" ".join(words)} if words else set()
+    else:
+        grams = {" ".join(words[i:i + shingle_size]) for i in range(len(words) - shingle_size + 1)}
+    return np.fromiter((zlib.crc32(g.encode("utf-8")) for g in grams), dtype=np.uint64, count=len(grams))
+
+
+def optimal_bands(num_perm: int, threshold: float, false_negative_weight: float = 0.5) -> Tuple[int, int]:
+    """Pick (bands, rows) minimizing weighted false positive/negative probability mass.
+
+    Raising ``false_negative_weight`` favours recall (more candidates checked),
+    lowering it favours precision (fewer candidates, more misses near the threshold).
+    """
+    xs = np.linspace(0.0, 1.0, 201)
+    best, best_error = (num_perm, 1), float("inf")
+    for bands in range(1, num_perm + 1):
+        rows = num_perm // bands
+        if rows == 0:
+            break
+        candidate_prob = 1.0 - (1.0 - xs ** rows) ** bands
+        false_pos = np.where(xs < threshold, candidate_prob, 0.0).mean()
+        false_neg = np.where(xs >= threshold, 1.0 - candidate_prob, 0.0).mean()
+        error = (1.0 - false_negative_weight) * false_pos + false_negative_weight * false_neg
+        if error < best_error:
+            best, best_error = (bands, rows), error
+    return best
+
+
+class MinHasher:
+    """Computes MinHash signatures with universal hashing over 32-bit shingle hashes"""
+
+    def __init__(self, num_perm: int = 128, seed: int = 1):
+        rng = np.random.RandomState(seed)
+        # Coefficients below 2**31 keep a * h + b within uint64 for 32-bit h
+        self.a = rng.randint(1, 1 << 31, size=num_perm).astype(np.uint64)
+        self.b = rng.randint(0, 1 << 31, size=num_perm).astype(np.uint64)
+        self.num_perm = num_perm
+
+    def signature(self, hashes: np.ndarray) -> np.ndarray:
+        if hashes.size == 0:
+            return np.full(self.num_perm, _MAX_HASH, dtype=np.uint64)
+        permuted = (np.outer(self.a, hashes) + self.b[:, None]) % _MERSENNE_PRIME
+        return (permuted & _MAX_HASH).min(axis=1)
+
+
+@dataclass
+class NearDuplicateMatch:
+    """A prior analysis whose conversation resembles the query"""
+    key: str
+    similarity: float
+    analysis: DecisionAnalysis
+    high_stakes_mode: bool
+    # The query is a verbatim copy of the indexed conversation
+    exact: bool = False
+    # Person names redacted from the indexed conversation; None when it was not redacted
+    names: Optional[Tuple[str, ...]] = None
+
+
+@dataclass
+class _Entry:
+    signature: np.ndarray
+    analysis: DecisionAnalysis
+    high_stakes_mode: bool
+    exact_key: str
+    content_key: str
+    names: Optional[Tuple[str, ...]] = None
+    # Approximate memory held by the entry
+    size: int = 0
+
+
+class NearDuplicateIndex:
+    """In-memory MinHash/LSH index of analyzed conversations.
+
+    Args:
+        threshold: Estimated Jaccard similarity above which a prior analysis is
+            returned as a match (and offered to the model as context).
+        reuse_threshold: Similarity above which a prior analysis is reused
+            outright instead of calling the model; None reuses exact copies only.
+        max_entries: Analyses kept before the least recently used is evicted.
+        max_bytes: Optional bound on the approximate memory of the kept analyses.
+        num_perm: Signature length; larger is more accurate and slower.
+        false_negative_weight: Recall/precision tradeoff used to pick the
+            LSH banding when ``bands`` is not given.
+        bands: Explicit number of LSH bands (rows = num_perm // bands).
+        shingle_size: Words per shingle.
+    """
+
+    def __init__(self, threshold: float = 0.7, reuse_threshold: Optional[float] = None, num_perm: int = 128,
+                 false_negative_weight: float = 0.5, bands: Optional[int] = None, shingle_size: int = 3,
+                 max_entries: int = 1000, max_bytes: Optional[int] = None):
+        if not 0.0 < threshold <= (1.0 if reuse_threshold is None else reuse_threshold) <= 1.0:
+            raise ValueError("Expected 0 < threshold <= reuse_threshold <= 1")
+        self.threshold = threshold
+        self.reuse_threshold = reuse_threshold
+        self.max_entries = max(1, max_entries)
+        self.max_bytes = max_bytes
+        self._bytes = 0
+        self.shingle_size = shingle_size
+        self.hasher = MinHasher(num_perm)
+        if bands is None:
+            self.bands, self.rows = optimal_bands(num_perm, threshold, false_negative_weight)
+        else:
+            self.bands, self.rows = bands, num_perm // bands
+        self._buckets: List[Dict[bytes, List[str]]] = [{} for _ in range(self.bands)]
+        self._entries: "OrderedDict[str, _Entry]" = OrderedDict()
+        self._exact: Dict[str, str] = {}
+        self._content: Dict[str, str] = {}
+        self._lock = threading.Lock()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    @property
+    def memory_bytes(self) -> int:
+        """Approximate memory held by the indexed analyses"""
+        return self._bytes
+
+    def _signature(self, normalized: str) -> np.ndarray:
+        return self.hasher.signature(shingle_hashes(normalized, self.shingle_size))
+
+    def _band_keys(self, signature: np.ndarray) -> List[bytes]:
+        return [signature[i * self.rows:(i + 1) * self.rows].tobytes() for i in range(self.bands)]
+
+    @staticmethod
+    def _exact_key(text: str, high_stakes_mode: bool) -> str:
+        return hashlib.sha256(f"{int(high_stakes_mode)}:{text}".encode("utf-8")).hexdigest()
+
+    def add(self, key: str, conversation: str, analysis: DecisionAnalysis, high_stakes_mode: bool = False,
+            names: Optional[Sequence[str]] = None) -> None:
+        """Index an analyzed conversation under a caller-chosen key, with the person names redacted from it"""
+        normalized = normalize_conversation(conversation)
+        signature = self._signature(normalized)
+        exact_key = self._exact_key(normalized, high_stakes_mode)
+        content_key = self._exact_key(conversation, high_stakes_mode)
+        size = signature.nbytes + len(analysis.model_dump_json()) + sum(len(name) for name in names or ())
+        with self._lock:
+            if key in self._entries:
+                self._entries.move_to_end(key)
+                return
+            self._entries[key] = _Entry(signature, analysis, high_stakes_mode, exact_key, content_key,
+                                        None if names is None else tuple(names), size)
+            self._bytes += size
+            self._exact[exact_key] = key
+            self._content[content_key] = key
+            for bucket, band_key in zip(self._buckets, self._band_keys(signature)):
+                bucket.setdefault(band_key, []).append(key)
+            while len(self._entries) > self.max_entries or (
+                    self.max_bytes is not None and self._bytes > self.max_bytes and len(self._entries) > 1):
+                self._evict(*self._entries.popitem(last=False))
+
+    def _evict(self, key: str, entry: _Entry) -> None:
+        self._bytes -= entry.size
+        if self._exact.get(entry.exact_key) == key:
+            del self._exact[entry.exact_key]
+        if self._content.get(entry.content_key) == key:
+            del self._content[entry.content_key]
+        for bucket, band_key in zip(self._buckets, self._band_keys(entry.signature)):
+            keys = bucket.get(band_key, [])
+            if key in keys:
+                keys.remove(key)
+            if not keys:
+                bucket.pop(band_key, None)
+
+    def query(self, conversation: str, high_stakes_mode: Optional[bool] = None) -> List[NearDuplicateMatch]:
+        """Prior analyses at or above ``threshold``, most similar first.
+
+        When ``high_stakes_mode`` is given, only analyses made in that mode match.
+        """
+        normalized = normalize_conversation(conversation)
+        modes = [high_stakes_mode] if high_stakes_mode is not None else [False, True]
+        with self._lock:
+            for mode in modes:
+                for text, exact in ((conversation, True), (normalized, False)):
+                    key = (self._content if exact else self._exact).get(self._exact_key(text, mode))
+                    if key is not None:
+                        self._entries.move_to_end(key)
+                        entry = self._entries[key]
+                        return [NearDuplicateMatch(key, 1.0, entry.analysis, entry.high_stakes_mode, exact, entry.names)]
+
+        signature = self._signature(normalized)
+        with self._lock:
+            candidates: Set[str] = set()
+            for bucket, band_key in zip(self._buckets, self._band_keys(signature)):
+                candidates.update(bucket.get(band_key, ()))
+            entries = [(key, self._entries[key]) for key in candidates]
+            for key in candidates:
+                self._entries.move_to_end(key)
+
+        matches = []
+        for key, entry in entries:
+            if high_stakes_mode is not None and entry.high_stakes_mode != high_stakes_mode:
+                continue
+            similarity = float(np.count_nonzero(entry.signature == signature)) / signature.size
+            if similarity >= self.threshold:
+                matches.append(NearDuplicateMatch(key, similarity, entry.analysis, entry.high_stakes_mode,
+                                                  names=entry.names))
+        matches.sort(key=lambda match: match.similarity, reverse=True)
+        return matches
+
+    def best_match(self, conversation: str, high_stakes_mode: Optional[bool] = None) -> Optional[NearDuplicateMatch]:
+        matches = self.query(conversation, high_stakes_mode)
+        return matches[0] if matches else None
+
+    def reusable(self, match: NearDuplicateMatch, high_stakes_mode: bool) -> bool:
+        """Whether a match may replace a new analysis: same mode, and exact unless reuse_threshold is set"""
+        if match.high_stakes_mode != high_stakes_mode:
+            return False
+        return match.exact or (self.reuse_threshold is not None and match.similarity >= self.reuse_threshold)
@@ -0,0 +1,242 @@
+"""Structure-preserving thread normalization to shrink prompts.
+
+Email threads repeat every earlier message as quoted text and carry
+signatures and legal disclaimers. Unlike ``clean_text``, which collapses
+all whitespace, the normalizer only removes whole lines: what remains are
+original lines, verbatim and in order. Line references, evidence quotes
+and PII redaction (which never spans lines) work on it unchanged, and
+``NormalizedThread.original_ranges`` maps offsets in the normalized text
+back to the original thread.
+
+Four kinds of lines are removed:
+
+- Repeated blocks: runs of ``min_block_lines`` content lines that also
+  occur elsewhere in the thread. Lines are compared ignoring quote markers,
+  case and spacing. Each line is hashed, and windows of line hashes are
+  matched with a polynomial rolling hash. The least quoted, earliest copy of
+  a block is kept, so a quoted reply chain is dropped when the messages it
+  quotes are in the thread and kept when it is their only copy. Message
+  header lines are never part of a block.
+- Reply attributions ("On ... wrote:", "-----Original Message-----" and
+  the header block under it) whose quoted text was dropped.
+- Signatures, from an RFC 3676 "-- " delimiter to the next message or change
+  of quote depth, and "Sent from my ..." lines.
+- Disclaimers: paragraphs with at least ``disclaimer_phrases`` distinct
+  boilerplate phrases.
+
+Token counts are estimated as characters / 4, as for budget admission.
+"""
+
+import bisect
+import hashlib
+import re
+from dataclasses import dataclass, field
+from typing import Dict, List, Tuple
+
+import numpy as np
+from numpy.lib.stride_tricks import sliding_window_view
+
+_QUOTE = re.compile(r"^[ \t]*((?:>[ \t]?)*)")
+_HEADER = re.compile(r"^(From|Sent|To|Cc|Date|Subject):", re.IGNORECASE)
+_ATTRIBUTION = re.compile(
+    r"^[ \t]*(On\b.{0,200}\bwrote:|-{2,}[ \t]*(Original|Forwarded) Message[ \t]*-{2,}|Begin forwarded message:?|_{10,})"
+    r"[ \t]*$", re.IGNORECASE)
+_SIGNATURE = re.compile(r"^--[ \t]?$")
+_MOBILE_FOOTER = re.compile(r"^(Sent from my \w+|Get Outlook for \w+)", re.IGNORECASE)
+_DISCLAIMER = re.compile(
+    r"confidential|privileged|intended recipient|intended (?:solely|only) for|received this (?:e-?mail|message|"
+    r"communication) in error|notify the sender|delete (?:this|the) (?:e-?mail|message)|strictly prohibited|"
+    r"unauthori[sz]ed (?:use|review|disclosure|copying)|virus|no liability", re.IGNORECASE)
+_SPACES = re.compile(r"\s+")
+
+# Rolling hash base; arithmetic wraps modulo 2**64
+_BASE = 1099511628211
+
+
+def estimate_tokens(text: str) -> int:
+    return len(text) // 4
+
+
+def window_hashes(line_hashes: np.ndarray, width: int) -> np.ndarray:
+    """Polynomial hash of every run of ``width`` consecutive line hashes"""
+    if len(line_hashes) < width:
+        return np.zeros(0, dtype=np.uint64)
+    powers = np.array([pow(_BASE, width - 1 - i, 1 << 64) for i in range(width)], dtype=np.uint64)
+    return (sliding_window_view(line_hashes, width) * powers).sum(axis=1, dtype=np.uint64)
+
+
+@dataclass
+class NormalizedThread:
+    text: str
+    original_tokens: int
+    tokens: int
+    removed: Dict[str, int] = field(default_factory=dict)
+    # Offset in the original text of each line of ``text``
+    line_offsets: List[int] = field(default_factory=list)
+
+    def original_ranges(self, start: int, end: int) -> List[Tuple[int, int]]:
+        """Ranges of the original text holding ``text[start:end]``.
+
+        A range is split where lines were removed in between, and each part is
+        trimmed of surrounding whitespace; blank parts are dropped.
+        """
+        starts = [0]
+        for line in self.text.split("\n")[:-1]:
+            starts.append(starts[-1] + len(line) + 1)
+
+        def original(offset: int) -> int:
+            i = bisect.bisect_right(starts, offset) - 1
+            return self.line_offsets[i] + offset - starts[i]
+
+        # Runs of lines that are also consecutive in the original
+        parts: List[List[int]] = []
+        first = bisect.bisect_right(starts, start) - 1
+        for i in range(first, bisect.bisect_right(starts, max(start, end - 1))):
+            line_end = starts[i + 1] - 1 if i + 1 < len(starts) else len(self.text)
+            if parts and self.line_offsets[i] - self.line_offsets[i - 1] == starts[i] - starts[i - 1]:
+                parts[-1][1] = min(end, line_end)
+            else:
+                parts.append([max(start, starts[i]), min(end, line_end)])
+        ranges: List[Tuple[int, int]] = []
+        for begin, stop in parts:
+            while begin < stop and self.text[begin].isspace():
+                begin += 1
+            while stop > begin and self.text[stop - 1].isspace():
+                stop -= 1
+            if begin < stop:
+                ranges.append((original(begin), original(stop - 1) + 1))
+        return ranges
+
+    @property
+    def saved_tokens(self) -> int:
+        return self.original_tokens - self.tokens
+
+    @property
+    def reduction(self) -> float:
+        return self.saved_tokens / self.original_tokens if self.original_tokens else 0.0
+
+
+class ThreadNormalizer:
+    """Removes quoted history, repeated blocks, signatures and disclaimers as whole lines.
+
+    Args:
+        min_block_lines: Content lines a repeated block needs before it is removed.
+        disclaimer_phrases: Distinct boilerplate phrases that mark a paragraph as a disclaimer.
+    """
+
+    def __init__(self, min_block_lines: int = 3, disclaimer_phrases: int = 3):
+        self.min_block_lines = max(1, min_block_lines)
+        self.disclaimer_phrases = disclaimer_phrases
+
+    def _repeated(self, keys: List[str], depths: List[int]) -> np.ndarray:
+        """Lines inside a block that is kept in a less quoted or earlier place"""
+        content = [i for i, key in enumerate(keys) if key]
+        removed = np.zeros(len(keys), dtype=bool)
+        if len(content) < self.min_block_lines:
+            return removed
+        line_hashes = np.array([
+            int.from_bytes(hashlib.blake2b(keys[i].encode("utf-8"), digest_size=8).digest(), "little")
+            for i in content
+        ], dtype=np.uint64)
+        hashes = window_hashes(line_hashes, self.min_block_lines)
+        width = self.min_block_lines
+        depth = np.array([depths[i] for i in content])
+        depth_sums = sliding_window_view(depth, width).sum(axis=1)
+        # The copy of each block to keep: least quoted, then earliest
+        kept: Dict[int, int] = {}
+        for start in np.lexsort((np.arange(len(hashes)), depth_sums)):
+            kept.setdefault(int(hashes[start]), int(start))
+        # Only the kept copy of a block that does repeat is protected; unique windows may span removed lines
+        values, counts = np.unique(hashes, return_counts=True)
+        protected = np.zeros(len(content), dtype=bool)
+        for value in values[counts > 1]:
+            start = kept[int(value)]
+            protected[start:start + width] = True
+        duplicate = np.zeros(len(content), dtype=bool)
+        for start, value in enumerate(hashes):
+            first = kept[int(value)]
+            if first != start and all(keys[content[first + k]] == keys[content[start + k]] for k in range(width)):
+                duplicate[start:start + width] = True
+        removed[[i for i, flag in zip(content, duplicate & ~protected) if flag]] = True
+        return removed
+
+    def _disclaimers(self, lines: List[str], depths: List[int], removed: np.ndarray) -> None:
+        start = 0
+        while start < len(lines):
+            end = start
+            while end < len(lines) and lines[end].strip(" \t>") and depths[end] == depths[start]:
+                end += 1
+            if end > start:
+                phrases = {match.lower() for line in lines[start:end] for match in _DISCLAIMER.findall(line)}
+                if len(phrases) >= self.disclaimer_phrases:
+                    removed[start:end] = True
+            start = end + 1
+
+    def normalize(self, text: str) -> NormalizedThread:
+        lines = text.split("\n")
+        quotes = [_QUOTE.match(line).group(1) for line in lines]
+        depths = [quote.count(">") for quote in quotes]
+        bodies = [line[len(_QUOTE.match(line).group(0)):] for line in lines]
+        # Headers of messages in the thread are structure and never deduplicated
+        keys = ["" if depth == 0 and _HEADER.match(body) else _SPACES.sub(" ", body).strip().casefold()
+                for body, depth in zip(bodies, depths)]
+        kinds: Dict[str, np.ndarray] = {"repeated": self._repeated(keys, depths)}
+
+        signature = np.zeros(len(lines), dtype=bool)
+        i = 0
+        while i < len(lines):
+            if _SIGNATURE.match(bodies[i]):
+                end = i + 1
+                while end < len(lines) and (depths[end] == depths[i] or not bodies[end].strip()) \
+                        and not _HEADER.match(bodies[end]) and not _ATTRIBUTION.match(bodies[end]):
+                    end += 1
+                signature[i:end] = True
+                i = end
+            else:
+                signature[i] = bool(_MOBILE_FOOTER.match(bodies[i]))
+                i += 1
+        kinds["signature"] = signature
+
+        disclaimer = np.zeros(len(lines), dtype=bool)
+        self._disclaimers(lines, depths, disclaimer)
+        kinds["disclaimer"] = disclaimer
+        removed = kinds["repeated"] | signature | disclaimer
+
+        # Attributions and quoted or forwarded headers go with the quoted text they introduce
+        attribution = np.zeros(len(lines), dtype=bool)
+        i = 0
+        while i < len(lines):
+            if not (_ATTRIBUTION.match(bodies[i]) or (depths[i] and _HEADER.match(bodies[i]))):
+                i += 1
+                continue
+            end = i + 1
+            while end < len(lines) and (not bodies[end].strip()
+                                        or (depths[end] >= depths[i] and _HEADER.match(bodies[end]))):
+                end += 1
+            if end == len(lines) or removed[end]:
+                attribution[i:end] = True
+            i = end
+        kinds["attribution"] = attribution
+        removed |= attribution
+
+        kept: List[str] = []
+        offsets: List[int] = []
+        offset = 0
+        for line, body, gone in zip(lines, bodies, removed):
+            # Blank lines left between removed blocks collapse into one
+            if not (gone or (not body.strip() and (not kept or not kept[-1].strip(" \t>")))):
+                kept.append(line)
+                offsets.append(offset)
+            offset += len(line) + 1
+        while kept and not kept[-1].strip(" \t>"):
+            kept.pop()
+            offsets.pop()
+        normalized = "\n".join(kept)
+        return NormalizedThread(
+            text=normalized,
+            original_tokens=estimate_tokens(text),
+            tokens=estimate_tokens(normalized),
+            removed={kind: int(flags.sum()) for kind, flags in kinds.items() if flags.any()},
+            line_offsets=offsets,
+        )
+
@@ -0,0 +1,238 @@
+"""Declarative approval-gate policy.
+
+A policy is a list of rules. Each rule has a ``require`` condition, an
+optional ``when`` condition and a message, for example::
+
+    {"name": "high_severity_two_approvers", "when": "severity == 'high'",
+     "require": "approvers >= 2", "message": "is in a high-severity thread and needs two approvers"}
+
+A condition is ``field op value`` clauses joined by ``and``. Values are
+numbers, ``true``/``false``, quoted strings, or the name of a ``Config``
+attribute (``confidence >= CONFIDENCE_FLOOR``). Rules are compiled once.
+They are then evaluated as column operations over every decision of every
+analysis in a batch. Decision rules see ``confidence``, ``severity``
+(highest risk severity in the thread), ``status``, ``approvers``,
+``approved`` and ``edited``. Rules with ``"scope": "analysis"`` see
+``confirmed`` (human accountability confirmed), ``severity`` and
+``decisions``.
+
+``approvers`` counts the distinct names recorded with an approval: the
+reviewer who approved, then any co-approvers they listed. Co-approvers are
+not authenticated, so rules on ``approvers`` are advisory: they catch a
+missing second opinion, not a reviewer who misstates one.
+"""
+
+import json
+import operator
+import re
+from dataclasses import dataclass
+from typing import Any, Callable, Dict, Iterable, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+from config.settings import Config
+from ai_decision_assistant.core.aggregate import thread_severity
+from ai_decision_assistant.core.models import DecisionAnalysis, DecisionStatus
+from ai_decision_assistant.utils.exceptions import ConfigurationError
+
+SEVERITY_LEVELS = {None: 0, "low": 1, "medium": 2, "high": 3}
+STATUS_LEVELS = {status.value: i for i, status in enumerate(DecisionStatus)}
+
+OPERATORS: Dict[str, Callable[[np.ndarray, Any], np.ndarray]] = {
+    "==": operator.eq, "!=": operator.ne, ">=": operator.ge,
+    "<=": operator.le, ">": operator.gt, "<": operator.lt,
+}
+# Fields per scope, with the encoding applied to string values compared against them
+FIELDS = {
+    "decision": {"confidence": None, "severity": SEVERITY_LEVELS, "status": STATUS_LEVELS,
+                 "approvers": None, "approved": None, "edited": None},
+    "analysis": {"confirmed": None, "severity": SEVERITY_LEVELS, "decisions": None},
+}
+
+# Sort key placing analysis-level violations after the decisions of their analysis
+_ANALYSIS_LEVEL = np.iinfo(np.int64).max
+
+_CLAUSE = re.compile(r"^\s*([a-z_]+)\s*(==|!=|>=|<=|>|<)\s*(.+?)\s*$")
+
+
+@dataclass(frozen=True)
+class Rule:
+    name: str
+    require: str
+    message: str
+    when: str = ""
+    scope: str = "decision"
+
+
+DEFAULT_RULES: Tuple[Rule, ...] = (
+    Rule("approval", "approved == true", "requires human approval"),
+    Rule("confidence_floor", "confidence >= CONFIDENCE_FLOOR", "has very low confidence - review required"),
+    Rule("high_severity_two_approvers", "approvers >= 2",
+         "is in a high-severity thread and needs two approvers", when="severity == 'high'"),
+    Rule("human_confirmation", "confirmed == true", "Human accountability confirmation", scope="analysis"),
+)
+
+
+@dataclass
+class Violation:
+    source: str
+    index: Optional[int]
+    rule: str
+    message: str
+
+    def __str__(self) -> str:
+        return self.message if self.index is None else f"Decision {self.index + 1} {self.message}"
+
+
+@dataclass
+class PolicyReport:
+    """Violations of a policy evaluation, in source and decision order"""
+    sources: List[str]
+    violations: List[Violation]
+
+    def passed(self, source: Optional[str] = None) -> bool:
+        return not any(source is None or v.source == source for v in self.violations)
+
+    def for_source(self, source: str) -> List[Violation]:
+        return [v for v in self.violations if v.source == source]
+
+    def for_decision(self, source: str, index: int) -> List[Violation]:
+        return [v for v in self.violations if v.source == source and v.index == index]
+
+    def to_markdown(self, source: Optional[str] = None) -> str:
+        violations = self.violations if source is None else self.for_source(source)
+        if not violations:
+            return "## APPROVAL GATE\n✅ All policy rules satisfied\n"
+        lines = ["## APPROVAL GATE"]
+        for violation in violations:
+            prefix = f"{violation.source}: " if source is None and len(self.sources) > 1 else ""
+            lines.append(f"- ❌ {prefix}{violation}")
+        return "\n".join(lines) + "\n"
+
+
+def approver_count(approval: Dict[str, Any]) -> int:
+    """Distinct approvers of a decision; an approval without names counts as one"""
+    if not approval.get("approved"):
+        return 0
+    names = {str(name).strip().lower() for name in approval.get("approvers", []) if str(name).strip()}
+    return max(1, len(names))
+
+
+def _parse_value(text: str) -> Any:
+    lowered = text.lower()
+    if lowered in ("true", "false"):
+        return lowered == "true"
+    if text[0] in "'\"" and text[-1] == text[0]:
+        return text[1:-1]
+    if re.fullmatch(r"[A-Z][A-Z0-9_]*", text):
+        if not hasattr(Config, text):
+            raise ConfigurationError(f"Unknown Config setting in policy: {text}")
+        return getattr(Config, text)
+    try:
+        return float(text)
+    except ValueError:
+        raise ConfigurationError(f"Invalid value in policy condition: {text}") from None
+
+
+class _Condition:
+    """Conjunction of compiled clauses over column arrays"""
+
+    def __init__(self, text: str, scope: str):
+        self.clauses: List[Tuple[str, Callable, Any]] = []
+        for part in filter(None, (p.strip() for p in re.split(r"\band\b", text))):
+            match = _CLAUSE.match(part)
+            if not match or match.group(1) not in FIELDS[scope]:
+                raise ConfigurationError(f"Invalid {scope} policy clause: {part!r}")
+            name, op, raw = match.groups()
+            value = _parse_value(raw)
+            encoding = FIELDS[scope][name]
+            if isinstance(value, str):
+                if encoding is None or value.lower() not in encoding:
+                    raise ConfigurationError(f"Invalid value for {name}: {raw}")
+                value = encoding[value.lower()]
+            self.clauses.append((name, OPERATORS[op], value))
+
+    def evaluate(self, columns: Dict[str, np.ndarray], size: int) -> np.ndarray:
+        mask = np.ones(size, dtype=bool)
+        for name, op, value in self.clauses:
+            mask &= op(columns[name], value)
+        return mask
+
+
+class ApprovalPolicy:
+    """Compiled approval-gate rules shared by the UI, CLI and batch exports"""
+
+    def __init__(self, rules: Sequence[Rule] = DEFAULT_RULES):
+        self.rules = list(rules)
+        self._compiled = []
+        for rule in self.rules:
+            if rule.scope not in FIELDS:
+                raise ConfigurationError(f"Invalid policy scope for {rule.name}: {rule.scope}")
+            self._compiled.append((rule, _Condition(rule.when, rule.scope), _Condition(rule.require, rule.scope)))
+
+    @classmethod
+    def from_file(cls, path: str) -> "ApprovalPolicy":
+        """Load rules from a JSON list of rule objects"""
+        with open(path, "r", encoding="utf-8") as f:
+            return cls([Rule(**rule) for rule in json.load(f)])
+
+    @staticmethod
+    def _columns(items: List[Tuple[str, DecisionAnalysis, Dict[int, Any], bool]]):
+        sources, decision_rows, analysis_rows = [], [], []
+        for source, analysis, approvals, confirmed in items:
+            severity = SEVERITY_LEVELS[thread_severity(analysis)]
+            sources.append(source)
+            analysis_rows.append((confirmed, severity, len(analysis.decisions)))
+            for index, decision in enumerate(analysis.decisions):
+                approval = approvals.get(index, {})
+                decision_rows.append((len(sources) - 1, index, decision.confidence, severity,
+                                      STATUS_LEVELS[DecisionStatus(decision.status).value],
+                                      approver_count(approval), bool(approval.get("approved")),
+                                      bool(approval.get("edited_decision"))))
+        rows = np.array(decision_rows, dtype=float).reshape(-1, 8)
+        decisions = {
+            "source": rows[:, 0].astype(int), "index": rows[:, 1].astype(int),
+            "confidence": rows[:, 2], "severity": rows[:, 3], "status": rows[:, 4],
+            "approvers": rows[:, 5], "approved": rows[:, 6].astype(bool), "edited": rows[:, 7].astype(bool),
+        }
+        table = np.array(analysis_rows, dtype=float).reshape(-1, 3)
+        analyses = {"confirmed": table[:, 0].astype(bool), "severity": table[:, 1], "decisions": table[:, 2]}
+        return sources, decisions, analyses
+
+    def evaluate(self, items: Iterable[Tuple[str, DecisionAnalysis, Dict[int, Any], bool]]) -> PolicyReport:
+        """Evaluate (source, analysis, approvals, human confirmed) items in one vectorized pass"""
+        sources, decisions, analyses = self._columns(list(items))
+        found = []
+        for order, (rule, when, require) in enumerate(self._compiled):
+            if rule.scope == "decision":
+                size = len(decisions["source"])
+                failed = np.nonzero(when.evaluate(decisions, size) & ~require.evaluate(decisions, size))[0]
+                found.extend((decisions["source"][i], decisions["index"][i], order) for i in failed)
+            else:
+                size = len(sources)
+                failed = np.nonzero(when.evaluate(analyses, size) & ~require.evaluate(analyses, size))[0]
+                found.extend((i, _ANALYSIS_LEVEL, order) for i in failed)
+        found.sort()
+        violations = [
+            Violation(sources[source], None if index == _ANALYSIS_LEVEL else int(index),
+                      self.rules[order].name, self.rules[order].message)
+            for source, index, order in found
+        ]
+        return PolicyReport(sources, violations)
+
+    def check(self, analysis: DecisionAnalysis, approvals: Dict[int, Any], confirmed: bool = False,
+              source: str = "") -> PolicyReport:
+        """Evaluate a single analysis"""
+        return self.evaluate([(source, analysis, approvals, confirmed)])
+
+
+_default_policy: Optional[ApprovalPolicy] = None
+
+
+def default_policy() -> ApprovalPolicy:
+    """The policy from ``Config.APPROVAL_POLICY_FILE`` if set, otherwise the built-in rules"""
+    global _default_policy
+    if _default_policy is None:
+        path = Config.APPROVAL_POLICY_FILE
+        _default_policy = ApprovalPolicy.from_file(path) if path else ApprovalPolicy()
+    return _default_policy
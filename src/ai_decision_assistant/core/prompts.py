@@ -0,0 +1,269 @@
+"""Versioned prompt templates for conversation analysis.
+
+Every template renders its instructions and response schema once, at
+registration time, into a static system message. Per-request content (the
+high-stakes addendum and the conversation itself) always comes after that
+prefix, so repeat calls share an identical prompt prefix that provider-side
+prompt caching can reuse.
+"""
+
+import json
+from dataclasses import dataclass
+from typing import Any, Dict, List, Optional, Type
+
+from pydantic import AliasChoices, BaseModel
+
+from ai_decision_assistant.core.models import (
+    SEVERITY_CODES, STATUS_CODES, Assumption, Decision, DecisionAnalysis, Risk,
+)
+
+BASE_INSTRUCTIONS = """You are a Decision Intelligence Assistant for a regulated fintech company (like example).
+
+Your role is to extract structured decision information from messy conversation threads while being:
+- PRECISE: Only extract what is explicitly stated
+- CONSERVATIVE: When in doubt, mark as "unknown" or express uncertainty
+- EVIDENCE-BASED: Always cite exact quotes to support your analysis
+- RISK-AWARE: Surface potential risks and regulatory concerns
+
+Core Rules:
+1. If no explicit decision is present, do not invent one
+2. Always separate facts from assumptions
+3. Quote exact text when identifying decisions or commitments
+4. For fintech contexts, be extra cautious about regulatory implications
+5. Mark confidence levels honestly - high uncertainty = low confidence
+
+For the "human_must_decide" field, identify the ONE most critical decision that requires human judgment, typically involving:
+- Policy interpretation
+- Regulatory compliance
+- Client-impacting communications
+- Financial risk acceptance
+- Strategic direction changes"""
+
+HIGH_STAKES_ADDENDUM = """HIGH-STAKES MODE ACTIVE:
+- Lower confidence scores by 0.2
+- Flag additional risks
+- Refuse to make definitive statements about unclear decisions
+- Ask more clarifying questions
+- Be more conservative about decision finality"""
+
+DUAL_VIEW_ADDENDUM = """DUAL-VIEW MODE ACTIVE:
+- Analyze for standard review and report confidence without any high-stakes reduction
+- Also return "high_stakes_risks" (same item format as risks): additional risks a high-stakes review would flag
+- Also return "high_stakes_questions" (list of strings): additional clarifying questions a high-stakes review would ask
+- Do not repeat items already listed in the main fields"""
+
+# Hand-written example schema used by the original prompt
+LEGACY_SCHEMA_EXAMPLE = """{
+  "decisions": [
+    {
+      "decision": "specific decision text",
+      "status": "proposed|confirmed|unclear",
+      "evidence_quotes": ["exact quote supporting this decision"],
+      "owner": "person name or unknown",
+      "deadline": "timeline or unknown",
+      "confidence": 0.85
+    }
+  ],
+  "assumptions": [
+    {
+      "assumption": "assumption text",
+      "risk_if_wrong": "potential impact"
+    }
+  ],
+  "risks": [
+    {
+      "risk": "risk description",
+      "severity": "low|medium|high",
+      "mitigation": "suggested approach"
+    }
+  ],
+  "open_questions": ["unresolved question"],
+  "human_must_decide": "most critical decision requiring human judgment",
+  "why_human": "explanation of why human judgment is required",
+  "scale_concerns": ["what would break first at scale"]
+}"""
+
+EVIDENCE_REF_INSTRUCTIONS = (
+    "Every conversation line starts with an ID such as L12. Cite evidence in \"er\" as line IDs or "
+    "inclusive ranges (\"L12\", \"L12-L14\") instead of quoting text; cite only the lines that state it."
+)
+
+# Fields filled in locally rather than by the model, per model name
+LOCAL_ONLY_FIELDS = {
+    "DecisionAnalysis": ("metadata",),
+    "Decision": ("canonical_id", "evidence_spans"),
+}
+
+
+def response_json_schema() -> Dict[str, Any]:
+    """JSON schema of the fields the model is asked to produce"""
+    schema = DecisionAnalysis.model_json_schema()
+    definitions = schema.get("$defs", {})
+    for model_name, field_names in LOCAL_ONLY_FIELDS.items():
+        model_schema = schema if model_name == "DecisionAnalysis" else definitions.get(model_name, {})
+        for field_name in field_names:
+            model_schema.get("properties", {}).pop(field_name, None)
+            if field_name in model_schema.get("required", []):
+                model_schema["required"].remove(field_name)
+    # Keep only definitions still referenced once local-only fields are gone
+    reachable = _references({k: v for k, v in schema.items() if k != "$defs"})
+    pending = list(reachable)
+    while pending:
+        for name in _references(definitions.get(pending.pop(), {})) - reachable:
+            reachable.add(name)
+            pending.append(name)
+    for name in set(definitions) - reachable:
+        definitions.pop(name)
+    return schema
+
+
+def _references(schema: Any) -> set:
+    """Names of the $defs entries a schema fragment refers to"""
+    if isinstance(schema, dict):
+        found = {schema["$ref"].rsplit("/", 1)[-1]} if isinstance(schema.get("$ref"), str) else set()
+        for value in schema.values():
+            found |= _references(value)
+        return found
+    if isinstance(schema, list):
+        return set().union(*(_references(value) for value in schema)) if schema else set()
+    return set()
+
+
+_LIST_ITEM_MODELS = {"decisions": Decision, "assumptions": Assumption, "risks": Risk}
+_ENUM_CODES = {"status": STATUS_CODES, "severity": SEVERITY_CODES}
+
+
+def wire_key(model: Type[BaseModel], name: str) -> str:
+    """Compact wire key of a model field (its last validation alias)"""
+    alias = model.model_fields[name].validation_alias
+    return alias.choices[-1] if isinstance(alias, AliasChoices) else name
+
+
+def to_wire(analysis: Dict[str, Any], enum_codes: bool = True) -> Dict[str, Any]:
+    """Encode analysis fields with compact wire keys (the inverse of validating them)"""
+    def encode(model: Type[BaseModel], data: Dict[str, Any]) -> Dict[str, Any]:
+        out = {}
+        for name, value in data.items():
+            if name not in model.model_fields or name in LOCAL_ONLY_FIELDS.get(model.__name__, ()):
+                continue
+            if name in _LIST_ITEM_MODELS and model is DecisionAnalysis:
+                value = [encode(_LIST_ITEM_MODELS[name], item) for item in value]
+            elif enum_codes and name in _ENUM_CODES:
+                codes = {full: code for code, full in _ENUM_CODES[name].items()}
+                value = codes.get(value, value)
+            out[wire_key(model, name)] = value
+        return out
+    return encode(DecisionAnalysis, analysis)
+
+
+def compact_schema_text(enum_codes: bool = True, evidence_refs: bool = False) -> str:
+    """Example response in compact wire keys, preceded by a legend of the abbreviations"""
+    def legend(model: Type[BaseModel]) -> str:
+        return ", ".join(
+            "er=evidence line references" if evidence_refs and name == "evidence_quotes"
+            else f"{wire_key(model, name)}={name}"
+            for name in model.model_fields
+            if name not in LOCAL_ONLY_FIELDS.get(model.__name__, ())
+        )
+
+    lines = ["Keys are abbreviated to keep responses short:", f"top level: {legend(DecisionAnalysis)}"]
+    lines.extend(f"{field} items: {legend(model)}" for field, model in _LIST_ITEM_MODELS.items())
+    example = json.loads(LEGACY_SCHEMA_EXAMPLE)
+    if enum_codes:
+        for field, name in (("decisions", "status"), ("risks", "severity")):
+            example[field][0][name] = "|".join(_ENUM_CODES[name])
+        lines.append("status: " + ", ".join(f"{code}={full}" for code, full in STATUS_CODES.items())
+                     + "; severity: " + ", ".join(f"{code}={full}" for code, full in SEVERITY_CODES.items()))
+    example = to_wire(example, enum_codes=False)
+    if evidence_refs:
+        example["d"][0] = {("er" if k == "eq" else k): (["L4", "L7-L8"] if k == "eq" else v)
+                           for k, v in example["d"][0].items()}
+        lines.append(EVIDENCE_REF_INSTRUCTIONS)
+    lines.append(json.dumps(example, separators=(",", ":")))
+    return "\n".join(lines)
+
+
+@dataclass(frozen=True)
+class PromptTemplate:
+    """A precompiled prompt: static system prefix plus per-request suffix"""
+    version: str
+    system_prompt: str
+    evidence_refs: bool = False
+    high_stakes_addendum: str = HIGH_STAKES_ADDENDUM
+    dual_view_addendum: str = DUAL_VIEW_ADDENDUM
+    conversation_header: str = "Analyze this conversation thread and extract decision information:"
+    context_header: str = (
+        "A near-identical thread was analyzed before. Use its analysis as reference, "
+        "but only keep what this conversation supports:"
+    )
+
+    def build_messages(self, conversation: str, high_stakes_mode: bool = False,
+                       context: Optional[str] = None, dual_view: bool = False) -> List[Dict[str, str]]:
+        """Build chat messages with the static prefix first and the conversation last"""
+        parts = []
+        if dual_view:
+            parts.append(self.dual_view_addendum)
+        elif high_stakes_mode:
+            parts.append(self.high_stakes_addendum)
+        if context:
+            parts.append(f"{self.context_header}\n{context}")
+        parts.append(f"{self.conversation_header}\n\n{conversation}")
+        return [
+            {"role": "system", "content": self.system_prompt},
+            {"role": "user", "content": "\n\n".join(parts)},
+        ]
+
+
+def compile_template(version: str, schema_text: str, evidence_refs: bool = False) -> PromptTemplate:
+    """Render the static system prompt for a schema once"""
+    system_prompt = (
+        f"{BASE_INSTRUCTIONS}\n\n"
+        f"Return a JSON response following this exact schema:\n{schema_text}\n\n"
+        "Be extremely careful to return valid JSON only."
+    )
+    return PromptTemplate(version=version, system_prompt=system_prompt, evidence_refs=evidence_refs)
+
+
+class PromptRegistry:
+    """Registry of prompt templates keyed by version"""
+
+    def __init__(self, default_version: str):
+        self.default_version = default_version
+        self._templates: Dict[str, PromptTemplate] = {}
+
+    def register(self, template: PromptTemplate) -> PromptTemplate:
+        if template.version in self._templates:
+            raise ValueError(f"Prompt version '{template.version}' is already registered")
+        self._templates[template.version] = template
+        return template
+
+    def get(self, version: Optional[str] = None) -> PromptTemplate:
+        version = version or self.default_version
+        try:
+            return self._templates[version]
+        except KeyError:
+            raise KeyError(
+                f"Unknown prompt version '{version}'. Available: {', '.join(self.versions())}"
+            ) from None
+
+    def versions(self) -> List[str]:
+        return sorted(self._templates)
+
+
+PROMPT_REGISTRY = PromptRegistry(default_version="v2")
+
+# v1: original instructions with the hand-written example schema
+PROMPT_REGISTRY.register(compile_template("v1", LEGACY_SCHEMA_EXAMPLE))
+
+# v2: schema generated from the Pydantic models, serialized deterministically
+PROMPT_REGISTRY.register(compile_template(
+    "v2", json.dumps(response_json_schema(), indent=1, sort_keys=True)
+))
+
+# v3: compact wire keys and one-letter enum codes to cut output tokens
+PROMPT_REGISTRY.register(compile_template("v3", compact_schema_text(enum_codes=True)))
+
+# v4: v3 plus line-anchored evidence references resolved locally (see core/evidence.py)
+PROMPT_REGISTRY.register(compile_template(
+    "v4", compact_schema_text(enum_codes=True, evidence_refs=True), evidence_refs=True
+))
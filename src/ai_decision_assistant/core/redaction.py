@@ -0,0 +1,313 @@
+"""PII redaction before conversation text leaves the process.
+
+Structured identifiers (emails, phone numbers, IBANs, government IDs,
+account and card numbers, optionally amounts) are matched by one
+precompiled alternation. Regex scanning is the slow part, so it only runs
+over lines that can contain a match: a vectorized NumPy pass over the UTF-8
+bytes finds lines with an ``@``, a run of three digits or a currency sign.
+People's names come from the parsed thread (``From:``/``To:``/``Cc:``
+headers, ``Name: message`` speaker lines and the participants an ingester
+found); parsed names must look like a person, not a team or role such as
+"Legal Team". Names and known customer identifiers are matched by trie-shaped
+regexes, which behave like an Aho-Corasick automaton for a fixed word list.
+
+Each distinct value becomes a placeholder such as ``[EMAIL_1]``, numbered
+in order of first appearance, so the same conversation always redacts to
+the same prompt. Placeholders never span lines, so the line structure used
+for evidence references is unchanged. ``Redaction.restore`` puts the
+original values back into the model's output. ``redact_many`` spreads a
+corpus over a process pool.
+"""
+
+import re
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import dataclass, field
+from email.utils import getaddresses
+from functools import lru_cache
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Sequence, Tuple, Union
+
+import numpy as np
+
+# Tried in order, so more specific identifiers come first. [ ] rather than \s keeps matches on one line.
+PATTERNS: Dict[str, str] = {
+    "EMAIL": r"[A-Za-z0-9._%+-]+@[A-Za-z0-9-]+(?:\.[A-Za-z0-9-]+)*\.[A-Za-z]{2,}",
+    "IBAN": r"\b[A-Z]{2}\d{2}(?:[ ]?[A-Z0-9]{4}){2,7}(?:[ ]?[A-Z0-9]{1,3})?\b",
+    "GOV_ID": r"\b\d{3}-\d{2}-\d{4}\b|\b\d{3}[ -]\d{3}[ -]\d{3}\b(?![ -]\d)",
+    "PHONE": r"(?<![\w+])(?:\+\d{1,3}[ .-]?)?(?:\(\d{3}\)[ ]?|\d{3}[ .-])\d{3}[ .-]\d{4}\b",
+    "ACCOUNT": r"\b\d{4}(?:[ -]\d{4}){2,3}(?:[ -]\d{1,3})?\b|\b\d{8,19}\b",
+    "AMOUNT": r"(?:\$|€|£)[ ]?\d[\d,]*(?:\.\d+)?(?:[ ]?[KkMmBb]\b)?",
+}
+WORD_CATEGORIES = ("PERSON", "CUSTOMER")
+DEFAULT_CATEGORIES = ("EMAIL", "IBAN", "GOV_ID", "PHONE", "ACCOUNT", "PERSON", "CUSTOMER")
+
+# Anchored on a literal newline rather than ^ so the regex engine can skip ahead to line starts
+_ADDRESS_HEADER = re.compile(r"\n(?i:From|To|Cc|Reply-To):[ \t]*(.+)")
+_SPEAKER = re.compile(r"\n[ \t]*([A-Z][\w'’.-]*(?:[ ][A-Z][\w'’.-]*){0,2}):[ \t]+\S")
+# Capitalized "Word:" line openers that are not people
+_NOT_SPEAKERS = frozenset("""
+    From To Cc Bcc Date Subject Re Fwd Fw Sent Reply Reply-To Replied Response Answer Comment Comments Feedback
+    Note Notes Update Updates Action Actions Decision Decisions Risk Risks Question Questions Summary Agenda
+    Attendees Owner Deadline Status Next Todo Context Background Proposal Outcome Result Results Option Options
+    Recommendation Plan Timeline Impact Issue Problem Solution Pros Cons Reminder Important Urgent Warning
+    Yes No Ok Okay Agreed Approved Thanks Hi Hello Dear FYI Thread Channel
+""".split())
+# Words that make a display name a team, role or mailbox rather than a person
+_ROLE_WORDS = frozenset("""
+    Team Teams Committee Board Council Group Department Dept Office Desk Unit Division Staff Crew Squad
+    Head Lead Manager Director Officer Chief President Admin Administrator Coordinator Assistant
+    Legal Compliance Risk Customer Customers Success Support Service Services Product Products Sales Marketing
+    Finance Accounting Billing Payments Operations Ops Engineering Security Trading Treasury Audit
+    Help Helpdesk Info Alerts Notifications Noreply No-Reply Bot System Everyone All
+""".split())
+# Placeholders as written back by the model, with or without their brackets
+_PLACEHOLDER = re.compile(r"\[?\b([A-Z][A-Z_]*_\d+)\b\]?")
+
+_NEWLINE, _AT, _DOLLAR = ord("\n"), ord("@"), ord("$")
+# Lead bytes of the UTF-8 encodings of € (E2 82 AC) and £ (C2 A3)
+_CURRENCY_LEADS = (0xE2, 0xC2)
+
+
+def trie_pattern(words: Iterable[str]) -> str:
+    """Regex matching any of words, shaped as a trie so matching cost does not grow with the list"""
+    trie: Dict[str, Any] = {}
+    for word in words:
+        node = trie
+        for char in word:
+            node = node.setdefault(char, {})
+        node[""] = {}
+
+    def build(node: Dict[str, Any]) -> str:
+        branches = [re.escape(char) + build(child) for char, child in sorted(node.items()) if char]
+        if not branches:
+            return ""
+        body = branches[0] if len(branches) == 1 else "(?:" + "|".join(branches) + ")"
+        return f"(?:{body})?" if "" in node else body
+
+    return build(trie)
+
+
+@lru_cache(maxsize=256)
+def _word_regex(words: Tuple[str, ...]) -> "re.Pattern[str]":
+    # No leading lookbehind: a pattern that starts with its trie keeps the regex engine's fast prefix scan
+    return re.compile(trie_pattern(words))
+
+
+def looks_like_person(name: str) -> bool:
+    """One to three capitalized words, none of them a line opener, role or team word, or an acronym"""
+    parts = name.split()
+    return 0 < len(parts) <= 3 and all(
+        part[0].isupper() and not (len(part) > 1 and part.isupper())
+        and part not in _NOT_SPEAKERS and part not in _ROLE_WORDS
+        for part in parts
+    )
+
+
+def thread_names(text: str, participants: Sequence[str] = ()) -> List[str]:
+    """People named in a thread's address headers and speaker lines, with their first and last names.
+
+    Participants from an ingester are taken as given; names parsed from the
+    text must look like a person, so "Legal Team" or "Reply:" are not redacted.
+    """
+    parsed: List[str] = []
+    text = "\n" + text
+    for header in _ADDRESS_HEADER.findall(text):
+        if "@" in header or "<" in header:
+            parsed.extend(name for name, _ in getaddresses([header]) if name)
+        else:
+            # A bare display name, which getaddresses would cut at the first space
+            parsed.extend(header.split(","))
+    parsed.extend(_SPEAKER.findall(text))
+    names = set()
+    for name in list(participants) + [name for name in parsed if looks_like_person(name.strip().strip('"'))]:
+        name = name.strip().strip('"')
+        if "@" in name or not name[:1].isupper():
+            continue
+        names.add(name)
+        parts = name.split()
+        if len(parts) > 1 and looks_like_person(name):
+            names.update(part for part in (parts[0], parts[-1]) if len(part) > 2 and part[0].isupper())
+    return sorted(names)
+
+
+def _is_word_char(char: str) -> bool:
+    return char.isalnum() or char == "_"
+
+
+@dataclass
+class Redaction:
+    """A redacted text and the placeholder mapping needed to restore it"""
+    text: str
+    originals: Dict[str, str] = field(default_factory=dict)
+    placeholders: Dict[str, str] = field(default_factory=dict)
+    counts: Dict[str, int] = field(default_factory=dict)
+
+    def placeholder(self, category: str, value: str) -> str:
+        existing = self.placeholders.get(value)
+        if existing is None:
+            self.counts[category] = self.counts.get(category, 0) + 1
+            existing = f"[{category}_{self.counts[category]}]"
+            self.placeholders[value] = existing
+            self.originals[existing] = value
+        return existing
+
+    def values(self, category: str) -> List[str]:
+        """Original values redacted under a category"""
+        return sorted(value for value, placeholder in self.placeholders.items()
+                      if placeholder.startswith(f"[{category}_"))
+
+    def restore(self, value: Any) -> Any:
+        """Put original values back into a string or into nested lists and dicts of strings"""
+        if not self.originals:
+            return value
+        if isinstance(value, str):
+            return _PLACEHOLDER.sub(lambda m: self.originals.get(f"[{m.group(1)}]", m.group(0)), value)
+        if isinstance(value, list):
+            return [self.restore(item) for item in value]
+        if isinstance(value, dict):
+            return {key: self.restore(item) for key, item in value.items()}
+        return value
+
+
+class Redactor:
+    """Replaces PII with stable placeholders.
+
+    Args:
+        categories: Categories to redact: keys of PATTERNS, PERSON and CUSTOMER.
+        identifiers: Known customer identifiers (names, customer numbers) redacted as CUSTOMER.
+    """
+
+    def __init__(self, categories: Sequence[str] = DEFAULT_CATEGORIES, identifiers: Iterable[str] = ()):
+        self.categories = tuple(category.strip().upper() for category in categories if category.strip())
+        unknown = set(self.categories) - set(PATTERNS) - set(WORD_CATEGORIES)
+        if unknown:
+            raise ValueError(f"Unknown redaction categories: {', '.join(sorted(unknown))}")
+        self.identifiers = tuple(sorted({i.strip() for i in identifiers if i.strip()}))
+        structured = [name for name in PATTERNS if name in self.categories]
+        self._structured = re.compile(
+            "|".join(f"(?P<{name}>{PATTERNS[name]})" for name in structured).encode("utf-8")
+        ) if structured else None
+        self._digits = any(name != "EMAIL" for name in structured)
+        self._emails = "EMAIL" in structured
+        self._amounts = "AMOUNT" in structured
+        self._customers = (_word_regex(self.identifiers)
+                           if self.identifiers and "CUSTOMER" in self.categories else None)
+
+    @classmethod
+    def from_file(cls, categories: Sequence[str], path: Optional[str]) -> "Redactor":
+        """Redactor with customer identifiers read one per line from path"""
+        if not path:
+            return cls(categories)
+        with open(path, "r", encoding="utf-8") as f:
+            return cls(categories, f.read().splitlines())
+
+    def _candidate_lines(self, data: bytes) -> List[Tuple[int, int]]:
+        """Byte ranges of the runs of lines that may hold a structured identifier"""
+        raw = np.frombuffer(data, dtype=np.uint8)
+        hits = np.zeros(len(raw), dtype=bool)
+        if self._digits and len(raw) >= 3:
+            digit = (raw - 48) < 10
+            hits[:-2] |= digit[:-2] & digit[1:-1] & digit[2:]
+        if self._emails:
+            hits |= raw == _AT
+        if self._amounts:
+            hits |= (raw == _DOLLAR) | np.isin(raw, _CURRENCY_LEADS)
+        positions = np.flatnonzero(hits)
+        if not len(positions):
+            return []
+        newlines = np.flatnonzero(raw == _NEWLINE)
+        lines = np.unique(np.searchsorted(newlines, positions))
+        starts = np.where(lines > 0, newlines[np.maximum(lines - 1, 0)] + 1, 0)
+        ends = np.where(lines < len(newlines), newlines[np.minimum(lines, len(newlines) - 1)], len(raw))
+        # Adjacent candidate lines are scanned as one range
+        ranges: List[Tuple[int, int]] = []
+        for start, end in zip(starts.tolist(), ends.tolist()):
+            if ranges and start == ranges[-1][1] + 1:
+                ranges[-1] = (ranges[-1][0], end)
+            else:
+                ranges.append((start, end))
+        return ranges
+
+    def _redact_structured(self, text: str, redaction: Redaction) -> str:
+        data = text.encode("utf-8")
+        ranges = self._candidate_lines(data)
+        if not ranges:
+            return text
+
+        def replace(match: "re.Match[bytes]") -> bytes:
+            return redaction.placeholder(match.lastgroup, match.group(0).decode("utf-8")).encode("utf-8")
+
+        parts, position = [], 0
+        for start, end in ranges:
+            parts.append(data[position:start])
+            parts.append(self._structured.sub(replace, data[start:end]))
+            position = end
+        parts.append(data[position:])
+        return b"".join(parts).decode("utf-8")
+
+    @staticmethod
+    def _redact_words(text: str, pattern: "re.Pattern[str]", category: str, redaction: Redaction) -> str:
+        def replace(match: "re.Match[str]") -> str:
+            start, end = match.span()
+            if (start and _is_word_char(text[start - 1])) or (end < len(text) and _is_word_char(text[end])):
+                return match.group(0)
+            return redaction.placeholder(category, match.group(0))
+
+        return pattern.sub(replace, text)
+
+    def extend(self, redaction: Redaction, text: str, participants: Sequence[str] = ()) -> str:
+        """Redact more text into an existing redaction, so shared values keep their placeholders"""
+        if self._structured is not None:
+            text = self._redact_structured(text, redaction)
+        if self._customers is not None:
+            text = self._redact_words(text, self._customers, "CUSTOMER", redaction)
+        if "PERSON" in self.categories:
+            names = tuple(sorted(set(redaction.values("PERSON")).union(thread_names(text, participants))))
+            if names:
+                text = self._redact_words(text, _word_regex(names), "PERSON", redaction)
+        return text
+
+    def redact(self, text: str, participants: Sequence[str] = ()) -> Redaction:
+        """Redact a conversation; participants are names known from ingestion"""
+        redaction = Redaction(text)
+        redaction.text = self.extend(redaction, text, participants)
+        return redaction
+
+    def redact_many(self, texts: Iterable[Union[str, Tuple[str, Sequence[str]]]], processes: int = 0,
+                    chunk_size: int = 64) -> Iterator[Redaction]:
+        """Redact a stream of texts (or (text, participants) pairs) in order, over a process pool when processes > 1"""
+        if processes <= 1:
+            yield from (_redact_item(self, item) for item in texts)
+            return
+        with ProcessPoolExecutor(max_workers=processes, initializer=_init_worker,
+                                 initargs=(self.categories, self.identifiers)) as pool:
+            window: List[Any] = []
+            chunk: List[Any] = []
+            for text in texts:
+                chunk.append(text)
+                if len(chunk) == chunk_size:
+                    window.append(pool.submit(_redact_chunk, chunk))
+                    chunk = []
+                    # Bound what is held in memory: a few chunks per process
+                    if len(window) >= processes * 4:
+                        yield from window.pop(0).result()
+            if chunk:
+                window.append(pool.submit(_redact_chunk, chunk))
+            for future in window:
+                yield from future.result()
+
+
+# Each pool process compiles its own redactor once
+_worker_redactor: Optional[Redactor] = None
+
+
+def _init_worker(categories: Tuple[str, ...], identifiers: Tuple[str, ...]) -> None:
+    global _worker_redactor
+    _worker_redactor = Redactor(categories, identifiers)
+
+
+def _redact_item(redactor: Redactor, item: Union[str, Tuple[str, Sequence[str]]]) -> Redaction:
+    return redactor.redact(*item) if isinstance(item, tuple) else redactor.redact(item)
+
+
+def _redact_chunk(items: List[Union[str, Tuple[str, Sequence[str]]]]) -> List[Redaction]:
+    return [_redact_item(_worker_redactor, item) for item in items]
@@ -0,0 +1,83 @@
+"""Standard and high-stakes views derived from a single model call.
+
+In dual-view mode the model analyzes the conversation once for standard
+review and additionally lists the risks and clarifying questions a
+high-stakes review would add. The high-stakes view is then derived locally:
+the extra items are appended and decision confidence is reduced by
+``Config.HIGH_STAKES_CONFIDENCE_PENALTY``. Switching between the two views
+needs no further call.
+"""
+
+import copy
+import json
+import threading
+from collections import OrderedDict
+from typing import Any, Dict, List, Optional, Tuple
+
+from pydantic import ValidationError
+
+from ai_decision_assistant.core.models import DecisionAnalysis, DroppedItem, Risk
+
+# Extra keys requested by the dual-view addendum, per analysis field
+HIGH_STAKES_EXTRAS = {
+    "risks": "high_stakes_risks",
+    "open_questions": "high_stakes_questions",
+}
+
+
+def pop_high_stakes_extras(raw: Dict[str, Any]) -> Dict[str, List[Any]]:
+    """Remove the high-stakes-only items from parsed model output, in place"""
+    extras = {}
+    for field, key in HIGH_STAKES_EXTRAS.items():
+        value = raw.pop(key, [])
+        extras[field] = value if isinstance(value, list) else [value]
+    return extras
+
+
+def derive_views(result_json: Dict[str, Any], extras: Dict[str, List[Any]],
+                 penalty: float) -> Tuple[Dict[str, Any], Dict[str, Any], List[DroppedItem]]:
+    """Split validated standard-view fields plus extras into (standard, high-stakes, dropped extras)"""
+    high = copy.deepcopy(result_json)
+    dropped: List[DroppedItem] = []
+
+    for index, item in enumerate(extras.get("risks", [])):
+        try:
+            high["risks"].append(Risk.model_validate(item).model_dump(mode="json"))
+        except ValidationError as e:
+            dropped.append(DroppedItem(field=HIGH_STAKES_EXTRAS["risks"], index=index,
+                                       errors=[str(e).splitlines()[0]],
+                                       fragment=json.dumps(item, ensure_ascii=False)))
+    high["open_questions"].extend(
+        str(question) for question in extras.get("open_questions", [])
+        if isinstance(question, str) and question.strip() and question not in high["open_questions"]
+    )
+    for decision in high["decisions"]:
+        decision["confidence"] = max(0.0, decision["confidence"] - penalty)
+    return result_json, high, dropped
+
+
+class ViewCache:
+    """Thread-safe LRU of (standard, high-stakes) analyses keyed by conversation hash"""
+
+    def __init__(self, max_entries: int = 64):
+        self.max_entries = max_entries
+        self._entries: "OrderedDict[str, Tuple[DecisionAnalysis, DecisionAnalysis]]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key: str, high_stakes_mode: bool) -> Optional[DecisionAnalysis]:
+        with self._lock:
+            views = self._entries.get(key)
+            if views is None:
+                return None
+            self._entries.move_to_end(key)
+            return views[1] if high_stakes_mode else views[0]
+
+    def put(self, key: str, standard: DecisionAnalysis, high_stakes: DecisionAnalysis) -> None:
+        with self._lock:
+            self._entries[key] = (standard, high_stakes)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def __len__(self) -> int:
+        return len(self._entries)
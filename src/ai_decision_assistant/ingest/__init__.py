@@ -0,0 +1 @@
+# Ingest module init
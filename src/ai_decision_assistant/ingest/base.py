@@ -0,0 +1,51 @@
+"""Shared types for conversation ingestion"""
+
+from collections import deque
+from dataclasses import dataclass, field
+from typing import Deque, Iterable, Iterator, List, Tuple
+
+from config.settings import Config
+from ai_decision_assistant.core.models import DecisionAnalysis
+
+
+@dataclass
+class ConversationThread:
+    """A reconstructed conversation rendered as analyzer input"""
+    thread_id: str
+    subject: str
+    text: str
+    participants: List[str] = field(default_factory=list)
+    message_count: int = 0
+    source: str = ""
+
+
+def analyze_threads(analyzer, threads: Iterable[ConversationThread], high_stakes_mode: bool = False,
+                    caller: str = "batch:ingest",
+                    raise_errors: bool = False) -> Iterator[Tuple[ConversationThread, DecisionAnalysis]]:
+    """Analyze threads one at a time, so only a bounded window of rendered threads is held in memory.
+
+    ``raise_errors`` is passed to the analyzer: failures raise AnalysisError
+    instead of yielding a placeholder analysis. With PII redaction and ``Config.REDACT_PROCESSES`` above 1, threads are
+    redacted ahead of analysis in a process pool. Redaction runs on the
+    normalized text, as it would inside the analyzer.
+    """
+    redactor = getattr(analyzer, "redactor", None)
+    if redactor is None or Config.REDACT_PROCESSES <= 1:
+        for thread in threads:
+            yield thread, analyzer.analyze_conversation(thread.text, high_stakes_mode, raise_errors, caller=caller,
+                                                        participants=thread.participants)
+        return
+    
+    pending: Deque[ConversationThread] = deque()
+    
+    normalizer = getattr(analyzer, "normalizer", None)
+    
+    def texts() -> Iterator[Tuple[str, List[str]]]:
+        for thread in threads:
+            pending.append(thread)
+            yield normalizer.normalize(thread.text).text if normalizer else thread.text, thread.participants
+    
+    for redaction in redactor.redact_many(texts(), Config.REDACT_PROCESSES):
+        thread = pending.popleft()
+        yield thread, analyzer.analyze_conversation(thread.text, high_stakes_mode, raise_errors, caller=caller,
+                                                    redaction=redaction)
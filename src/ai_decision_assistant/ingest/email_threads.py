@@ -0,0 +1,247 @@
+"""Streaming email ingestion from mbox files, .eml files and Maildir folders.
+
+Mailboxes are read in two passes. The first pass parses headers only and
+keeps a small record per message (location, Message-ID, In-Reply-To,
+References, date). Threads are reconstructed from those records, then the
+second pass loads and renders one thread at a time, so memory is bounded by
+the header index plus the largest thread rather than the mailbox size. mbox
+files are memory-mapped and split on "From " separator lines without
+building the stdlib mailbox table of contents.
+"""
+
+import hashlib
+import html
+import mailbox
+import mmap
+import os
+import re
+from dataclasses import dataclass, field
+from email import policy
+from email.message import EmailMessage
+from email.parser import BytesHeaderParser, BytesParser
+from email.utils import getaddresses, parsedate_to_datetime
+from typing import Dict, Iterator, List, Optional, Tuple, Union
+
+from ai_decision_assistant.ingest.base import ConversationThread
+
+_MESSAGE_ID = re.compile(r"<[^<>\s]+>")
+_MBOXRD_ESCAPE = re.compile(rb"(?m)^>(>*From )")
+_HTML_TAG = re.compile(r"<[^>]+>")
+_SUBJECT_PREFIX = re.compile(r"^\s*((re|fwd?|aw)\s*(\[\d+\])?\s*:\s*)+", re.IGNORECASE)
+
+_header_parser = BytesHeaderParser(policy=policy.default)
+_message_parser = BytesParser(policy=policy.default)
+
+# Location of a message: (start, end) byte offsets in an mbox, a Maildir key, or a file path
+Location = Union[Tuple[int, int], str]
+
+
+@dataclass
+class _MessageRecord:
+    location: Location
+    message_id: str
+    parents: List[str] = field(default_factory=list)
+    timestamp: float = 0.0
+    subject: str = ""
+
+
+def _mbox_spans(data: mmap.mmap) -> Iterator[Tuple[int, int]]:
+    """Byte spans of messages in an mbox, excluding the 'From ' separator line"""
+    size = len(data)
+    start = 0 if data[:5] == b"From " else data.find(b"\nFrom ")
+    while 0 <= start < size:
+        body_start = data.find(b"\n", start + 1)
+        if body_start < 0:
+            return
+        next_start = data.find(b"\nFrom ", body_start)
+        end = size if next_start < 0 else next_start
+        yield body_start + 1, end
+        start = next_start if next_start < 0 else next_start + 1
+
+
+def _message_ids(value: Optional[str]) -> List[str]:
+    return _MESSAGE_ID.findall(str(value or ""))
+
+
+def _timestamp(value: Optional[str]) -> float:
+    try:
+        return parsedate_to_datetime(str(value)).timestamp()
+    except (TypeError, ValueError, IndexError, OverflowError):
+        return 0.0
+
+
+def _record(location: Location, headers) -> _MessageRecord:
+    ids = _message_ids(headers.get("Message-ID"))
+    message_id = ids[0] if ids else f"<synthetic-{location}>"
+    parents = _message_ids(headers.get("References")) + _message_ids(headers.get("In-Reply-To"))
+    return _MessageRecord(
+        location=location,
+        message_id=message_id,
+        parents=[p for p in parents if p != message_id],
+        timestamp=_timestamp(headers.get("Date")),
+        subject=str(headers.get("Subject") or ""),
+    )
+
+
+def message_text(message: EmailMessage) -> Tuple[str, List[str]]:
+    """Plain-text body of a message and the names of the attachments skipped"""
+    attachments = [
+        part.get_filename() or part.get_content_type()
+        for part in message.iter_attachments()
+    ] if message.is_multipart() else []
+
+    body = message.get_body(preferencelist=("plain", "html"))
+    if body is None:
+        return "", attachments
+    try:
+        text = body.get_content()
+    except (LookupError, ValueError):
+        text = body.get_payload(decode=True).decode("utf-8", errors="replace")
+    if body.get_content_type() == "text/html":
+        text = html.unescape(_HTML_TAG.sub("", text))
+    return text.strip(), attachments
+
+
+def render_message(message: EmailMessage) -> str:
+    """Render one message in the 'From: ... / body' layout the analyzer expects"""
+    text, attachments = message_text(message)
+    lines = [f"From: {message.get('From', 'unknown')}"]
+    for header in ("To", "Date", "Subject"):
+        if message.get(header):
+            lines.append(f"{header}: {message[header]}")
+    lines.append("")
+    lines.append(text)
+    if attachments:
+        lines.append(f"\n[Attachments omitted: {', '.join(attachments)}]")
+    return "\n".join(lines)
+
+
+class MailSource:
+    """Lazily readable collection of messages: an mbox file, a Maildir or .eml files"""
+
+    def __init__(self, path: str):
+        self.path = path
+        self._mmap: Optional[mmap.mmap] = None
+        self._file = None
+        self._maildir: Optional[mailbox.Maildir] = None
+
+        if os.path.isdir(path):
+            if all(os.path.isdir(os.path.join(path, sub)) for sub in ("cur", "new", "tmp")):
+                self.kind = "maildir"
+                self._maildir = mailbox.Maildir(path, factory=None, create=False)
+            else:
+                self.kind = "eml"
+        elif path.lower().endswith(".eml"):
+            self.kind = "eml"
+        else:
+            self.kind = "mbox"
+            self._file = open(path, "rb")
+            if os.fstat(self._file.fileno()).st_size:
+                self._mmap = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ)
+
+    def close(self) -> None:
+        if self._mmap is not None:
+            self._mmap.close()
+        if self._file is not None:
+            self._file.close()
+
+    def __enter__(self) -> "MailSource":
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        self.close()
+
+    def _eml_paths(self) -> List[str]:
+        if os.path.isfile(self.path):
+            return [self.path]
+        return sorted(
+            os.path.join(self.path, name) for name in os.listdir(self.path)
+            if name.lower().endswith(".eml")
+        )
+
+    def locations(self) -> Iterator[Location]:
+        if self.kind == "mbox":
+            if self._mmap is not None:
+                yield from _mbox_spans(self._mmap)
+        elif self.kind == "maildir":
+            yield from self._maildir.iterkeys()
+        else:
+            yield from self._eml_paths()
+
+    def read_bytes(self, location: Location, headers_only: bool = False) -> bytes:
+        if self.kind == "mbox":
+            start, end = location
+            if headers_only:
+                # Headers end at the first blank line; avoid copying large bodies
+                blank = self._mmap.find(b"\n\n", start, end)
+                end = end if blank < 0 else blank + 2
+            return _MBOXRD_ESCAPE.sub(rb"\1", self._mmap[start:end])
+        if self.kind == "maildir":
+            return self._maildir.get_bytes(location)
+        with open(location, "rb") as f:
+            return f.read()
+
+    def read_headers(self, location: Location):
+        return _header_parser.parsebytes(self.read_bytes(location, headers_only=True))
+
+    def read_message(self, location: Location) -> EmailMessage:
+        return _message_parser.parsebytes(self.read_bytes(location))
+
+
+def _group_threads(records: List[_MessageRecord]) -> List[List[_MessageRecord]]:
+    """Union messages that reference each other; threads ordered by first appearance"""
+    parent: Dict[str, str] = {}
+
+    def find(node: str) -> str:
+        root = node
+        while parent.setdefault(root, root) != root:
+            root = parent[root]
+        while parent[node] != root:
+            parent[node], node = root, parent[node]
+        return root
+
+    for record in records:
+        root = find(record.message_id)
+        for reference in record.parents:
+            other = find(reference)
+            if other != root:
+                parent[other] = root
+
+    threads: Dict[str, List[_MessageRecord]] = {}
+    for record in records:
+        threads.setdefault(find(record.message_id), []).append(record)
+    return list(threads.values())
+
+
+def iter_email_threads(path: str, min_messages: int = 1) -> Iterator[ConversationThread]:
+    """Yield reconstructed threads from an mbox file, .eml file/directory or Maildir.
+
+    Messages within a thread are ordered by Date, falling back to mailbox order.
+    """
+    with MailSource(path) as source:
+        records = [_record(location, source.read_headers(location)) for location in source.locations()]
+
+        for thread_records in _group_threads(records):
+            if len(thread_records) < min_messages:
+                continue
+            order = {id(r): i for i, r in enumerate(thread_records)}
+            thread_records.sort(key=lambda r: (r.timestamp, order[id(r)]))
+
+            rendered, participants = [], []
+            for record in thread_records:
+                message = source.read_message(record.location)
+                rendered.append(render_message(message))
+                for name, address in getaddresses([str(message.get("From", ""))]):
+                    participant = name or address
+                    if participant and participant not in participants:
+                        participants.append(participant)
+
+            root = thread_records[0]
+            yield ConversationThread(
+                thread_id="mail-" + hashlib.sha1(root.message_id.encode("utf-8")).hexdigest()[:12],
+                subject=_SUBJECT_PREFIX.sub("", root.subject).strip(),
+                text="\n\n---\n\n".join(rendered),
+                participants=participants,
+                message_count=len(thread_records),
+                source=path,
+            )
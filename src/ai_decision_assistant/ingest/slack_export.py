@@ -0,0 +1,199 @@
+"""Slack workspace export ingestion.
+
+A Slack export is a directory with ``users.json`` and one folder per channel
+holding a JSON file of messages per day. Channels are read day by day in a
+single pass. Threaded messages are grouped by ``thread_ts`` and emitted once
+the thread has been idle for a while (replies can land in later day files);
+top-level chatter is cut into time windows at quiet gaps. Only open threads
+and the current window are kept in memory, and the number of open threads
+is capped, so memory stays bounded regardless of export size.
+"""
+
+import json
+import os
+import re
+from collections import OrderedDict
+from dataclasses import dataclass, field
+from typing import Dict, Iterator, List, Optional
+
+from ai_decision_assistant.ingest.base import ConversationThread
+
+_USER_MENTION = re.compile(r"<@([UW][A-Z0-9]+)(?:\|([^>]+))?>")
+_CHANNEL_MENTION = re.compile(r"<#[CG][A-Z0-9]+\|([^>]+)>")
+_LINK = re.compile(r"<(https?://[^|>]+)(?:\|([^>]+))?>")
+_SPECIAL = re.compile(r"<!(here|channel|everyone)[^>]*>")
+
+# Housekeeping events that carry no conversation content
+SKIPPED_SUBTYPES = {
+    "channel_join", "channel_leave", "channel_topic", "channel_purpose",
+    "channel_name", "channel_archive", "channel_unarchive", "pinned_item", "unpinned_item",
+}
+
+
+@dataclass
+class _OpenConversation:
+    key: str
+    started: float
+    last: float
+    lines: List[str] = field(default_factory=list)
+    participants: List[str] = field(default_factory=list)
+
+    def add(self, ts: float, name: str, text: str) -> None:
+        self.last = ts
+        self.lines.append(f"{name}: {text}")
+        if name not in self.participants:
+            self.participants.append(name)
+
+
+def load_user_names(export_dir: str) -> Dict[str, str]:
+    """Map user IDs to display names from users.json"""
+    path = os.path.join(export_dir, "users.json")
+    if not os.path.exists(path):
+        return {}
+    with open(path, "r", encoding="utf-8") as f:
+        users = json.load(f)
+    names = {}
+    for user in users:
+        profile = user.get("profile", {})
+        names[user["id"]] = (
+            user.get("real_name") or profile.get("real_name")
+            or profile.get("display_name") or user.get("name") or user["id"]
+        )
+    return names
+
+
+class SlackExportReader:
+    """Stream conversations out of a Slack export directory.
+
+    Args:
+        export_dir: Root of the unzipped export.
+        window_gap_seconds: Quiet period that ends a top-level chatter window.
+        max_window_seconds: Longest span of a single chatter window.
+        max_window_messages: Most messages in a single chatter window.
+        thread_idle_seconds: Inactivity after which a thread is considered complete.
+        max_open_threads: Open threads kept before the least recently active is emitted.
+        min_messages: Conversations with fewer messages are skipped.
+        channels: Restrict to these channel folder names.
+    """
+
+    def __init__(self, export_dir: str, window_gap_seconds: float = 1800, max_window_seconds: float = 4 * 3600,
+                 max_window_messages: int = 200, thread_idle_seconds: float = 7 * 86400,
+                 max_open_threads: int = 10000, min_messages: int = 2, channels: Optional[List[str]] = None):
+        self.export_dir = export_dir
+        self.window_gap_seconds = window_gap_seconds
+        self.max_window_seconds = max_window_seconds
+        self.max_window_messages = max_window_messages
+        self.thread_idle_seconds = thread_idle_seconds
+        self.max_open_threads = max_open_threads
+        self.min_messages = min_messages
+        self.channels = channels
+        self.user_names = load_user_names(export_dir)
+
+    def channel_names(self) -> List[str]:
+        names = sorted(
+            name for name in os.listdir(self.export_dir)
+            if os.path.isdir(os.path.join(self.export_dir, name))
+        )
+        return [n for n in names if self.channels is None or n in self.channels]
+
+    def _day_messages(self, channel: str) -> Iterator[dict]:
+        """Messages of a channel in timestamp order, one day file in memory at a time"""
+        channel_dir = os.path.join(self.export_dir, channel)
+        for name in sorted(os.listdir(channel_dir)):
+            if not name.endswith(".json"):
+                continue
+            with open(os.path.join(channel_dir, name), "r", encoding="utf-8") as f:
+                messages = json.load(f)
+            messages.sort(key=lambda m: float(m.get("ts", 0)))
+            yield from messages
+
+    def _name(self, message: dict) -> str:
+        profile = message.get("user_profile") or {}
+        return (
+            self.user_names.get(message.get("user", ""))
+            or profile.get("real_name") or profile.get("display_name")
+            or message.get("username") or message.get("user") or "unknown"
+        )
+
+    def render_text(self, text: str) -> str:
+        """Replace Slack markup (mentions, links) with readable text"""
+        text = _USER_MENTION.sub(lambda m: "@" + (self.user_names.get(m.group(1)) or m.group(2) or m.group(1)), text)
+        text = _CHANNEL_MENTION.sub(r"#\1", text)
+        text = _LINK.sub(lambda m: m.group(2) or m.group(1), text)
+        text = _SPECIAL.sub(r"@\1", text)
+        return text.replace("&lt;", "<").replace("&gt;", ">").replace("&amp;", "&").strip()
+
+    def _emit(self, channel: str, kind: str, conversation: _OpenConversation) -> Optional[ConversationThread]:
+        if len(conversation.lines) < self.min_messages:
+            return None
+        header = f"Slack conversation - #{channel} channel"
+        return ConversationThread(
+            thread_id=f"slack-{channel}-{kind}-{conversation.key.replace('.', '')}",
+            subject=f"#{channel} {kind}",
+            text=header + "\n\n" + "\n\n".join(conversation.lines),
+            participants=conversation.participants,
+            message_count=len(conversation.lines),
+            source=os.path.join(self.export_dir, channel),
+        )
+
+    def _iter_channel(self, channel: str) -> Iterator[ConversationThread]:
+        threads: "OrderedDict[str, _OpenConversation]" = OrderedDict()
+        window: Optional[_OpenConversation] = None
+
+        for message in self._day_messages(channel):
+            if message.get("type", "message") != "message" or message.get("subtype") in SKIPPED_SUBTYPES:
+                continue
+            text = self.render_text(message.get("text", ""))
+            if not text:
+                continue
+            ts_key = message.get("ts", "0")
+            ts = float(ts_key)
+            name = self._name(message)
+
+            # Emit threads that have gone quiet relative to the stream position
+            while threads:
+                oldest = next(iter(threads.values()))
+                if ts - oldest.last < self.thread_idle_seconds and len(threads) <= self.max_open_threads:
+                    break
+                threads.popitem(last=False)
+                emitted = self._emit(channel, "thread", oldest)
+                if emitted:
+                    yield emitted
+
+            thread_ts = message.get("thread_ts")
+            if thread_ts:
+                thread = threads.pop(thread_ts, None) or _OpenConversation(thread_ts, ts, ts)
+                thread.add(ts, name, text)
+                threads[thread_ts] = thread  # re-insert as most recently active
+                continue
+
+            if window is not None and (
+                ts - window.last > self.window_gap_seconds
+                or ts - window.started > self.max_window_seconds
+                or len(window.lines) >= self.max_window_messages
+            ):
+                emitted = self._emit(channel, "window", window)
+                if emitted:
+                    yield emitted
+                window = None
+            if window is None:
+                window = _OpenConversation(ts_key, ts, ts)
+            window.add(ts, name, text)
+
+        if window is not None:
+            emitted = self._emit(channel, "window", window)
+            if emitted:
+                yield emitted
+        for thread in threads.values():
+            emitted = self._emit(channel, "thread", thread)
+            if emitted:
+                yield emitted
+
+    def iter_threads(self) -> Iterator[ConversationThread]:
+        for channel in self.channel_names():
+            yield from self._iter_channel(channel)
+
+
+def iter_slack_threads(export_dir: str, **options) -> Iterator[ConversationThread]:
+    """Yield thread and time-window conversations from a Slack export directory"""
+    return SlackExportReader(export_dir, **options).iter_threads()
@@ -0,0 +1,147 @@
+"""Conversations from uploaded files (.txt, .eml, .json and .zip archives).
+
+A .txt file is one conversation. An .eml file is rendered like a mailbox
+message. A .json file holds a conversation string (``{"conversation": ...}``),
+a list of such strings, or a list of chat messages (``user``/``from`` and
+``text``), e.g. a Slack day file. A .zip archive is unpacked into a temporary
+directory with size limits: a Slack export inside it goes through the Slack
+reader, .eml files are threaded by the email reader, and any other supported
+files are loaded as above.
+"""
+
+import io
+import json
+import os
+import tempfile
+import zipfile
+from email import policy
+from email.parser import BytesParser
+from typing import Any, Iterable, Iterator, List, Tuple
+
+from ai_decision_assistant.ingest.base import ConversationThread
+from ai_decision_assistant.ingest.email_threads import iter_email_threads, render_message
+from ai_decision_assistant.ingest.slack_export import iter_slack_threads
+from ai_decision_assistant.utils.exceptions import ValidationError
+
+SUPPORTED_EXTENSIONS = (".txt", ".eml", ".json", ".zip")
+
+# Limits for archive contents, guarding against zip bombs
+MAX_ARCHIVE_MEMBERS = 5000
+MAX_ARCHIVE_BYTES = 200 * 1024 * 1024
+
+
+def _decode(data: bytes) -> str:
+    for encoding in ("utf-8-sig", "cp1252"):
+        try:
+            return data.decode(encoding)
+        except UnicodeDecodeError:
+            continue
+    return data.decode("utf-8", errors="replace")
+
+
+def _thread(name: str, index: int, text: str, message_count: int = 0) -> ConversationThread:
+    thread_id = name if index == 0 else f"{name}#{index + 1}"
+    return ConversationThread(thread_id=thread_id, subject=os.path.basename(thread_id), text=text.strip(),
+                              message_count=message_count, source=name)
+
+
+def _json_conversations(value: Any) -> List[Tuple[str, int]]:
+    """(text, message count) pairs from the supported JSON layouts"""
+    if isinstance(value, dict):
+        text = value.get("conversation") or value.get("text")
+        if isinstance(text, str):
+            return [(text, 0)]
+        messages = value.get("messages")
+        return _json_conversations(messages) if isinstance(messages, list) else []
+    if not isinstance(value, list):
+        return []
+    if all(isinstance(item, str) for item in value):
+        return [(item, 0) for item in value]
+    lines = []
+    for message in value:
+        if not isinstance(message, dict) or not str(message.get("text", "")).strip():
+            continue
+        name = (message.get("user_name") or message.get("from") or message.get("username")
+                or message.get("user") or "unknown")
+        lines.append(f"{name}: {str(message['text']).strip()}")
+    return [("\n\n".join(lines), len(lines))] if lines else []
+
+
+def load_file(name: str, data: bytes) -> List[ConversationThread]:
+    """Conversations in one uploaded file; raises ValidationError for unsupported or malformed files"""
+    extension = os.path.splitext(name)[1].lower()
+    if extension == ".txt":
+        text = _decode(data)
+        return [_thread(name, 0, text)] if text.strip() else []
+    if extension == ".eml":
+        return [_thread(name, 0, render_message(BytesParser(policy=policy.default).parsebytes(data)), 1)]
+    if extension == ".json":
+        try:
+            value = json.loads(_decode(data))
+        except ValueError as e:
+            raise ValidationError(f"{name}: invalid JSON ({e})") from e
+        return [_thread(name, i, text, count)
+                for i, (text, count) in enumerate(_json_conversations(value)) if text.strip()]
+    if extension == ".zip":
+        return list(_iter_archive(name, data))
+    raise ValidationError(f"{name}: unsupported file type (expected {', '.join(SUPPORTED_EXTENSIONS)})")
+
+
+def _extract(archive: zipfile.ZipFile, target: str) -> None:
+    members = [info for info in archive.infolist() if not info.is_dir()]
+    if len(members) > MAX_ARCHIVE_MEMBERS:
+        raise ValidationError(f"archive has more than {MAX_ARCHIVE_MEMBERS} files")
+    if sum(info.file_size for info in members) > MAX_ARCHIVE_BYTES:
+        raise ValidationError(f"archive expands to more than {MAX_ARCHIVE_BYTES // (1024 * 1024)} MB")
+    root = os.path.realpath(target)
+    for info in members:
+        path = os.path.realpath(os.path.join(target, info.filename))
+        if not path.startswith(root + os.sep):
+            raise ValidationError(f"archive member escapes extraction directory: {info.filename}")
+        archive.extract(info, target)
+
+
+def _iter_archive(name: str, data: bytes) -> Iterator[ConversationThread]:
+    try:
+        archive = zipfile.ZipFile(io.BytesIO(data))
+    except zipfile.BadZipFile as e:
+        raise ValidationError(f"{name}: not a zip archive") from e
+
+    with archive, tempfile.TemporaryDirectory(prefix="upload-") as target:
+        _extract(archive, target)
+        for directory, subdirs, files in os.walk(target):
+            subdirs.sort()
+            relative = os.path.relpath(directory, target)
+            label = name if relative == "." else f"{name}/{relative}"
+            if "users.json" in files and subdirs:
+                # A Slack export: channel folders of day files, handled as a whole
+                for thread in iter_slack_threads(directory):
+                    yield _relabel(thread, label)
+                subdirs.clear()
+                continue
+            if any(f.lower().endswith(".eml") for f in files):
+                for thread in iter_email_threads(directory):
+                    yield _relabel(thread, label)
+            for filename in sorted(files):
+                if filename.lower().endswith((".txt", ".json")) and not filename.startswith("."):
+                    with open(os.path.join(directory, filename), "rb") as f:
+                        yield from load_file(f"{label}/{filename}", f.read())
+
+
+def _relabel(thread: ConversationThread, label: str) -> ConversationThread:
+    """Replace temporary extraction paths with the archive name"""
+    thread.source = label
+    thread.subject = f"{os.path.basename(label)}: {thread.subject or thread.thread_id}"
+    return thread
+
+
+def load_uploads(files: Iterable[Tuple[str, bytes]]) -> Tuple[List[ConversationThread], List[str]]:
+    """Conversations from several uploaded (name, bytes) files, plus an error per file that failed"""
+    threads: List[ConversationThread] = []
+    errors: List[str] = []
+    for name, data in files:
+        try:
+            threads.extend(load_file(name, data))
+        except (ValidationError, OSError) as e:
+            errors.append(str(e) if str(e).startswith(name) else f"{name}: {e}")
+    return threads, errors
@@ -0,0 +1,323 @@
+"""Watch a directory of conversation files and re-analyze the ones that change.
+
+Files are watched with inotify on Linux (called through libc, so there is no
+extra dependency) and by polling stat() snapshots elsewhere or when inotify
+is unavailable. Bursts of writes are debounced: a file is read once it has
+been quiet for ``debounce_seconds``, and it is analyzed only if its content
+changed. The analyzer stays warm for the whole session, so its client, view
+cache and near-duplicate index (an edited thread gets its previous analysis
+as context) are reused across changes.
+
+Each new analysis is diffed against the thread's previous one, with decisions
+aligned by text similarity, and the differences are reported as events:
+
+- ``new``: a decision with no counterpart in the previous analysis
+- ``confirmed``: a decision whose status became confirmed
+- ``withdrawn``: a previous decision without a counterpart, including every
+  decision of a deleted file
+
+With an output directory, each thread's JSON analysis and decision log are
+rewritten after every change. The stored analyses are the baseline when
+watching restarts, and up-to-date files are not analyzed again.
+
+A file whose analysis fails is reported with one ``error`` event. Its
+previous analyses and outputs are kept, and it is retried on its next change
+or when watching restarts, rather than diffed against a placeholder.
+"""
+
+import ctypes
+import ctypes.util
+import hashlib
+import os
+import select
+import struct
+import sys
+import threading
+import time
+from typing import Any, Dict, Iterator, List, Optional, Set
+
+from ai_decision_assistant.core.clustering import decision_text
+from ai_decision_assistant.core.consistency import match
+from ai_decision_assistant.core.models import DecisionAnalysis, DecisionStatus
+from ai_decision_assistant.core.policy import default_policy
+from ai_decision_assistant.ingest.base import analyze_threads
+from ai_decision_assistant.ingest.uploads import load_file
+from ai_decision_assistant.utils.exceptions import AnalysisError, BudgetExceededError, ValidationError
+
+WATCH_EXTENSIONS = (".txt", ".eml", ".json")
+
+_IN_MODIFY = 0x2
+_IN_CLOSE_WRITE = 0x8
+_IN_MOVED_FROM = 0x40
+_IN_MOVED_TO = 0x80
+_IN_CREATE = 0x100
+_IN_DELETE = 0x200
+_IN_Q_OVERFLOW = 0x4000
+_INOTIFY_MASK = _IN_MODIFY | _IN_CLOSE_WRITE | _IN_MOVED_FROM | _IN_MOVED_TO | _IN_CREATE | _IN_DELETE
+# struct inotify_event: wd, mask, cookie, len, then a NUL-padded name
+_INOTIFY_EVENT = struct.Struct("iIII")
+
+
+class _InotifyBackend:
+    name = "inotify"
+
+    def __init__(self, directory: str):
+        libc = ctypes.CDLL(ctypes.util.find_library("c") or "libc.so.6", use_errno=True)
+        self.fd = libc.inotify_init1(os.O_NONBLOCK | os.O_CLOEXEC)
+        if self.fd < 0:
+            raise OSError(ctypes.get_errno(), "inotify_init1 failed")
+        if libc.inotify_add_watch(self.fd, os.fsencode(directory), _INOTIFY_MASK) < 0:
+            errno = ctypes.get_errno()
+            os.close(self.fd)
+            raise OSError(errno, f"cannot watch {directory}")
+
+    def changed(self, timeout: float) -> Optional[Set[str]]:
+        """Names changed within timeout, or None if events were lost"""
+        names: Set[str] = set()
+        ready, _, _ = select.select([self.fd], [], [], timeout)
+        while ready:
+            try:
+                data = os.read(self.fd, 1 << 16)
+            except BlockingIOError:
+                break
+            offset = 0
+            while offset + _INOTIFY_EVENT.size <= len(data):
+                _, mask, _, length = _INOTIFY_EVENT.unpack_from(data, offset)
+                name = data[offset + _INOTIFY_EVENT.size:offset + _INOTIFY_EVENT.size + length].rstrip(b"\0")
+                offset += _INOTIFY_EVENT.size + length
+                if mask & _IN_Q_OVERFLOW:
+                    return None
+                if name:
+                    names.add(os.fsdecode(name))
+        return names
+
+    def close(self) -> None:
+        os.close(self.fd)
+
+
+class _PollingBackend:
+    name = "polling"
+
+    def __init__(self, directory: str, interval: float):
+        self.directory = directory
+        self.interval = interval
+        self.snapshot = self._scan()
+
+    def _scan(self) -> Dict[str, tuple]:
+        snapshot = {}
+        with os.scandir(self.directory) as entries:
+            for entry in entries:
+                try:
+                    if entry.is_file():
+                        stat = entry.stat()
+                        snapshot[entry.name] = (stat.st_mtime_ns, stat.st_size)
+                except FileNotFoundError:
+                    continue
+        return snapshot
+
+    def changed(self, timeout: float) -> Optional[Set[str]]:
+        time.sleep(min(timeout, self.interval))
+        current = self._scan()
+        names = {name for name in current.keys() | self.snapshot.keys() if current.get(name) != self.snapshot.get(name)}
+        self.snapshot = current
+        return names
+
+    def close(self) -> None:
+        pass
+
+
+class DirectoryWatcher:
+    """Debounced change notifications for conversation files in one directory (not recursive).
+
+    Args:
+        directory: Directory to watch.
+        debounce_seconds: Quiet time after the last write before a file is reported.
+        poll_seconds: Polling interval when inotify is not used.
+        use_inotify: Force (True) or disable (False) inotify; by default it is used where available.
+    """
+
+    def __init__(self, directory: str, debounce_seconds: float = 1.0, poll_seconds: float = 1.0,
+                 use_inotify: Optional[bool] = None):
+        self.directory = directory
+        self.debounce_seconds = debounce_seconds
+        self.poll_seconds = poll_seconds
+        self.backend: Any = None
+        if use_inotify or (use_inotify is None and sys.platform.startswith("linux")):
+            try:
+                self.backend = _InotifyBackend(directory)
+            except (OSError, AttributeError):
+                if use_inotify:
+                    raise
+        if self.backend is None:
+            self.backend = _PollingBackend(directory, poll_seconds)
+        self._known: Set[str] = {name for name in os.listdir(directory) if self._watched(name)}
+
+    @staticmethod
+    def _watched(name: str) -> bool:
+        # Editors' swap and backup files are ignored; their renames onto the real name are not
+        return not name.startswith(".") and name.lower().endswith(WATCH_EXTENSIONS)
+
+    def changes(self, stop: Optional[threading.Event] = None) -> Iterator[List[str]]:
+        """Batches of paths whose writes have settled, until ``stop`` is set"""
+        stop = stop or threading.Event()
+        pending: Dict[str, float] = {}
+        while not stop.is_set():
+            timeout = self.poll_seconds
+            if pending:
+                timeout = max(0.0, min(pending.values()) + self.debounce_seconds - time.monotonic())
+            names = self.backend.changed(min(timeout, self.poll_seconds))
+            if names is None:
+                # Events were lost: recheck every file, including ones that may have been deleted
+                names = set(os.listdir(self.directory)) | self._known
+            now = time.monotonic()
+            for name in names:
+                if self._watched(name):
+                    pending[name] = now
+            settled = sorted(name for name, last in pending.items() if now - last >= self.debounce_seconds)
+            for name in settled:
+                del pending[name]
+            self._known |= set(settled)
+            if settled:
+                yield [os.path.join(self.directory, name) for name in settled]
+
+    def close(self) -> None:
+        self.backend.close()
+
+
+def decision_changes(previous: Optional[DecisionAnalysis], current: Optional[DecisionAnalysis],
+                     similarity: float = 0.35) -> List[Dict[str, Any]]:
+    """New, confirmed and withdrawn decisions between two analyses of a thread"""
+    before = previous.decisions if previous else []
+    after = current.decisions if current else []
+    counterpart = match([decision_text(d) for d in before], [decision_text(d) for d in after], similarity)
+
+    def event(kind: str, decision, **extra) -> Dict[str, Any]:
+        return {"event": kind, "decision": decision.decision, "status": decision.status.value,
+                "owner": decision.owner, "deadline": decision.deadline, "confidence": decision.confidence, **extra}
+
+    events = []
+    matched = set(int(j) for j in counterpart if j >= 0)
+    for j, decision in enumerate(after):
+        if j not in matched:
+            events.append(event("new", decision))
+    for i, decision in enumerate(before):
+        j = int(counterpart[i])
+        if j < 0:
+            events.append(event("withdrawn", decision))
+        elif after[j].status == DecisionStatus.CONFIRMED and decision.status != DecisionStatus.CONFIRMED:
+            events.append(event("confirmed", after[j], previous_status=decision.status.value))
+    return events
+
+
+class WatchSession:
+    """Analyzes changed conversation files and reports decision changes.
+
+    Args:
+        analyzer: A DecisionAnalyzer kept warm for the whole session.
+        directory: Directory of conversation files (.txt, .eml, .json).
+        output_dir: Where ``<thread>.json`` analyses and ``<thread>.md`` decision logs are kept up to date.
+        high_stakes_mode: Analyze in high-stakes mode.
+        archive: AnalysisArchive every new analysis is appended to, or None.
+        similarity: Cosine similarity at which decisions of two analyses are the same.
+    """
+
+    def __init__(self, analyzer, directory: str, output_dir: Optional[str] = None, high_stakes_mode: bool = False,
+                 archive=None, similarity: float = 0.35, caller: str = "watch"):
+        self.analyzer = analyzer
+        self.directory = directory
+        self.output_dir = output_dir
+        self.high_stakes_mode = high_stakes_mode
+        self.archive = archive
+        self.similarity = similarity
+        self.caller = caller
+        self._digests: Dict[str, str] = {}
+        self._threads: Dict[str, List[str]] = {}
+        self._analyses: Dict[str, DecisionAnalysis] = {}
+        if output_dir:
+            os.makedirs(output_dir, exist_ok=True)
+
+    def _output(self, thread_id: str, extension: str) -> str:
+        return os.path.join(self.output_dir, f"{thread_id}{extension}")
+
+    def _previous(self, thread_id: str) -> Optional[DecisionAnalysis]:
+        if thread_id in self._analyses:
+            return self._analyses[thread_id]
+        if self.output_dir and os.path.exists(self._output(thread_id, ".json")):
+            with open(self._output(thread_id, ".json"), encoding="utf-8") as f:
+                return DecisionAnalysis.model_validate_json(f.read())
+        return None
+
+    def _write(self, thread_id: str, analysis: DecisionAnalysis) -> None:
+        with open(self._output(thread_id, ".json"), "w", encoding="utf-8") as f:
+            f.write(analysis.model_dump_json(indent=2))
+        with open(self._output(thread_id, ".md"), "w", encoding="utf-8") as f:
+            f.write(self.analyzer.generate_decision_log(analysis, {}) + "\n"
+                    + default_policy().check(analysis, {}).to_markdown())
+
+    def _up_to_date(self, path: str, thread_ids: List[str]) -> bool:
+        if not self.output_dir or not thread_ids:
+            return False
+        modified = os.path.getmtime(path)
+        outputs = [self._output(thread_id, ".json") for thread_id in thread_ids]
+        return all(os.path.exists(output) and os.path.getmtime(output) >= modified for output in outputs)
+
+    def start(self) -> List[Dict[str, Any]]:
+        """Analyze files changed since their stored analyses were written; returns the change events"""
+        events = []
+        for name in sorted(os.listdir(self.directory)):
+            path = os.path.join(self.directory, name)
+            if DirectoryWatcher._watched(name) and os.path.isfile(path):
+                events.extend(self.process(path, resume=True))
+        return events
+
+    def process(self, path: str, resume: bool = False) -> List[Dict[str, Any]]:
+        """Re-analyze one file if its content changed; returns the change events"""
+        name = os.path.basename(path)
+        try:
+            with open(path, "rb") as f:
+                data: Optional[bytes] = f.read()
+        except FileNotFoundError:
+            data = None
+        digest = hashlib.sha256(data).hexdigest() if data is not None else None
+        if digest == self._digests.get(name):
+            return []
+        
+        threads = []
+        if data is not None:
+            try:
+                threads = load_file(name, data)
+            except ValidationError as e:
+                return [{"event": "error", "file": name, "error": str(e), "ts": time.time()}]
+        thread_ids = [thread.thread_id for thread in threads]
+        
+        events: List[Dict[str, Any]] = []
+        if resume and self._up_to_date(path, thread_ids):
+            for thread_id in thread_ids:
+                self._analyses[thread_id] = self._previous(thread_id)
+        else:
+            try:
+                # Every thread of the file is analyzed before anything is reported or written
+                results = list(analyze_threads(self.analyzer, threads, self.high_stakes_mode, self.caller,
+                                               raise_errors=True))
+            except (AnalysisError, BudgetExceededError) as e:
+                return [{"event": "error", "file": name, "error": str(e), "ts": time.time()}]
+            for thread, analysis in results:
+                for event in decision_changes(self._previous(thread.thread_id), analysis, self.similarity):
+                    events.append(dict(event, file=name, thread=thread.thread_id, ts=time.time()))
+                self._analyses[thread.thread_id] = analysis
+                if self.output_dir:
+                    self._write(thread.thread_id, analysis)
+                if self.archive is not None:
+                    self.archive.append(thread.text, analysis, source=f"watch:{thread.thread_id}")
+        
+        # Threads gone from the file, or the whole file deleted: their decisions are withdrawn
+        for thread_id in self._threads.get(name, []):
+            if thread_id not in thread_ids:
+                for event in decision_changes(self._analyses.pop(thread_id, None), None, self.similarity):
+                    events.append(dict(event, file=name, thread=thread_id, ts=time.time()))
+        self._threads[name] = thread_ids
+        if digest is None:
+            self._digests.pop(name, None)
+        else:
+            self._digests[name] = digest
+        return events
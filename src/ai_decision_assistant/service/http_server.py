@@ -0,0 +1,321 @@
+"""Asynchronous HTTP analysis service.
+
+A small asyncio HTTP/1.1 server (stdlib only) exposing:
+
+- ``GET /healthz`` - liveness plus queue statistics
+- ``POST /analyze`` - ``{"conversation": str, "high_stakes_mode": bool}`` -> DecisionAnalysis JSON
+- ``POST /analyze/batch`` - ``{"conversations": [{"id": ..., "conversation": ...}, ...]}``
+  -> NDJSON stream, one line per conversation as soon as it completes
+
+Analyses run on a bounded thread pool. Admission is checked before any work
+is queued: when running plus queued analyses would exceed the limits the
+request gets ``503`` with ``Retry-After``, and a client exceeding its own
+concurrency limit gets ``429``. A batch is admitted by its first item; the
+remaining items wait for free slots and stream through them, so a batch
+larger than the limits is never rejected outright. An analysis refused by
+the spend budget is ``429`` too, or an ``error`` line in a batch stream.
+Shutdown stops accepting
+connections and drains in-flight analyses before returning.
+"""
+
+import asyncio
+import functools
+import json
+import signal
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass, field
+from typing import Any, Dict, Optional, Tuple
+
+from ai_decision_assistant.core.decision_analyzer import DecisionAnalyzer
+from ai_decision_assistant.utils.exceptions import BudgetExceededError
+
+MAX_BODY_BYTES = 10 * 1024 * 1024
+_REASONS = {
+    200: "OK", 400: "Bad Request", 404: "Not Found", 405: "Method Not Allowed",
+    413: "Payload Too Large", 429: "Too Many Requests", 503: "Service Unavailable",
+}
+
+
+class HTTPError(Exception):
+    """An error response with an optional Retry-After hint"""
+
+    def __init__(self, status: int, message: str, retry_after: Optional[int] = None):
+        super().__init__(message)
+        self.status = status
+        self.retry_after = retry_after
+
+
+@dataclass
+class ServiceStats:
+    in_flight: int = 0
+    completed: int = 0
+    rejected: int = 0
+    per_client: Dict[str, int] = field(default_factory=dict)
+
+
+class AnalysisService:
+    """HTTP front end for a DecisionAnalyzer with bounded concurrency and queueing.
+
+    Args:
+        analyzer: Analyzer shared by all requests.
+        max_concurrency: Analyses running at once (thread pool size).
+        max_queue: Analyses allowed to wait for a worker before requests are rejected.
+        per_client_limit: Admitted analyses per client (X-Client-Id header, else peer address).
+        retry_after: Seconds suggested to rejected clients.
+    """
+
+    def __init__(self, analyzer: DecisionAnalyzer, max_concurrency: int = 8, max_queue: int = 64,
+                 per_client_limit: int = 16, retry_after: int = 5):
+        self.analyzer = analyzer
+        self.max_concurrency = max_concurrency
+        self.max_queue = max_queue
+        self.per_client_limit = per_client_limit
+        self.retry_after = retry_after
+        self.stats = ServiceStats()
+        self.draining = False
+        self._executor = ThreadPoolExecutor(max_workers=max_concurrency, thread_name_prefix="analysis")
+        self._server: Optional[asyncio.AbstractServer] = None
+        self._connections: set = set()
+        self._idle: Optional[asyncio.Event] = None
+        self._freed: Optional[asyncio.Event] = None
+
+    # Admission control
+
+    def _refusal(self, client: str, count: int) -> Optional[HTTPError]:
+        if self.draining:
+            return HTTPError(503, "Service is shutting down", self.retry_after)
+        if self.stats.in_flight + count > self.max_concurrency + self.max_queue:
+            return HTTPError(503, "Analysis queue is full", self.retry_after)
+        if self.stats.per_client.get(client, 0) + count > self.per_client_limit:
+            return HTTPError(429, "Per-client concurrency limit reached", self.retry_after)
+        return None
+
+    def _admit(self, client: str, count: int) -> None:
+        refusal = self._refusal(client, count)
+        if refusal is not None:
+            if not self.draining:
+                self.stats.rejected += 1
+            raise refusal
+        self.stats.in_flight += count
+        self.stats.per_client[client] = self.stats.per_client.get(client, 0) + count
+        if self._idle is not None:
+            self._idle.clear()
+
+    async def _admit_when_free(self, client: str) -> None:
+        """Admit one more batch item once a slot is free; fails only when shutting down"""
+        if self._freed is None:
+            self._freed = asyncio.Event()
+        while self._refusal(client, 1) is not None and not self.draining:
+            self._freed.clear()
+            await self._freed.wait()
+        self._admit(client, 1)
+
+    def _release(self, client: str) -> None:
+        self.stats.in_flight -= 1
+        self.stats.completed += 1
+        remaining = self.stats.per_client.get(client, 1) - 1
+        if remaining:
+            self.stats.per_client[client] = remaining
+        else:
+            self.stats.per_client.pop(client, None)
+        if self._freed is not None:
+            self._freed.set()
+        if self.stats.in_flight == 0 and self._idle is not None:
+            self._idle.set()
+
+    async def _analyze(self, client: str, conversation: str, high_stakes_mode: bool) -> Dict[str, Any]:
+        """Run one admitted analysis on the pool; releases its slot when done"""
+        try:
+            loop = asyncio.get_running_loop()
+            result = await loop.run_in_executor(
+                self._executor, functools.partial(self.analyzer.analyze_conversation, conversation,
+                                                  high_stakes_mode, caller=f"service:{client}")
+            )
+            return result.model_dump(mode="json")
+        except BudgetExceededError as e:
+            raise HTTPError(429, str(e), self.retry_after) from e
+        finally:
+            self._release(client)
+
+    # HTTP plumbing
+
+    @staticmethod
+    async def _read_request(reader: asyncio.StreamReader) -> Tuple[str, str, Dict[str, str], bytes]:
+        request_line = (await reader.readline()).decode("latin-1").strip()
+        if not request_line:
+            raise ConnectionResetError
+        try:
+            method, path, _ = request_line.split(" ", 2)
+        except ValueError:
+            raise HTTPError(400, "Malformed request line")
+        headers = {}
+        while True:
+            line = (await reader.readline()).decode("latin-1")
+            if line in ("\r\n", "\n", ""):
+                break
+            name, _, value = line.partition(":")
+            headers[name.strip().lower()] = value.strip()
+        try:
+            length = int(headers.get("content-length") or 0)
+        except ValueError:
+            raise HTTPError(400, "Invalid Content-Length")
+        if length < 0:
+            raise HTTPError(400, "Invalid Content-Length")
+        if length > MAX_BODY_BYTES:
+            raise HTTPError(413, "Request body too large")
+        body = await reader.readexactly(length) if length else b""
+        return method.upper(), path.split("?", 1)[0], headers, body
+
+    @staticmethod
+    def _head(status: int, content_type: str, extra: Optional[Dict[str, str]] = None) -> bytes:
+        lines = [f"HTTP/1.1 {status} {_REASONS.get(status, 'OK')}", f"Content-Type: {content_type}",
+                 "Connection: close"]
+        lines.extend(f"{k}: {v}" for k, v in (extra or {}).items())
+        return ("\r\n".join(lines) + "\r\n").encode("latin-1")
+
+    async def _send_json(self, writer: asyncio.StreamWriter, status: int, payload: Any,
+                         extra: Optional[Dict[str, str]] = None) -> None:
+        body = json.dumps(payload).encode("utf-8")
+        headers = dict(extra or {}, **{"Content-Length": str(len(body))})
+        writer.write(self._head(status, "application/json", headers) + b"\r\n" + body)
+        await writer.drain()
+
+    @staticmethod
+    def _parse_json(body: bytes) -> Dict[str, Any]:
+        try:
+            payload = json.loads(body or b"{}")
+        except ValueError:
+            raise HTTPError(400, "Body must be JSON")
+        if not isinstance(payload, dict):
+            raise HTTPError(400, "Body must be a JSON object")
+        return payload
+
+    @staticmethod
+    def _conversation(item: Dict[str, Any]) -> str:
+        conversation = item.get("conversation")
+        if not isinstance(conversation, str) or not conversation.strip():
+            raise HTTPError(400, "'conversation' must be a non-empty string")
+        return conversation
+
+    async def _handle_analyze(self, writer, client: str, payload: Dict[str, Any]) -> None:
+        conversation = self._conversation(payload)
+        self._admit(client, 1)
+        result = await self._analyze(client, conversation, bool(payload.get("high_stakes_mode", False)))
+        await self._send_json(writer, 200, result)
+
+    async def _handle_batch(self, writer, client: str, payload: Dict[str, Any]) -> None:
+        items = payload.get("conversations")
+        if not isinstance(items, list) or not items:
+            raise HTTPError(400, "'conversations' must be a non-empty list")
+        jobs = [(item.get("id", i), self._conversation(item), bool(item.get("high_stakes_mode", False)))
+                for i, item in enumerate(items)]
+        # A busy service or client is refused up front; the rest of the batch queues behind its own slots
+        self._admit(client, 1)
+
+        async def run(index, job_id, conversation, high_stakes_mode):
+            try:
+                if index:
+                    await self._admit_when_free(client)
+                return {"id": job_id, "analysis": await self._analyze(client, conversation, high_stakes_mode)}
+            except HTTPError as e:
+                return {"id": job_id, "error": str(e)}
+
+        tasks = [asyncio.ensure_future(run(i, *job)) for i, job in enumerate(jobs)]
+        writer.write(self._head(200, "application/x-ndjson", {"Transfer-Encoding": "chunked"}) + b"\r\n")
+        try:
+            for next_done in asyncio.as_completed(tasks):
+                line = json.dumps(await next_done).encode("utf-8") + b"\n"
+                writer.write(f"{len(line):x}\r\n".encode("latin-1") + line + b"\r\n")
+                await writer.drain()
+            writer.write(b"0\r\n\r\n")
+            await writer.drain()
+        except (ConnectionError, asyncio.CancelledError):
+            # Client went away: let queued work finish so slots are released
+            await asyncio.gather(*tasks, return_exceptions=True)
+            raise
+
+    def health(self) -> Dict[str, Any]:
+        return {
+            "status": "draining" if self.draining else "ok",
+            "in_flight": self.stats.in_flight,
+            "queued": max(0, self.stats.in_flight - self.max_concurrency),
+            "completed": self.stats.completed,
+            "rejected": self.stats.rejected,
+            "capacity": self.max_concurrency + self.max_queue,
+        }
+
+    async def _handle_connection(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter) -> None:
+        self._connections.add(writer)
+        try:
+            method, path, headers, body = await self._read_request(reader)
+            peer = writer.get_extra_info("peername")
+            client = headers.get("x-client-id") or (peer[0] if peer else "unknown")
+
+            if path == "/healthz":
+                if method != "GET":
+                    raise HTTPError(405, "Use GET")
+                await self._send_json(writer, 200, self.health())
+            elif path in ("/analyze", "/analyze/batch"):
+                if method != "POST":
+                    raise HTTPError(405, "Use POST")
+                payload = self._parse_json(body)
+                if path == "/analyze":
+                    await self._handle_analyze(writer, client, payload)
+                else:
+                    await self._handle_batch(writer, client, payload)
+            else:
+                raise HTTPError(404, f"No route for {path}")
+        except HTTPError as e:
+            extra = {"Retry-After": str(e.retry_after)} if e.retry_after else None
+            try:
+                await self._send_json(writer, e.status, {"error": str(e)}, extra)
+            except ConnectionError:
+                pass
+        except (ConnectionError, asyncio.IncompleteReadError):
+            pass
+        finally:
+            self._connections.discard(writer)
+            writer.close()
+
+    # Lifecycle
+
+    async def start(self, host: str = "127.0.0.1", port: int = 8080) -> Tuple[str, int]:
+        self._idle = asyncio.Event()
+        self._idle.set()
+        self._server = await asyncio.start_server(self._handle_connection, host, port)
+        return self._server.sockets[0].getsockname()[:2]
+
+    async def shutdown(self, timeout: float = 30.0) -> None:
+        """Stop accepting work and wait for in-flight analyses to finish"""
+        self.draining = True
+        if self._freed is not None:
+            self._freed.set()
+        if self._server is not None:
+            self._server.close()
+            await self._server.wait_closed()
+        if self._idle is not None:
+            try:
+                await asyncio.wait_for(self._idle.wait(), timeout)
+            except asyncio.TimeoutError:
+                pass
+        self._executor.shutdown(wait=False)
+
+
+async def serve(analyzer: DecisionAnalyzer, host: str = "127.0.0.1", port: int = 8080,
+                drain_timeout: float = 30.0, **options) -> None:
+    """Run the service until SIGINT/SIGTERM, then drain gracefully"""
+    service = AnalysisService(analyzer, **options)
+    bound_host, bound_port = await service.start(host, port)
+    print(f"🌐 Analysis service listening on http://{bound_host}:{bound_port}")
+
+    stop = asyncio.Event()
+    loop = asyncio.get_running_loop()
+    for sig in (signal.SIGINT, signal.SIGTERM):
+        try:
+            loop.add_signal_handler(sig, stop.set)
+        except (NotImplementedError, RuntimeError):
+            pass  # e.g. Windows or non-main thread
+    await stop.wait()
+
+    print("🛑 Shutting down, draining in-flight analyses...")
+    await service.shutdown(drain_timeout)
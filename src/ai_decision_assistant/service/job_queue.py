@@ -0,0 +1,307 @@
+"""Durable analysis job queue backed by SQLite.
+
+Jobs survive crashes and restarts. Each job is keyed by an idempotency key
+derived from the conversation hash, so enqueueing the same conversation twice
+is a no-op. Workers lease jobs for a limited time; a job whose lease expires
+(worker crashed or hung) is handed out again, giving at-least-once delivery;
+workers renew their lease while an analysis runs, so a slow analysis is not
+handed out twice. Completion is only accepted from the current lease holder,
+so a late worker cannot overwrite or duplicate a result. Jobs refused by the
+usage budget are put back with a delay and do not count as attempts. The database runs in WAL mode so
+many worker processes can read while one writes.
+"""
+
+import hashlib
+import multiprocessing
+import os
+import sqlite3
+import threading
+import time
+import uuid
+from contextlib import contextmanager
+from dataclasses import dataclass
+from typing import Any, Callable, Dict, Iterator, List, Optional, Tuple
+
+from ai_decision_assistant.core.models import DecisionAnalysis
+from ai_decision_assistant.utils.exceptions import AnalysisError, BudgetExceededError, ConfigurationError
+from ai_decision_assistant.utils.helpers import conversation_hash
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS jobs (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    idempotency_key TEXT NOT NULL UNIQUE,
+    conversation TEXT NOT NULL,
+    high_stakes INTEGER NOT NULL DEFAULT 0,
+    source TEXT NOT NULL DEFAULT '',
+    status TEXT NOT NULL DEFAULT 'queued',
+    attempts INTEGER NOT NULL DEFAULT 0,
+    available_at REAL NOT NULL,
+    lease_owner TEXT,
+    lease_expires REAL,
+    enqueued_at REAL NOT NULL,
+    started_at REAL,
+    finished_at REAL,
+    result TEXT,
+    last_error TEXT
+);
+CREATE INDEX IF NOT EXISTS jobs_ready ON jobs (status, available_at);
+CREATE INDEX IF NOT EXISTS jobs_finished ON jobs (finished_at);
+"""
+
+
+def idempotency_key(conversation: str, high_stakes_mode: bool = False) -> str:
+    """Job key: the conversation hash qualified by analysis mode"""
+    return hashlib.sha256(f"{int(high_stakes_mode)}:{conversation_hash(conversation)}".encode("utf-8")).hexdigest()
+
+
+@dataclass
+class Job:
+    id: int
+    key: str
+    conversation: str
+    high_stakes_mode: bool
+    source: str
+    attempts: int
+
+
+class JobQueue:
+    """SQLite job queue with leases, retries and statistics.
+
+    Connections are opened lazily per process, so one JobQueue can be handed
+    to forked worker processes.
+    """
+
+    def __init__(self, path: str, lease_seconds: float = 300.0, max_attempts: int = 5,
+                 retry_backoff: float = 30.0):
+        self.path = path
+        self.lease_seconds = lease_seconds
+        self.max_attempts = max_attempts
+        self.retry_backoff = retry_backoff
+        self._conn: Optional[sqlite3.Connection] = None
+        self._pid: Optional[int] = None
+
+    @property
+    def conn(self) -> sqlite3.Connection:
+        if self._conn is None or self._pid != os.getpid():
+            self._conn = sqlite3.connect(self.path, timeout=30.0, isolation_level=None)
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.execute("PRAGMA synchronous=NORMAL")
+            self._conn.executescript(SCHEMA)
+            self._pid = os.getpid()
+        return self._conn
+
+    def close(self) -> None:
+        if self._conn is not None and self._pid == os.getpid():
+            self._conn.close()
+        self._conn = None
+
+    def enqueue(self, conversation: str, high_stakes_mode: bool = False, source: str = "") -> Tuple[str, bool]:
+        """Add a job unless one with the same key exists; returns (key, created)"""
+        key = idempotency_key(conversation, high_stakes_mode)
+        now = time.time()
+        cursor = self.conn.execute(
+            "INSERT OR IGNORE INTO jobs (idempotency_key, conversation, high_stakes, source, available_at, enqueued_at)"
+            " VALUES (?, ?, ?, ?, ?, ?)",
+            (key, conversation, int(high_stakes_mode), source, now, now),
+        )
+        return key, cursor.rowcount == 1
+
+    def lease(self, worker_id: str) -> Optional[Job]:
+        """Claim the oldest ready job (queued, or leased with an expired lease)"""
+        now = time.time()
+        conn = self.conn
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            # Jobs whose workers died on every attempt are given up on
+            conn.execute(
+                "UPDATE jobs SET status = 'failed', finished_at = ?, last_error = COALESCE(last_error, 'lease expired')"
+                " WHERE status = 'leased' AND lease_expires <= ? AND attempts >= ?",
+                (now, now, self.max_attempts),
+            )
+            row = conn.execute(
+                "SELECT id, idempotency_key, conversation, high_stakes, source, attempts FROM jobs"
+                " WHERE (status = 'queued' AND available_at <= ?) OR (status = 'leased' AND lease_expires <= ?)"
+                " ORDER BY id LIMIT 1",
+                (now, now),
+            ).fetchone()
+            if row is None:
+                conn.execute("COMMIT")
+                return None
+            conn.execute(
+                "UPDATE jobs SET status = 'leased', lease_owner = ?, lease_expires = ?, attempts = attempts + 1,"
+                " started_at = COALESCE(started_at, ?) WHERE id = ?",
+                (worker_id, now + self.lease_seconds, now, row[0]),
+            )
+            conn.execute("COMMIT")
+        except BaseException:
+            conn.execute("ROLLBACK")
+            raise
+        return Job(id=row[0], key=row[1], conversation=row[2], high_stakes_mode=bool(row[3]),
+                   source=row[4], attempts=row[5] + 1)
+
+    def renew(self, job: Job, worker_id: str) -> bool:
+        """Extend the lease by lease_seconds; False if the worker no longer holds it"""
+        cursor = self.conn.execute(
+            "UPDATE jobs SET lease_expires = ? WHERE id = ? AND status = 'leased' AND lease_owner = ?",
+            (time.time() + self.lease_seconds, job.id, worker_id),
+        )
+        return cursor.rowcount == 1
+
+    def complete(self, job: Job, worker_id: str, analysis: DecisionAnalysis) -> bool:
+        """Persist a result; ignored unless the worker still holds the lease"""
+        cursor = self.conn.execute(
+            "UPDATE jobs SET status = 'done', result = ?, finished_at = ?, lease_owner = NULL, lease_expires = NULL"
+            " WHERE id = ? AND status = 'leased' AND lease_owner = ?",
+            (analysis.model_dump_json(), time.time(), job.id, worker_id),
+        )
+        return cursor.rowcount == 1
+
+    def fail(self, job: Job, worker_id: str, error: str) -> bool:
+        """Record a failed attempt; requeue with backoff until max_attempts is reached"""
+        now = time.time()
+        final = job.attempts >= self.max_attempts
+        cursor = self.conn.execute(
+            "UPDATE jobs SET status = ?, last_error = ?, available_at = ?, finished_at = ?,"
+            " lease_owner = NULL, lease_expires = NULL"
+            " WHERE id = ? AND status = 'leased' AND lease_owner = ?",
+            ("failed" if final else "queued", error, now + self.retry_backoff * job.attempts,
+             now if final else None, job.id, worker_id),
+        )
+        return cursor.rowcount == 1
+
+    def defer(self, job: Job, worker_id: str, reason: str, delay: Optional[float] = None) -> bool:
+        """Requeue a job that could not run yet (e.g. over budget) without counting the attempt"""
+        cursor = self.conn.execute(
+            "UPDATE jobs SET status = 'queued', attempts = attempts - 1, last_error = ?, available_at = ?,"
+            " lease_owner = NULL, lease_expires = NULL"
+            " WHERE id = ? AND status = 'leased' AND lease_owner = ?",
+            (reason, time.time() + (self.retry_backoff if delay is None else delay), job.id, worker_id),
+        )
+        return cursor.rowcount == 1
+
+    def result(self, key: str) -> Optional[DecisionAnalysis]:
+        row = self.conn.execute(
+            "SELECT result FROM jobs WHERE idempotency_key = ? AND status = 'done'", (key,)
+        ).fetchone()
+        return DecisionAnalysis.model_validate_json(row[0]) if row else None
+
+    def stats(self, window_seconds: float = 60.0) -> Dict[str, Any]:
+        """Queue depth by status, retries and recent throughput"""
+        counts = dict(self.conn.execute("SELECT status, COUNT(*) FROM jobs GROUP BY status").fetchall())
+        retries = self.conn.execute(
+            "SELECT COALESCE(SUM(attempts - 1), 0) FROM jobs WHERE attempts > 1"
+        ).fetchone()[0]
+        since = time.time() - window_seconds
+        recent, avg_seconds = self.conn.execute(
+            "SELECT COUNT(*), AVG(finished_at - started_at) FROM jobs WHERE status = 'done' AND finished_at >= ?",
+            (since,),
+        ).fetchone()
+        return {
+            "queued": counts.get("queued", 0),
+            "leased": counts.get("leased", 0),
+            "done": counts.get("done", 0),
+            "failed": counts.get("failed", 0),
+            "retries": retries,
+            "throughput_per_minute": recent * 60.0 / window_seconds,
+            "avg_job_seconds": avg_seconds or 0.0,
+        }
+
+
+@contextmanager
+def _lease_heartbeat(queue: JobQueue, job: Job, worker_id: str) -> Iterator[None]:
+    """Renew the job's lease every third of lease_seconds while the body runs"""
+    stop = threading.Event()
+
+    def beat() -> None:
+        # SQLite connections belong to the thread that opened them
+        renewer = JobQueue(queue.path, lease_seconds=queue.lease_seconds)
+        try:
+            while not stop.wait(queue.lease_seconds / 3) and renewer.renew(job, worker_id):
+                pass
+        finally:
+            renewer.close()
+
+    thread = threading.Thread(target=beat, name=f"lease-{job.id}", daemon=True)
+    thread.start()
+    try:
+        yield
+    finally:
+        stop.set()
+        thread.join()
+
+
+def worker_loop(queue: JobQueue, analyzer_factory: Callable[[], Any], worker_id: Optional[str] = None,
+                poll_interval: float = 1.0, exit_when_empty: bool = False,
+                max_jobs: Optional[int] = None) -> int:
+    """Lease, analyze and persist jobs until stopped.
+
+    Stops when the queue is empty (if ``exit_when_empty``) or after processing
+    ``max_jobs`` jobs, successful or not. Returns the number completed.
+    Refuses to start, before leasing anything, when the analyzer has no model
+    client (no API key and no replay cassette): its demo analyses would be
+    stored as real results. Budget refusals are deferred, not failed.
+    """
+    worker_id = worker_id or f"{os.getpid()}-{uuid.uuid4().hex[:8]}"
+    analyzer = analyzer_factory()
+    if getattr(analyzer, "client", None) is None:
+        raise ConfigurationError("Queue workers need OPENAI_API_KEY or a replay cassette (LLM_CASSETTE)")
+    processed = completed = 0
+    while max_jobs is None or processed < max_jobs:
+        job = queue.lease(worker_id)
+        if job is None:
+            if exit_when_empty:
+                break
+            time.sleep(poll_interval)
+            continue
+        processed += 1
+        try:
+            with _lease_heartbeat(queue, job, worker_id):
+                analysis = analyzer.analyze_conversation(job.conversation, job.high_stakes_mode, raise_errors=True,
+                                                         caller=f"worker:{worker_id}")
+        except BudgetExceededError as e:
+            queue.defer(job, worker_id, str(e))
+            continue
+        except AnalysisError as e:
+            queue.fail(job, worker_id, str(e))
+            continue
+        if queue.complete(job, worker_id, analysis):
+            completed += 1
+    return completed
+
+
+def _worker_process(path: str, lease_seconds: float, max_attempts: int, exit_when_empty: bool) -> None:
+    from ai_decision_assistant.core.decision_analyzer import DecisionAnalyzer
+    queue = JobQueue(path, lease_seconds=lease_seconds, max_attempts=max_attempts)
+    try:
+        worker_loop(queue, DecisionAnalyzer, exit_when_empty=exit_when_empty)
+    except KeyboardInterrupt:
+        pass
+    except ConfigurationError as e:
+        print(f"❌ {e}")
+        raise SystemExit(2)
+    finally:
+        queue.close()
+
+
+def run_workers(path: str, processes: int = 4, lease_seconds: float = 300.0, max_attempts: int = 5,
+                exit_when_empty: bool = False) -> List[int]:
+    """Start worker processes against a queue database and wait for them; returns exit codes"""
+    setup = JobQueue(path)
+    setup.conn  # create the schema before workers race to do so
+    setup.close()
+    workers = [
+        multiprocessing.Process(
+            target=_worker_process, args=(path, lease_seconds, max_attempts, exit_when_empty),
+            name=f"analysis-worker-{i}",
+        )
+        for i in range(processes)
+    ]
+    for worker in workers:
+        worker.start()
+    try:
+        for worker in workers:
+            worker.join()
+    except KeyboardInterrupt:
+        for worker in workers:
+            worker.join()
+    return [worker.exitcode for worker in workers]
@@ -1,7 +1,10 @@
 import streamlit as st
+import atexit
 import json
 import sys
 import os
+import time
+import uuid
 
 # Add src to Python path - navigate from ui/ up to project root, then to src/
 current_file = os.path.abspath(__file__)
@@ -14,9 +17,19 @@ actual_src_path = os.path.join(project_root, 'src')
 if actual_src_path not in sys.path:
     sys.path.insert(0, actual_src_path)
 
+from ai_decision_assistant.core.aggregate import aggregate_decisions, boundary_queue
 from ai_decision_assistant.core.decision_analyzer import DecisionAnalyzer
+from ai_decision_assistant.core.evidence import highlight_spans
+from ai_decision_assistant.core.near_duplicates import NearDuplicateIndex
+from ai_decision_assistant.core.policy import default_policy
+from ai_decision_assistant.core.views import ViewCache
+from ai_decision_assistant.ingest.uploads import SUPPORTED_EXTENSIONS, load_uploads
+from ai_decision_assistant.utils.helpers import create_download_filename
 from ai_decision_assistant.core.models import DecisionAnalysis, HumanApproval
 from ai_decision_assistant.data.sample_scenarios import *
+from ai_decision_assistant.ui.history import AnalysisHistory
+from ai_decision_assistant.ui.jobs import AnalysisJobManager
+from config.settings import Config
 
 # Page configuration
 st.set_page_config(
@@ -26,17 +39,82 @@ st.set_page_config(
     initial_sidebar_state="expanded"
 )
 
-# Initialize session state
-if 'analysis' not in st.session_state:
-    st.session_state.analysis = None
-if 'approvals' not in st.session_state:
-    st.session_state.approvals = {}
-if 'analyzer' not in st.session_state:
-    st.session_state.analyzer = DecisionAnalyzer()
+# Initialize session state; analyses live in the shared history store, sessions hold handles only
+if 'history_id' not in st.session_state:
+    st.session_state.history_id = None
+if 'job_ids' not in st.session_state:
+    st.session_state.job_ids = []
+if 'batch_job_ids' not in st.session_state:
+    st.session_state.batch_job_ids = []
+if 'batch_errors' not in st.session_state:
+    st.session_state.batch_errors = []
+if 'follow_job' not in st.session_state:
+    # The most recently submitted job is shown automatically when it completes
+    st.session_state.follow_job = None
+
+# Progress shown for each analysis stage
+STAGE_PROGRESS = {"": 0.05, "parse": 0.15, "api_wait": 0.5, "validation": 0.85, "repair": 0.9}
+
+# HISTORY_MEMORY_MB bounds everything the UI keeps in memory; the near-duplicate index, if enabled, gets this share
+MEMORY_BUDGET_BYTES = Config.HISTORY_MEMORY_MB * 1024 * 1024
+INDEX_MEMORY_BYTES = MEMORY_BUDGET_BYTES // 4 if Config.NEAR_DUPLICATE_INDEX else 0
+
+
+@st.cache_resource
+def shared_analyzer() -> DecisionAnalyzer:
+    """One analyzer and API client for all sessions.
+
+    Toggling high-stakes mode re-uses the dual-view analysis stored with the history entry instead of
+    calling the API again, so the view cache only holds results until their jobs store them.
+    """
+    index = (NearDuplicateIndex(Config.NEAR_DUPLICATE_THRESHOLD, Config.NEAR_DUPLICATE_REUSE_THRESHOLD,
+                                max_entries=Config.NEAR_DUPLICATE_MAX_ENTRIES, max_bytes=INDEX_MEMORY_BYTES)
+             if Config.NEAR_DUPLICATE_INDEX else None)
+    analyzer = DecisionAnalyzer(near_duplicate_index=index, derive_high_stakes=True)
+    analyzer.views = ViewCache(2 * Config.UI_MAX_WORKERS)
+    return analyzer
+
+
+@st.cache_resource
+def job_manager() -> AnalysisJobManager:
+    """Thread pool shared by all sessions; jobs outlive reruns and page reloads"""
+    return AnalysisJobManager(max_workers=Config.UI_MAX_WORKERS, history=analysis_history())
+
+
+@st.cache_resource
+def analysis_history() -> AnalysisHistory:
+    """Analyses of all sessions, bounded in memory and persisted to disk"""
+    history = AnalysisHistory(Config.HISTORY_DIR, MEMORY_BUDGET_BYTES - INDEX_MEMORY_BYTES,
+                              Config.HISTORY_MAX_PER_USER)
+    atexit.register(history.flush)
+    return history
+
+
+def session_owner() -> str:
+    """History key of this reviewer, kept in the URL so a reload restores the same history"""
+    if "session" not in st.query_params:
+        st.query_params["session"] = uuid.uuid4().hex
+    return st.query_params["session"]
+
+
+def current_entry():
+    if st.session_state.history_id is None:
+        return None
+    return analysis_history().get(session_owner(), st.session_state.history_id)
+
+
+def show_job(job):
+    # The job manager stored the result in this session's history when the job finished
+    st.session_state.history_id = job.history_id
+
+
+def restore_entry():
+    st.session_state.history_id = st.session_state.history_choice
 
 def main():
     st.title("⚖️ AI Decision Boundary Assistant")
     st.subheader("Transform messy conversations into structured decision documentation")
+    open_followed_job()
     
     # Sidebar for sample scenarios and settings
     with st.sidebar:
@@ -140,6 +218,11 @@ Reply: Perfect. I'll coordinate with ops team. Should have everyone back online
         selected_scenario = st.selectbox("Choose a scenario:", list(scenario_options.keys()))
         
         st.header("⚙️ Settings")
+        input_mode = st.radio(
+            "Input",
+            ["Single conversation", "Batch upload"],
+            help="Batch upload analyzes many files in parallel and aggregates the results"
+        )
         high_stakes_mode = st.checkbox(
             "High-Stakes Mode", 
             help="More conservative analysis with lower confidence scores"
@@ -147,38 +230,224 @@ Reply: Perfect. I'll coordinate with ops team. Should have everyone back online
         
         if high_stakes_mode:
             st.warning("🔒 High-stakes mode enabled - AI will be more conservative")
+        
+        st.text_input(
+            "Your name (reviewer):", key="reviewer_name",
+            help="Required to approve decisions; recorded as the approver"
+        )
+        
+        entries = analysis_history().entries(session_owner())
+        if entries:
+            st.header("🕘 History")
+            labels = {
+                entry["id"]: f"{entry['label']} · {time.strftime('%b %d %H:%M', time.localtime(entry['created']))}"
+                for entry in entries
+            }
+            ids = list(labels)
+            st.selectbox(
+                "Restore an earlier analysis:", ids, format_func=labels.get, key="history_choice",
+                index=ids.index(st.session_state.history_id) if st.session_state.history_id in ids else None,
+                on_change=restore_entry
+            )
 
-    # Main input area
-    st.header("📝 Input Conversation")
+    if input_mode == "Batch upload":
+        display_batch(high_stakes_mode)
+    else:
+        # Main input area
+        st.header("📝 Input Conversation")
     
-    default_text = scenario_options[selected_scenario] if selected_scenario != "Custom Input" else ""
-    conversation = st.text_area(
-        "Paste your conversation thread here:",
-        value=default_text,
-        height=300,
-        help="Paste email threads, Slack conversations, or meeting notes"
-    )
+        default_text = scenario_options[selected_scenario] if selected_scenario != "Custom Input" else ""
+        conversation = st.text_area(
+            "Paste your conversation thread here:",
+            value=default_text,
+            height=300,
+            help="Paste email threads, Slack conversations, or meeting notes"
+        )
 
-    # Analysis button
-    col1, col2 = st.columns([1, 4])
-    with col1:
-        if st.button("Analyze", type="primary"):
-            if conversation.strip():
-                with st.spinner("Analyzing conversation..."):
-                    st.session_state.analysis = st.session_state.analyzer.analyze_conversation(
-                        conversation, high_stakes_mode
-                    )
-                    st.session_state.approvals = {}  # Reset approvals
-                st.success("Analysis complete!")
+        # Switch an existing analysis to the selected mode without a new model call, when the entry has that view
+        entry = current_entry()
+        analysis = entry.analysis if entry else None
+        if entry and entry.conversation == conversation and high_stakes_mode != entry.high_stakes_mode:
+            if entry.view(high_stakes_mode) is not None:
+                analysis = entry.view(high_stakes_mode)
+            else:
+                mode = "high-stakes" if entry.high_stakes_mode else "standard"
+                st.info(f"ℹ️ This analysis was made in {mode} mode and is shown as such. "
+                        "Click Analyze to re-analyze it in the selected mode.")
+
+        # Analysis button
+        col1, col2 = st.columns([1, 4])
+        with col1:
+            if st.button("Analyze", type="primary"):
+                if conversation.strip():
+                    label = f"{selected_scenario} #{len(st.session_state.job_ids) + 1}"
+                    job_id = job_manager().submit(shared_analyzer(), conversation, high_stakes_mode, label,
+                                                  caller=f"ui:{session_owner()}", owner=session_owner())
+                    st.session_state.job_ids.append(job_id)
+                    st.session_state.follow_job = job_id
+                else:
+                    st.error("Please enter a conversation to analyze")
+
+        shown = st.session_state.history_id
+        display_jobs()
+        if st.session_state.history_id != shown:
+            # A finished job was opened from the list
+            entry = current_entry()
+            analysis = entry.analysis
+
+        # Display results if analysis exists
+        if entry:
+            display_analysis_results(entry, analysis)
+
+    # Poll running analyses; the page stays interactive between polls
+    jobs = job_manager().jobs(st.session_state.job_ids + st.session_state.batch_job_ids)
+    if any(job.active for job in jobs):
+        time.sleep(Config.UI_POLL_SECONDS)
+        st.rerun()
+
+def display_jobs():
+    """List this session's analyses with progress, cancel and view controls"""
+    manager = job_manager()
+    jobs = manager.jobs(st.session_state.job_ids)
+    st.session_state.job_ids = [job.id for job in jobs]
+    if not jobs:
+        return
+    
+    st.header("⏳ Analyses")
+    for job in reversed(jobs):
+        col1, col2, col3, col4 = st.columns([3, 3, 1, 1])
+        with col1:
+            st.write(f"**{job.label}**" + (" · 🔒 high-stakes" if job.high_stakes_mode else ""))
+        with col2:
+            if job.active:
+                stage = job.stage or job.status
+                st.progress(STAGE_PROGRESS.get(job.stage, 0.05), text=f"{stage} ({job.elapsed:.0f}s)")
+            elif job.status == "done":
+                st.write(f"✅ done in {job.elapsed:.1f}s")
+            elif job.status == "failed":
+                st.write(f"❌ failed: {job.error}")
             else:
-                st.error("Please enter a conversation to analyze")
+                st.write("🚫 cancelled")
+        with col3:
+            if job.active:
+                if st.button("Cancel", key=f"cancel_{job.id}"):
+                    manager.cancel(job.id)
+                    if st.session_state.follow_job == job.id:
+                        st.session_state.follow_job = None
+            elif job.status == "done":
+                if st.button("View", key=f"view_{job.id}"):
+                    show_job(job)
+        with col4:
+            if not job.active and st.button("Dismiss", key=f"dismiss_{job.id}"):
+                manager.forget(job.id)
+                st.session_state.job_ids.remove(job.id)
+
+def open_followed_job():
+    """Show the most recently submitted analysis once it completes"""
+    followed = job_manager().get(st.session_state.follow_job) if st.session_state.follow_job else None
+    if followed is not None and not followed.active:
+        st.session_state.follow_job = None
+        if followed.status == "done":
+            show_job(followed)
+            st.success(f"Analysis complete: {followed.label}")
+
+def display_batch(high_stakes_mode):
+    """Upload many files, analyze them in parallel and show the aggregated results"""
+    st.header("📂 Batch Review")
+    manager = job_manager()
+    
+    uploads = st.file_uploader(
+        "Upload conversations:",
+        type=[extension.lstrip(".") for extension in SUPPORTED_EXTENSIONS],
+        accept_multiple_files=True,
+        help="Text files, .eml emails, JSON conversations or chat exports, or a zip of any of these"
+    )
+    if st.button("Analyze files", type="primary", disabled=not uploads):
+        for job in manager.jobs(st.session_state.batch_job_ids):
+            manager.cancel(job.id)
+        threads, errors = load_uploads((upload.name, upload.getvalue()) for upload in uploads)
+        st.session_state.batch_errors = errors
+        st.session_state.batch_job_ids = [
+            manager.submit(shared_analyzer(), thread.text, high_stakes_mode, thread.subject,
+                           caller=f"batch:{session_owner()}")
+            for thread in threads
+        ]
+        if not threads:
+            st.error("No conversations found in the uploaded files")
+    
+    for error in st.session_state.batch_errors:
+        st.warning(f"⚠️ Skipped {error}")
+    
+    jobs = manager.jobs(st.session_state.batch_job_ids)
+    if not jobs:
+        return
+    
+    finished = sum(1 for job in jobs if not job.active)
+    col1, col2 = st.columns([4, 1])
+    with col1:
+        st.progress(finished / len(jobs), text=f"{finished}/{len(jobs)} conversations analyzed")
+    with col2:
+        if finished < len(jobs) and st.button("Cancel remaining"):
+            for job in jobs:
+                manager.cancel(job.id)
+    
+    with st.expander("Per-file progress", expanded=finished < len(jobs)):
+        st.dataframe([
+            {"File": job.label, "Status": job.status, "Stage": job.stage,
+             "Seconds": round(job.elapsed, 1), "Error": job.error}
+            for job in jobs
+        ], use_container_width=True, hide_index=True)
+    
+    results = [(job.label, job.result) for job in jobs if job.status == "done"]
+    if results:
+        display_batch_results(results)
 
-    # Display results if analysis exists
-    if st.session_state.analysis:
-        display_analysis_results()
+def display_batch_results(results):
+    """Decisions across all analyzed files, the human-boundary queue and a bulk export"""
+    tab1, tab2, tab3 = st.tabs(["🎯 All Decisions", "🚨 Human Boundary Queue", "📄 Bulk Decision Log"])
+    
+    with tab1:
+        st.caption("Sorted by the highest risk severity in each thread, then by lowest confidence")
+        decisions = aggregate_decisions(results)
+        if decisions:
+            st.dataframe([
+                {"Risk": item.severity or "none", "Confidence": round(item.decision.confidence, 2),
+                 "Decision": item.decision.decision, "Status": item.decision.status.value,
+                 "Owner": item.decision.owner, "Deadline": item.decision.deadline, "Source": item.source}
+                for item in decisions
+            ], use_container_width=True, hide_index=True)
+        else:
+            st.info("No explicit decisions found in the uploaded conversations.")
+    
+    with tab2:
+        for item in boundary_queue(results):
+            severity_color = {"high": "red", "medium": "orange", "low": "blue"}.get(item.severity, "gray")
+            with st.expander(f":{severity_color}[{(item.severity or 'no risk').upper()}] {item.source}"):
+                st.write(f"**Critical Decision:** {item.human_must_decide}")
+                st.write(f"**Why Human Required:** {item.why_human}")
+                st.write(f"**Unconfirmed decisions:** {item.open_decisions}")
+    
+    with tab3:
+        # Nothing is approved yet in batch review, so the gate lists what each thread still needs
+        report = default_policy().evaluate((source, analysis, {}, False) for source, analysis in results)
+        decision_log = shared_analyzer().generate_bulk_decision_log(results) + "\n" + report.to_markdown()
+        st.download_button(
+            label=f"📥 Download Decision Log ({len(results)} conversations)",
+            data=decision_log,
+            file_name=create_download_filename("bulk_decision_log"),
+            mime="text/markdown"
+        )
+        st.text_area("Bulk Decision Log", value=decision_log, height=400)
 
-def display_analysis_results():
-    analysis = st.session_state.analysis
+def display_analysis_results(entry, analysis):
+    approvals = dict(entry.approvals)
+    
+    if analysis.metadata and analysis.metadata.dropped_items:
+        dropped = ", ".join(
+            item.field if item.index is None else f"{item.field}[{item.index}]"
+            for item in analysis.metadata.dropped_items
+        )
+        st.warning(f"⚠️ Some model output failed validation and was dropped: {dropped}")
     
     # Create tabs for different sections
     tab1, tab2, tab3, tab4, tab5 = st.tabs([
@@ -208,36 +477,61 @@ def display_analysis_results():
                     st.write(f"**Confidence:** :{confidence_color}[{decision.confidence:.2f}]")
                 
                 st.write("**Evidence Quotes:**")
-                for quote in decision.evidence_quotes:
-                    st.write(f"> {quote}")
+                if decision.evidence_spans:
+                    # Line-referenced evidence: exact text with its location in the thread
+                    for span in decision.evidence_spans:
+                        st.write(f"> {span.text}  `{span.ref}`")
+                    if st.checkbox("Show evidence in conversation", key=f"evidence_{i}"):
+                        st.markdown(highlight_spans(entry.conversation, decision.evidence_spans))
+                else:
+                    for quote in decision.evidence_quotes:
+                        st.write(f"> {quote}")
                 
                 # Human approval section
                 st.subheader("Human Approval Required")
                 
+                # Widgets start from the stored approval, so restored analyses keep their state
+                stored = entry.approvals.get(i, {})
+                reviewer = st.session_state.get('reviewer_name', '').strip()
                 approval_col1, approval_col2 = st.columns(2)
                 with approval_col1:
-                    approve = st.checkbox(f"Approve Decision {i+1}", key=f"approve_{i}")
+                    approve = st.checkbox(f"Approve Decision {i+1}", value=stored.get('approved', False),
+                                          key=f"approve_{entry.id}_{i}", disabled=not reviewer,
+                                          help=None if reviewer else "Enter your name in the sidebar to approve")
+                    co_approvers = st.text_input(
+                        "Co-approvers (comma-separated):",
+                        value=", ".join(stored.get('approvers', [])[1:]),
+                        key=f"approvers_{entry.id}_{i}",
+                        help="Some decisions need more than one approver, e.g. in high-severity threads. "
+                             "Co-approvers are recorded on your word and not verified, so this check is advisory"
+                    )
                     edit_decision = st.text_input(
                         "Edit decision (if needed):", 
-                        value=decision.decision,
-                        key=f"edit_{i}"
+                        value=stored.get('edited_decision') or decision.decision,
+                        key=f"edit_{entry.id}_{i}"
                     )
                 
                 with approval_col2:
                     human_confirmation = st.text_area(
                         "Human confirmation statement:",
+                        value=stored.get('human_confirmation', ""),
                         placeholder="I confirm this decision and accept accountability...",
-                        key=f"confirm_{i}",
+                        key=f"confirm_{entry.id}_{i}",
                         height=100
                     )
                 
                 # Store approval state
-                st.session_state.approvals[i] = {
+                approvals[i] = {
                     'approved': approve,
+                    # The reviewer named in the sidebar approves; without one, an earlier approval keeps its approver
+                    'approvers': ([reviewer] if reviewer else stored.get('approvers', [])[:1])
+                                 + [name.strip() for name in co_approvers.split(",") if name.strip()],
                     'edited_decision': edit_decision if edit_decision != decision.decision else "",
                     'human_confirmation': human_confirmation
                 }
     
+    analysis_history().update_approvals(session_owner(), entry.id, approvals)
+    
     with tab2:
         col1, col2 = st.columns(2)
         
@@ -323,19 +617,15 @@ def display_analysis_results():
     with tab5:
         st.header("📄 Export Decision Log")
         
-        # Check if all decisions are approved
-        all_approved = all(
-            st.session_state.approvals.get(i, {}).get('approved', False) 
-            for i in range(len(analysis.decisions))
-        )
-        
+        # Check the approval policy: approvals, confidence floors, severity rules and confirmation
         human_confirmed = st.session_state.get('final_confirmation', False)
+        report = default_policy().check(analysis, approvals, human_confirmed)
         
-        if all_approved and human_confirmed:
+        if report.passed():
             st.success("✅ All decisions approved and human accountability confirmed")
             
-            decision_log = st.session_state.analyzer.generate_decision_log(
-                analysis, st.session_state.approvals
+            decision_log = shared_analyzer().generate_decision_log(
+                analysis, approvals
             )
             
             st.subheader("Generated Decision Log")
@@ -349,12 +639,9 @@ def display_analysis_results():
             )
         else:
             st.warning("⚠️ Complete all approvals and human confirmation to generate decision log")
-            missing = []
-            if not all_approved:
-                missing.append("Decision approvals")
-            if not human_confirmed:
-                missing.append("Human accountability confirmation")
-            st.write(f"**Missing:** {', '.join(missing)}")
+            st.write("**Missing:**")
+            for violation in report.violations:
+                st.write(f"- {violation}")
 
 if __name__ == "__main__":
     main()
@@ -0,0 +1,207 @@
+"""Server-side analysis history for UI sessions.
+
+Sessions keep only a handle (owner and entry id) in ``st.session_state``;
+analyses, their conversations and approvals live here, shared by all
+sessions of the process. New analyses are written to disk immediately, so
+a reviewer who reloads the page (or a restarted server) can restore them.
+Entries in memory are bounded by a global byte budget: the least recently
+used are evicted, and any unsaved approval changes are written to disk
+first. Each owner keeps at most ``max_per_owner`` entries on disk.
+"""
+
+import hashlib
+import json
+import os
+import threading
+import time
+import uuid
+from collections import OrderedDict
+from dataclasses import dataclass, field
+from typing import Any, Dict, List, Optional, Tuple
+
+from ai_decision_assistant.core.models import DecisionAnalysis
+
+
+@dataclass
+class HistoryEntry:
+    id: str
+    owner: str
+    label: str
+    conversation: str
+    analysis: DecisionAnalysis
+    high_stakes_mode: bool = False
+    approvals: Dict[int, Any] = field(default_factory=dict)
+    created: float = field(default_factory=time.time)
+    # The other mode's view, when it was derived from the same model call
+    alternate: Optional[DecisionAnalysis] = None
+
+    def view(self, high_stakes_mode: bool) -> Optional[DecisionAnalysis]:
+        """The analysis in the given mode, or None if only the other mode is stored"""
+        return self.analysis if high_stakes_mode == self.high_stakes_mode else self.alternate
+
+    def summary(self) -> Dict[str, Any]:
+        return {"id": self.id, "label": self.label, "created": self.created,
+                "high_stakes_mode": self.high_stakes_mode}
+
+    def to_json(self) -> str:
+        return json.dumps({
+            **self.summary(),
+            "owner": self.owner,
+            "conversation": self.conversation,
+            "analysis": self.analysis.model_dump(mode="json"),
+            "approvals": self.approvals,
+            "alternate": self.alternate.model_dump(mode="json") if self.alternate is not None else None,
+        }, ensure_ascii=False)
+
+    @classmethod
+    def from_json(cls, text: str) -> "HistoryEntry":
+        raw = json.loads(text)
+        return cls(
+            id=raw["id"], owner=raw["owner"], label=raw["label"], conversation=raw["conversation"],
+            analysis=DecisionAnalysis.model_validate(raw["analysis"]),
+            high_stakes_mode=raw.get("high_stakes_mode", False),
+            approvals={int(k): v for k, v in raw.get("approvals", {}).items()},
+            created=raw.get("created", 0.0),
+            alternate=DecisionAnalysis.model_validate(raw["alternate"]) if raw.get("alternate") else None,
+        )
+
+
+class AnalysisHistory:
+    """Per-owner analysis history with an LRU memory budget and disk persistence"""
+
+    def __init__(self, directory: str, memory_budget_bytes: int = 256 * 1024 * 1024, max_per_owner: int = 50):
+        self.directory = directory
+        self.memory_budget_bytes = memory_budget_bytes
+        self.max_per_owner = max_per_owner
+        # (owner, entry id) -> (entry, approximate size in bytes)
+        self._entries: "OrderedDict[Tuple[str, str], Tuple[HistoryEntry, int]]" = OrderedDict()
+        self._dirty: set = set()
+        self._indexes: Dict[str, List[Dict[str, Any]]] = {}
+        self._bytes = 0
+        self._lock = threading.RLock()
+        os.makedirs(directory, exist_ok=True)
+
+    # Paths
+
+    def _owner_dir(self, owner: str) -> str:
+        return os.path.join(self.directory, hashlib.sha256(owner.encode("utf-8")).hexdigest()[:24])
+
+    def _entry_path(self, owner: str, entry_id: str) -> str:
+        return os.path.join(self._owner_dir(owner), f"{entry_id}.json")
+
+    @staticmethod
+    def _write(path: str, text: str) -> None:
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        temporary = f"{path}.tmp"
+        with open(temporary, "w", encoding="utf-8") as f:
+            f.write(text)
+        os.replace(temporary, path)
+
+    # Owner index: newest entry last
+
+    def _index(self, owner: str) -> List[Dict[str, Any]]:
+        if owner not in self._indexes:
+            path = os.path.join(self._owner_dir(owner), "index.json")
+            try:
+                with open(path, "r", encoding="utf-8") as f:
+                    self._indexes[owner] = json.load(f)
+            except (OSError, ValueError):
+                self._indexes[owner] = []
+        return self._indexes[owner]
+
+    def _save_index(self, owner: str) -> None:
+        self._write(os.path.join(self._owner_dir(owner), "index.json"), json.dumps(self._indexes[owner]))
+
+    # Memory budget
+
+    def _cache(self, entry: HistoryEntry, size: int) -> None:
+        key = (entry.owner, entry.id)
+        if key in self._entries:
+            self._bytes -= self._entries.pop(key)[1]
+        self._entries[key] = (entry, size)
+        self._bytes += size
+        while self._bytes > self.memory_budget_bytes and len(self._entries) > 1:
+            self._evict(next(iter(self._entries)))
+
+    def _evict(self, key: Tuple[str, str]) -> None:
+        entry, size = self._entries.pop(key)
+        self._bytes -= size
+        if key in self._dirty:
+            self._dirty.discard(key)
+            self._write(self._entry_path(*key), entry.to_json())
+
+    # Public API
+
+    def put(self, owner: str, label: str, conversation: str, analysis: DecisionAnalysis,
+            high_stakes_mode: bool = False, alternate: Optional[DecisionAnalysis] = None) -> str:
+        """Store a new analysis (and its other-mode view, if derived) for owner and return its entry id"""
+        entry = HistoryEntry(id=uuid.uuid4().hex[:16], owner=owner, label=label, conversation=conversation,
+                             analysis=analysis, high_stakes_mode=high_stakes_mode, alternate=alternate)
+        text = entry.to_json()
+        with self._lock:
+            self._write(self._entry_path(owner, entry.id), text)
+            index = self._index(owner)
+            index.append(entry.summary())
+            for expired in index[:max(0, len(index) - self.max_per_owner)]:
+                self.delete(owner, expired["id"], save_index=False)
+            del index[:max(0, len(index) - self.max_per_owner)]
+            self._save_index(owner)
+            self._cache(entry, len(text))
+        return entry.id
+
+    def get(self, owner: str, entry_id: str) -> Optional[HistoryEntry]:
+        """An entry from memory, or loaded back from disk; None if unknown"""
+        key = (owner, entry_id)
+        with self._lock:
+            if key in self._entries:
+                self._entries.move_to_end(key)
+                return self._entries[key][0]
+            try:
+                with open(self._entry_path(owner, entry_id), "r", encoding="utf-8") as f:
+                    text = f.read()
+            except OSError:
+                return None
+            entry = HistoryEntry.from_json(text)
+            self._cache(entry, len(text))
+            return entry
+
+    def update_approvals(self, owner: str, entry_id: str, approvals: Dict[int, Any]) -> None:
+        """Record approvals; written to disk on eviction or flush rather than on every rerun"""
+        with self._lock:
+            entry = self.get(owner, entry_id)
+            if entry is not None and entry.approvals != approvals:
+                entry.approvals = dict(approvals)
+                self._dirty.add((owner, entry_id))
+
+    def entries(self, owner: str) -> List[Dict[str, Any]]:
+        """Summaries of owner's entries, newest first"""
+        with self._lock:
+            return list(reversed(self._index(owner)))
+
+    def delete(self, owner: str, entry_id: str, save_index: bool = True) -> None:
+        key = (owner, entry_id)
+        with self._lock:
+            if key in self._entries:
+                self._bytes -= self._entries.pop(key)[1]
+            self._dirty.discard(key)
+            try:
+                os.remove(self._entry_path(owner, entry_id))
+            except OSError:
+                pass
+            if save_index:
+                self._indexes[owner] = [e for e in self._index(owner) if e["id"] != entry_id]
+                self._save_index(owner)
+
+    def flush(self) -> None:
+        """Write unsaved approval changes to disk"""
+        with self._lock:
+            for key in list(self._dirty):
+                self._write(self._entry_path(*key), self._entries[key][0].to_json())
+            self._dirty.clear()
+
+    @property
+    def memory_bytes(self) -> int:
+        return self._bytes
+
+    def __len__(self) -> int:
+        return len(self._entries)
@@ -0,0 +1,151 @@
+"""Background analysis jobs for the Streamlit UI.
+
+Analyses run on a shared thread pool instead of the script thread, so the
+page stays responsive and a reviewer can start several analyses while
+earlier ones run. Each job records the analysis stage it has reached;
+cancelling a job drops it from the queue, or aborts it at the next stage
+boundary if it is already running. Finished jobs are kept (up to a bound)
+so a result survives reruns and page reloads. With a history store, a job
+submitted for an owner writes its result to that owner's history as soon as
+it finishes, whether or not the page that started it is still open.
+"""
+
+import itertools
+import threading
+import time
+from concurrent.futures import Future, ThreadPoolExecutor
+from dataclasses import dataclass, field
+from typing import Any, Dict, Iterable, List, Optional
+
+from ai_decision_assistant.core.models import DecisionAnalysis
+from ai_decision_assistant.utils.exceptions import AnalysisCancelled
+from ai_decision_assistant.utils.helpers import conversation_hash
+
+ACTIVE = ("queued", "running")
+
+
+@dataclass
+class AnalysisJob:
+    id: str
+    label: str
+    conversation: str
+    high_stakes_mode: bool
+    caller: str = "default"
+    owner: str = ""
+    history_id: Optional[str] = None
+    status: str = "queued"
+    stage: str = ""
+    submitted: float = field(default_factory=time.time)
+    started: Optional[float] = None
+    finished: Optional[float] = None
+    result: Optional[DecisionAnalysis] = None
+    error: str = ""
+    future: Optional[Future] = field(default=None, repr=False)
+    cancel_requested: threading.Event = field(default_factory=threading.Event, repr=False)
+
+    @property
+    def active(self) -> bool:
+        return self.status in ACTIVE
+
+    @property
+    def elapsed(self) -> float:
+        if self.started is None:
+            return 0.0
+        return (self.finished or time.time()) - self.started
+
+
+class AnalysisJobManager:
+    """Runs analyses on a bounded thread pool and tracks their progress.
+
+    Args:
+        max_workers: Analyses run at the same time.
+        max_finished: Finished jobs kept for viewing.
+        history: AnalysisHistory that results of jobs with an owner are stored in.
+    """
+
+    def __init__(self, max_workers: int = 4, max_finished: int = 200, history: Any = None):
+        self.max_finished = max_finished
+        self.history = history
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="ui-analysis")
+        self._jobs: Dict[str, AnalysisJob] = {}
+        self._ids = itertools.count(1)
+        self._lock = threading.Lock()
+
+    def submit(self, analyzer: Any, conversation: str, high_stakes_mode: bool = False, label: str = "",
+               caller: str = "default", owner: str = "") -> str:
+        """Queue an analysis and return its job id.
+
+        caller is charged in the usage ledger; the result is stored in owner's history, if given.
+        """
+        with self._lock:
+            job_id = f"job-{next(self._ids)}"
+            job = AnalysisJob(id=job_id, label=label or job_id, conversation=conversation,
+                              high_stakes_mode=high_stakes_mode, caller=caller, owner=owner)
+            self._jobs[job_id] = job
+            self._prune()
+        job.future = self._executor.submit(self._run, job, analyzer)
+        return job_id
+
+    def _run(self, job: AnalysisJob, analyzer: Any) -> None:
+        if job.cancel_requested.is_set():
+            job.status, job.finished = "cancelled", time.time()
+            return
+        job.status, job.started = "running", time.time()
+
+        def progress(stage: str) -> None:
+            if job.cancel_requested.is_set():
+                raise AnalysisCancelled(f"{job.label} cancelled")
+            job.stage = stage
+
+        try:
+            job.result = analyzer.analyze_conversation(job.conversation, job.high_stakes_mode,
+                                                       raise_errors=True, progress=progress,
+                                                       caller=job.caller)
+            if job.owner and self.history is not None:
+                # A derived other-mode view is kept with the entry, so switching modes later needs no call
+                views = getattr(analyzer, "views", None)
+                alternate = (views.get(conversation_hash(job.conversation), not job.high_stakes_mode)
+                             if views is not None else None)
+                job.history_id = self.history.put(job.owner, job.label, job.conversation, job.result,
+                                                  job.high_stakes_mode, alternate)
+            job.status = "done"
+        except AnalysisCancelled:
+            job.status = "cancelled"
+        except Exception as e:
+            job.status, job.error = "failed", str(e)
+        finally:
+            job.finished = time.time()
+
+    def get(self, job_id: str) -> Optional[AnalysisJob]:
+        return self._jobs.get(job_id)
+
+    def jobs(self, job_ids: Iterable[str]) -> List[AnalysisJob]:
+        """Known jobs among job_ids, in the given order"""
+        return [job for job in (self._jobs.get(job_id) for job_id in job_ids) if job is not None]
+
+    def cancel(self, job_id: str) -> bool:
+        """Cancel a queued or running job; returns False if it already finished"""
+        job = self._jobs.get(job_id)
+        if job is None or not job.active:
+            return False
+        job.cancel_requested.set()
+        if job.future is not None and job.future.cancel():
+            job.status, job.finished = "cancelled", time.time()
+        return True
+
+    def forget(self, job_id: str) -> None:
+        """Drop a finished job"""
+        with self._lock:
+            job = self._jobs.get(job_id)
+            if job is not None and not job.active:
+                del self._jobs[job_id]
+
+    def _prune(self) -> None:
+        finished = sorted((job for job in self._jobs.values() if not job.active), key=lambda job: job.finished or 0)
+        for job in finished[:max(0, len(finished) - self.max_finished)]:
+            del self._jobs[job.id]
+
+    def shutdown(self) -> None:
+        for job in list(self._jobs.values()):
+            self.cancel(job.id)
+        self._executor.shutdown(wait=False)
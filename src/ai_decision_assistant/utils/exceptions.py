@@ -19,3 +19,11 @@ class ConfigurationError(AIDecisionAssistantError):
 class APIError(AIDecisionAssistantError):
     """Exception raised when external API calls fail"""
     pass
+
+class AnalysisCancelled(AnalysisError):
+    """Exception raised when a running analysis is cancelled"""
+    pass
+
+class BudgetExceededError(APIError):
+    """Exception raised when a model call does not fit the spend budget"""
+    pass
@@ -1,5 +1,6 @@
 """Utility functions for the AI Decision Boundary Assistant"""
 
+import hashlib
 import re
 from datetime import datetime
 from typing import List, Dict, Any
@@ -21,6 +22,10 @@ def clean_text(text: str) -> str:
     text = re.sub(r'\s+', ' ', text.strip())
     return text
 
+def conversation_hash(conversation: str) -> str:
+    """Stable identifier for a conversation's exact text"""
+    return hashlib.sha256(conversation.encode('utf-8')).hexdigest()
+
 def extract_email_metadata(conversation: str) -> Dict[str, Any]:
     """Extract email headers and metadata from conversation"""
     metadata = {}
@@ -45,18 +50,28 @@ def generate_timestamp() -> str:
     return datetime.now().strftime("%Y-%m-%d %H:%M:%S")
 
 def validate_decision_completeness(decisions: List[Dict[str, Any]], approvals: Dict[int, Any]) -> tuple[bool, List[str]]:
-    """Validate that all decisions have required approvals"""
-    errors = []
-    
-    for i, decision in enumerate(decisions):
-        approval = approvals.get(i, {})
-        
-        if not approval.get('approved', False):
-            errors.append(f"Decision {i+1} requires human approval")
-        
-        if decision.get('confidence', 0) < 0.3:
-            errors.append(f"Decision {i+1} has very low confidence - review required")
+    """Validate that all decisions satisfy the decision rules of the approval policy"""
+    from ai_decision_assistant.core.models import Decision, DecisionAnalysis, DecisionStatus
+    from ai_decision_assistant.core.policy import default_policy
     
+    # Invalid fields are reported and checked as the most cautious value, so the policy still sees every decision
+    errors, checked = [], []
+    for number, decision in enumerate(decisions, 1):
+        status, confidence = decision.get('status', 'unclear'), decision.get('confidence', 0)
+        try:
+            status = DecisionStatus(status).value
+        except ValueError:
+            errors.append(f"Decision {number} has unknown status {status!r}")
+            status = DecisionStatus.UNCLEAR.value
+        try:
+            confidence = float(confidence)
+        except (TypeError, ValueError):
+            errors.append(f"Decision {number} has invalid confidence {confidence!r}")
+            confidence = 0.0
+        checked.append(Decision.model_construct(confidence=confidence, status=status))
+    analysis = DecisionAnalysis.model_construct(risks=[], decisions=checked)
+    report = default_policy().check(analysis, approvals, confirmed=True)
+    errors += [str(violation) for violation in report.violations]
     return len(errors) == 0, errors
 
 def create_download_filename(prefix: str = "decision_log") -> str:
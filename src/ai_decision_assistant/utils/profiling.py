@@ -0,0 +1,198 @@
+"""Stage-aware profiling for command-line analysis runs"""
+
+import cProfile
+import os
+import pstats
+import sys
+import threading
+import time
+from collections import Counter, defaultdict
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Dict, Iterator, List, Optional
+
+# Stages reported in the summary, in pipeline order
+STAGES = ["import", "parse", "api_wait", "validation", "log_render"]
+OTHER_STAGE = "other"
+
+_active_profiler: Optional["StageProfiler"] = None
+
+
+@contextmanager
+def stage(name: str) -> Iterator[None]:
+    """Attribute the enclosed block to a profiling stage.
+
+    This is a no-op unless a StageProfiler is running, so library code can
+    mark its stages unconditionally.
+    """
+    profiler = _active_profiler
+    if profiler is None or threading.get_ident() != profiler.thread_id:
+        yield
+        return
+    with profiler.stage(name):
+        yield
+
+
+def _frame_label(frame) -> str:
+    """Render a frame as 'module:function' for collapsed stacks"""
+    module = os.path.splitext(os.path.basename(frame.f_code.co_filename))[0]
+    return f"{module}:{frame.f_code.co_name}".replace(";", ",")
+
+
+class StageProfiler:
+    """Profile a run with cProfile per stage plus a wall-clock stack sampler.
+
+    cProfile gives deterministic per-function timings for pstats tooling,
+    while the sampler records collapsed stacks (including time spent blocked
+    on the network) that flamegraph tools can render directly.
+    """
+
+    def __init__(self, output_dir: str, sample_interval: float = 0.005, top_n: int = 10):
+        self.output_dir = Path(output_dir)
+        self.sample_interval = sample_interval
+        self.top_n = top_n
+        self.thread_id = threading.get_ident()
+        self.profiles: Dict[str, cProfile.Profile] = {}
+        self.wall_times: Dict[str, float] = defaultdict(float)
+        self.samples: Counter = Counter()
+        self._stack: List[str] = []
+        self._stage_started = 0.0
+        self._stop_event = threading.Event()
+        self._sampler: Optional[threading.Thread] = None
+
+    @property
+    def current_stage(self) -> str:
+        return self._stack[-1] if self._stack else OTHER_STAGE
+
+    def _switch(self, new_stage: str, old_stage: str) -> None:
+        """Stop timing the old stage and start timing the new one"""
+        now = time.perf_counter()
+        self.wall_times[old_stage] += now - self._stage_started
+        self._stage_started = now
+        self.profiles[old_stage].disable()
+        if new_stage not in self.profiles:
+            self.profiles[new_stage] = cProfile.Profile()
+        self.profiles[new_stage].enable()
+
+    @contextmanager
+    def stage(self, name: str) -> Iterator[None]:
+        previous = self.current_stage
+        self._stack.append(name)
+        self._switch(name, previous)
+        try:
+            yield
+        finally:
+            self._stack.pop()
+            self._switch(previous, name)
+
+    def _sample(self) -> None:
+        """Sampler thread: record the profiled thread's stack at a fixed interval"""
+        while not self._stop_event.wait(self.sample_interval):
+            frame = sys._current_frames().get(self.thread_id)
+            if frame is None:
+                continue
+            labels = []
+            while frame is not None:
+                labels.append(_frame_label(frame))
+                frame = frame.f_back
+            labels.append(self.current_stage)
+            self.samples[";".join(reversed(labels))] += 1
+
+    def start(self) -> None:
+        global _active_profiler
+        _active_profiler = self
+        self.profiles[OTHER_STAGE] = cProfile.Profile()
+        self._stage_started = time.perf_counter()
+        self._sampler = threading.Thread(target=self._sample, name="stage-profiler", daemon=True)
+        self._sampler.start()
+        self.profiles[OTHER_STAGE].enable()
+
+    def stop(self) -> None:
+        global _active_profiler
+        self.profiles[self.current_stage].disable()
+        self.wall_times[self.current_stage] += time.perf_counter() - self._stage_started
+        self._stop_event.set()
+        if self._sampler is not None:
+            self._sampler.join()
+        _active_profiler = None
+
+    def __enter__(self) -> "StageProfiler":
+        self.start()
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        self.stop()
+
+    def _stats(self, stage_name: str) -> Optional[pstats.Stats]:
+        profile = self.profiles.get(stage_name)
+        if profile is None:
+            return None
+        try:
+            return pstats.Stats(profile)
+        except TypeError:
+            # Stage was entered but no function calls were recorded
+            return None
+
+    def hot_functions(self, stage_name: str) -> List[Dict[str, object]]:
+        """Top functions of a stage ordered by self time"""
+        stats = self._stats(stage_name)
+        if stats is None:
+            return []
+        rows = []
+        for (filename, lineno, func), (_, ncalls, tottime, cumtime, _) in stats.stats.items():
+            rows.append({
+                "function": f"{os.path.basename(filename)}:{lineno}({func})",
+                "calls": ncalls,
+                "self_time": tottime,
+                "cumulative_time": cumtime,
+            })
+        rows.sort(key=lambda row: row["self_time"], reverse=True)
+        return rows[:self.top_n]
+
+    def summary(self) -> str:
+        """Human-readable per-stage summary of wall time and hot functions"""
+        lines = ["⏱️  PROFILE SUMMARY"]
+        ordered = STAGES + sorted(s for s in self.wall_times if s not in STAGES)
+        for stage_name in ordered:
+            if stage_name not in self.wall_times:
+                continue
+            lines.append(f"\n[{stage_name}] {self.wall_times[stage_name] * 1000:.1f} ms wall")
+            for row in self.hot_functions(stage_name):
+                lines.append(
+                    f"   {row['self_time'] * 1000:8.2f} ms self "
+                    f"{row['cumulative_time'] * 1000:8.2f} ms cum "
+                    f"{row['calls']:>6}x  {row['function']}"
+                )
+        return "\n".join(lines)
+
+    def write(self) -> Dict[str, Path]:
+        """Write combined and per-stage pstats, collapsed stacks and the summary"""
+        self.output_dir.mkdir(parents=True, exist_ok=True)
+        paths: Dict[str, Path] = {}
+
+        combined = None
+        for stage_name in self.profiles:
+            stats = self._stats(stage_name)
+            if stats is None:
+                continue
+            stage_path = self.output_dir / f"{stage_name}.pstats"
+            stats.dump_stats(str(stage_path))
+            paths[stage_name] = stage_path
+            if combined is None:
+                combined = stats
+            else:
+                combined.add(stats)
+        if combined is not None:
+            paths["pstats"] = self.output_dir / "profile.pstats"
+            combined.dump_stats(str(paths["pstats"]))
+
+        paths["collapsed"] = self.output_dir / "profile.collapsed"
+        with open(paths["collapsed"], "w", encoding="utf-8") as f:
+            for stack, count in sorted(self.samples.items()):
+                f.write(f"{stack} {count}\n")
+
+        paths["summary"] = self.output_dir / "summary.txt"
+        with open(paths["summary"], "w", encoding="utf-8") as f:
+            f.write(self.summary() + "\n")
+
+        return paths
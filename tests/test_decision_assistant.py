@@ -2,7 +2,13 @@
 Unit tests for AI Decision Boundary Assistant
 """
 
+import ast
+import asyncio
+import json
+import threading
+import time
 import pytest
+from types import SimpleNamespace
 from unittest.mock import Mock, patch
 import sys
 import os
@@ -12,7 +18,72 @@ sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'src'))
 
 from ai_decision_assistant.core.models import Decision, DecisionStatus, Risk, RiskSeverity
 from ai_decision_assistant.core.decision_analyzer import DecisionAnalyzer
-from ai_decision_assistant.utils.helpers import format_confidence_score, clean_text
+from config.settings import Config
+from ai_decision_assistant.core.prompts import PROMPT_REGISTRY, to_wire
+from ai_decision_assistant.core.near_duplicates import NearDuplicateIndex, optimal_bands
+from ai_decision_assistant.core.normalization import ThreadNormalizer
+from ai_decision_assistant.core.cassette import CassetteClient, CassetteMiss
+from ai_decision_assistant.core.archive import AnalysisArchive
+from ai_decision_assistant.core.consistency import SelfConsistencySampler
+from ai_decision_assistant.core.hedging import HedgedCaller
+from ai_decision_assistant.core.json_repair import repair_json
+from ai_decision_assistant.core.ledger import AdmissionController, UsageLedger
+from ai_decision_assistant.core.clustering import DecisionClusterer, link_decisions
+from ai_decision_assistant.ingest.email_threads import iter_email_threads
+from ai_decision_assistant.ingest.slack_export import iter_slack_threads
+from ai_decision_assistant.ingest.uploads import load_uploads
+from ai_decision_assistant.ingest.watch import DirectoryWatcher, WatchSession
+from ai_decision_assistant.core.aggregate import aggregate_decisions, boundary_queue
+from ai_decision_assistant.core.policy import ApprovalPolicy, Rule
+from ai_decision_assistant.core.redaction import Redactor
+from ai_decision_assistant.service.http_server import AnalysisService
+from ai_decision_assistant.service.job_queue import JobQueue, worker_loop
+from ai_decision_assistant.ui.history import AnalysisHistory
+from ai_decision_assistant.ui.jobs import AnalysisJobManager
+from ai_decision_assistant.utils.helpers import format_confidence_score, clean_text, validate_decision_completeness
+from ai_decision_assistant.utils.exceptions import AnalysisError, BudgetExceededError, ConfigurationError
+from ai_decision_assistant.utils.profiling import StageProfiler, stage
+
+
+SAMPLE_RESPONSE = {
+    "decisions": [{
+        "decision": "Launch BTC only with $5K daily limits",
+        "status": "confirmed",
+        "evidence_quotes": ["Let's go with BTC only, $5K daily limits"],
+        "owner": "Sarah Chen",
+        "deadline": "Friday",
+        "confidence": 0.9
+    }],
+    "assumptions": [{"assumption": "Regulation stays stable", "risk_if_wrong": "Feature halt"}],
+    "risks": [{"risk": "FINTRAC reporting gaps", "severity": "high", "mitigation": "Legal sign-off"}],
+    "open_questions": ["What are the reporting requirements?"],
+    "human_must_decide": "Approve the crypto launch",
+    "why_human": "Regulatory risk acceptance",
+    "scale_concerns": ["Manual compliance review"]
+}
+
+
+class FakeClient:
+    """Minimal stand-in for openai.OpenAI that returns canned JSON responses"""
+    
+    def __init__(self, payload=None, usage=None, delay=0.0):
+        self.payload = payload if payload is not None else SAMPLE_RESPONSE
+        self.delay = delay
+        self.usage = usage or {"prompt_tokens": 1200, "completion_tokens": 300,
+                               "prompt_tokens_details": {"cached_tokens": 1024}}
+        self.calls = []
+        self.chat = SimpleNamespace(completions=SimpleNamespace(create=self.create))
+    
+    def create(self, **kwargs):
+        self.calls.append(kwargs)
+        if self.delay:
+            time.sleep(self.delay)
+        content = self.payload if isinstance(self.payload, str) else json.dumps(self.payload)
+        return SimpleNamespace(
+            model=kwargs.get("model"),
+            choices=[SimpleNamespace(message=SimpleNamespace(content=content))],
+            usage=self.usage,
+        )
 
 
 class TestModels:
@@ -90,6 +161,1225 @@ class TestDecisionAnalyzer:
         assert high_stakes_result is not None
 
 
+class TestPromptRegistry:
+    """Test versioned prompt templates"""
+    
+    def test_static_prefix_is_shared_across_requests(self):
+        """Test the system message is identical and the conversation comes last"""
+        template = PROMPT_REGISTRY.get("v2")
+        first = template.build_messages("Thread A", False)
+        second = template.build_messages("Thread B", True)
+        
+        assert first[0] == second[0]
+        assert '"human_must_decide"' in first[0]["content"]
+        assert '"metadata"' not in first[0]["content"]
+        assert "DroppedItem" not in first[0]["content"]
+        assert second[-1]["content"].endswith("Thread B")
+        assert "HIGH-STAKES MODE ACTIVE" in second[-1]["content"]
+    
+    def test_compact_wire_schema_round_trips(self):
+        """Test v3 short keys and enum codes validate into the same analysis"""
+        wire = to_wire(SAMPLE_RESPONSE)
+        assert wire["d"][0]["st"] == "c" and wire["r"][0]["sv"] == "h"
+        assert len(json.dumps(wire)) < len(json.dumps(SAMPLE_RESPONSE))
+        
+        compact = DecisionAnalyzer(client=FakeClient(payload=wire), prompt_version="v3").analyze_conversation(THREAD)
+        full = DecisionAnalyzer(client=FakeClient()).analyze_conversation(THREAD)
+        assert compact.model_dump(exclude={"metadata"}) == full.model_dump(exclude={"metadata"})
+        assert compact.metadata.dropped_items == []
+    
+    def test_line_references_resolve_to_exact_evidence(self):
+        """Test v4 evidence references become exact quotes with character offsets"""
+        wire = to_wire(SAMPLE_RESPONSE)
+        del wire["d"][0]["eq"]
+        wire["d"][0]["er"] = ["L7-L8", "L99"]
+        client = FakeClient(payload=wire)
+        result = DecisionAnalyzer(client=client, prompt_version="v4").analyze_conversation(THREAD, raise_errors=True)
+        
+        assert "L7| Agreed. Let's go with BTC only" in client.calls[0]["messages"][-1]["content"]
+        decision = result.decisions[0]
+        assert [span.ref for span in decision.evidence_spans] == ["L7-L8"]
+        span = decision.evidence_spans[0]
+        assert THREAD[span.start:span.end] == decision.evidence_quotes[0]
+        assert decision.evidence_quotes[0].startswith("Agreed.") and decision.evidence_quotes[0].endswith("timeline.")
+    
+    def test_unknown_version_rejected(self):
+        """Test an unregistered prompt version fails fast"""
+        with pytest.raises(KeyError):
+            DecisionAnalyzer(client=FakeClient(), prompt_version="v0")
+    
+    def test_prompt_version_and_cache_hits_recorded(self):
+        """Test every analysis records its prompt version and token usage"""
+        analyzer = DecisionAnalyzer(client=FakeClient(), prompt_version="v1")
+        result = analyzer.analyze_conversation("Sarah: Let's go with BTC only")
+        
+        assert result.metadata.prompt_version == "v1"
+        assert result.metadata.cached_tokens == 1024
+        assert result.metadata.completion_tokens == 300
+
+
+THREAD = """From: Sarah Chen <s.chen@example.com>
+Subject: New crypto trading feature - compliance review
+
+We're looking to launch crypto trading for our premium users by Q2. I'm leaning toward a
+phased rollout - start with BTC/ETH only, $10K daily limits, enhanced monitoring.
+Legal recommends starting even smaller - $5K limits and BTC only initially.
+Agreed. Let's go with BTC only, $5K daily limits, and full rollout pending regulatory
+clarity. I'll own the implementation timeline."""
+
+
+class TestDerivedViews:
+    """Test deriving the high-stakes view locally from one call"""
+    
+    def test_mode_switch_reuses_single_call(self):
+        """Both views come from one dual-view response and are cached"""
+        extra_risk = {"risk": "Customer losses during volatility", "severity": "high", "mitigation": "Circuit breakers"}
+        payload = dict(SAMPLE_RESPONSE, high_stakes_risks=[extra_risk, {"risk": "incomplete"}],
+                       high_stakes_questions=["Who signs off on AML thresholds?"])
+        client = FakeClient(payload=payload)
+        analyzer = DecisionAnalyzer(client=client, derive_high_stakes=True)
+        
+        standard = analyzer.analyze_conversation(THREAD, high_stakes_mode=False)
+        high = analyzer.analyze_conversation(THREAD, high_stakes_mode=True)
+        assert analyzer.analyze_conversation(THREAD, high_stakes_mode=False) is standard
+        
+        assert len(client.calls) == 1
+        assert "DUAL-VIEW MODE ACTIVE" in client.calls[0]["messages"][-1]["content"]
+        assert standard.decisions[0].confidence == 0.9 and len(standard.risks) == 1
+        assert high.decisions[0].confidence == pytest.approx(0.9 - Config.HIGH_STAKES_CONFIDENCE_PENALTY)
+        assert [r.risk for r in high.risks][-1] == "Customer losses during volatility"
+        assert high.open_questions[-1] == "Who signs off on AML thresholds?"
+        assert high.metadata.derived_view and not standard.metadata.derived_view
+        assert [item.field for item in high.metadata.dropped_items] == ["high_stakes_risks"]
+
+
+class TestNearDuplicates:
+    """Test MinHash/LSH near-duplicate detection"""
+    
+    def test_forwarded_copy_matches(self):
+        """Test a forwarded, re-quoted copy is found and unrelated text is not"""
+        index = NearDuplicateIndex(threshold=0.6)
+        analyzer = DecisionAnalyzer()
+        index.add("original", THREAD, analyzer._get_demo_analysis(THREAD))
+        
+        forwarded = "Fwd: compliance review\n" + "\n".join("> " + line for line in THREAD.splitlines())
+        match = index.best_match(forwarded)
+        assert match is not None and match.key == "original"
+        assert match.similarity > 0.9
+        assert index.best_match("Alex Kim: the rebalancing feature has a tax bug") is None
+    
+    def test_banding_tracks_recall_weight(self):
+        """Test favouring recall uses more, shorter bands"""
+        recall_bands, _ = optimal_bands(128, 0.8, false_negative_weight=0.9)
+        precision_bands, _ = optimal_bands(128, 0.8, false_negative_weight=0.1)
+        assert recall_bands > precision_bands
+    
+    def test_analyzer_reuses_exact_copies_by_default(self):
+        """Test a near-duplicate is only context unless a reuse threshold is set; exact copies are reused"""
+        client = FakeClient()
+        analyzer = DecisionAnalyzer(client=client, derive_high_stakes=False, near_duplicate_index=NearDuplicateIndex())
+        analyzer.analyze_conversation(THREAD)
+        forwarded = analyzer.analyze_conversation("FW: " + THREAD + "\n\nSent from my phone")
+        assert len(client.calls) == 2
+        assert forwarded.metadata.near_duplicate_similarity >= 0.9
+        assert "Launch BTC only" in client.calls[1]["messages"][-1]["content"]
+        
+        repeat = analyzer.analyze_conversation(THREAD)
+        assert len(client.calls) == 2 and repeat.metadata.near_duplicate_similarity == 1.0
+        
+        client = FakeClient()
+        analyzer = DecisionAnalyzer(client=client, near_duplicate_index=NearDuplicateIndex(reuse_threshold=0.9))
+        first = analyzer.analyze_conversation(THREAD)
+        second = analyzer.analyze_conversation("FW: " + THREAD + "\n\nSent from my phone")
+        assert len(client.calls) == 1
+        assert second.decisions == first.decisions
+    
+    def test_index_evicts_least_recently_used(self):
+        """Test the index holds at most max_entries analyses and a lookup keeps an entry alive"""
+        index = NearDuplicateIndex(max_entries=2)
+        analysis = DecisionAnalyzer()._get_demo_analysis(THREAD)
+        other = "Priya: Move the compliance review to Monday.\nOmar: Agreed, I'll tell the auditors."
+        index.add("thread", THREAD, analysis)
+        index.add("other", other, analysis)
+        assert index.best_match(THREAD).key == "thread"
+        index.add("third", "Alex Kim: the rebalancing feature has a tax bug in large portfolios", analysis)
+        
+        assert len(index) == 2
+        assert index.best_match(other) is None
+        assert index.best_match("FW: " + THREAD).key == "thread"
+    
+    def test_index_memory_bound(self):
+        """Test max_bytes evicts the oldest analyses once their approximate size exceeds it"""
+        analysis = DecisionAnalyzer()._get_demo_analysis(THREAD)
+        index = NearDuplicateIndex(max_bytes=int(2.5 * (len(analysis.model_dump_json()) + 128 * 8)))
+        for i in range(4):
+            index.add(f"thread {i}", f"Thread {i}: " + THREAD, analysis)
+        assert len(index) == 2 and index.memory_bytes <= index.max_bytes
+        assert index.best_match("Thread 3: " + THREAD).key == "thread 3"
+    
+    def test_other_mode_exact_match_does_not_hide_same_mode_duplicate(self):
+        """Test reuse finds the same-mode near-duplicate even when the other mode has an exact copy"""
+        client = FakeClient()
+        analyzer = DecisionAnalyzer(client=client, near_duplicate_index=NearDuplicateIndex(reuse_threshold=0.9))
+        forwarded = "FW: " + THREAD + "\n\nSent from my phone"
+        analyzer.analyze_conversation(THREAD, high_stakes_mode=True)
+        analyzer.analyze_conversation(forwarded, high_stakes_mode=False)
+        reused = analyzer.analyze_conversation(THREAD, high_stakes_mode=False)
+        
+        assert len(client.calls) == 2
+        assert reused.metadata.near_duplicate_similarity >= 0.9
+
+
+class TestDecisionClustering:
+    """Test cross-thread decision linking"""
+    
+    def test_equivalent_decisions_share_canonical_id(self):
+        """Test reworded copies of a decision cluster together across analyses"""
+        analyzer = DecisionAnalyzer()
+        first = analyzer._get_demo_analysis("Thread A")
+        second = analyzer._get_demo_analysis("Thread B")
+        second.decisions[0].decision = "Implement a phased rollout approach for the new feature"
+        other = analyzer._get_demo_analysis("Thread C")
+        other.decisions[0].decision = "Delay the rebalancing launch by two weeks"
+        other.decisions[0].evidence_quotes = ["Delay launch by 2 weeks to fix"]
+        
+        clusters = link_decisions([("a", first), ("b", second), ("c", other)])
+        
+        assert first.decisions[0].canonical_id == second.decisions[0].canonical_id
+        assert other.decisions[0].canonical_id != first.decisions[0].canonical_id
+        assert len(clusters) == 2
+    
+    def test_fit_handles_empty_and_singletons(self):
+        """Test degenerate inputs"""
+        assert DecisionClusterer().fit([]).n_clusters == 0
+        result = DecisionClusterer().fit(["only one decision"])
+        assert result.n_clusters == 1 and len(result.canonical_ids) == 1
+
+
+MBOX = """From sarah@example.com Mon Jan  1 00:00:00 2024
+From: Sarah Chen <s.chen@example.com>
+Subject: Crypto launch
+Message-ID: <a1@example.com>
+Date: Mon, 1 Jan 2024 09:00:00 +0000
+
+Let's go with BTC only, $5K daily limits.
+>From legal: agreed.
+
+From mike@example.com Mon Jan  1 00:00:00 2024
+From: Mike Rodriguez <m.rodriguez@example.com>
+Subject: Re: Crypto launch
+Message-ID: <a2@example.com>
+References: <a1@example.com>
+Date: Mon, 1 Jan 2024 10:00:00 +0000
+MIME-Version: 1.0
+Content-Type: multipart/mixed; boundary="XX"
+
+--XX
+Content-Type: text/plain
+
+Need legal sign-off first.
+--XX
+Content-Type: application/pdf
+Content-Disposition: attachment; filename="memo.pdf"
+Content-Transfer-Encoding: base64
+
+AAAA
+--XX--
+
+From other@example.com Mon Jan  1 00:00:00 2024
+From: Other <o@example.com>
+Subject: Lunch
+Message-ID: <b1@example.com>
+
+Pizza?
+"""
+
+
+class TestEmailIngestion:
+    """Test streaming mailbox ingestion"""
+    
+    def test_mbox_threads_reconstructed(self, tmp_path):
+        """Test replies are grouped, ordered and stripped of attachments"""
+        path = tmp_path / "export.mbox"
+        path.write_text(MBOX, encoding="utf-8")
+        threads = list(iter_email_threads(str(path)))
+        
+        assert [t.message_count for t in threads] == [2, 1]
+        crypto = threads[0]
+        assert crypto.subject == "Crypto launch"
+        assert crypto.participants == ["Sarah Chen", "Mike Rodriguez"]
+        assert crypto.text.index("BTC only") < crypto.text.index("legal sign-off")
+        assert "\nFrom legal: agreed." in crypto.text
+        assert "AAAA" not in crypto.text and "memo.pdf" in crypto.text
+    
+    def test_maildir_threads(self, tmp_path):
+        """Test Maildir folders are read through the same pipeline"""
+        import mailbox
+        import email
+        box = mailbox.Maildir(str(tmp_path / "box"))
+        for raw in ("\n" + MBOX).split("\nFrom ")[1:]:
+            box.add(email.message_from_string(raw.split("\n", 1)[1]))
+        
+        threads = list(iter_email_threads(str(tmp_path / "box")))
+        assert sorted(t.message_count for t in threads) == [1, 2]
+
+
+class TestSlackIngestion:
+    """Test Slack export ingestion"""
+    
+    def _write_export(self, root):
+        (root / "product-launch").mkdir()
+        (root / "users.json").write_text(json.dumps([
+            {"id": "U1", "real_name": "Alex Kim"},
+            {"id": "U2", "real_name": "Jamie Walsh"},
+        ]), encoding="utf-8")
+        day1 = [
+            {"type": "message", "user": "U1", "ts": "1000.0", "thread_ts": "1000.0",
+             "text": "The rebalancing feature has a bug"},
+            {"type": "message", "user": "U2", "ts": "1100.0", "thread_ts": "1000.0",
+             "text": "<@U1> how bad is the impact?"},
+            {"type": "message", "user": "U2", "ts": "1200.0", "text": "Lunch anyone?"},
+            {"type": "message", "subtype": "channel_join", "user": "U2", "ts": "1250.0", "text": "joined"},
+            {"type": "message", "user": "U1", "ts": "1300.0", "text": "Sure"},
+            {"type": "message", "user": "U1", "ts": "9000.0", "text": "Standup notes"},
+            {"type": "message", "user": "U2", "ts": "9100.0", "text": "Thanks"},
+        ]
+        day2 = [
+            {"type": "message", "user": "U1", "ts": "90000.0", "thread_ts": "1000.0",
+             "text": "I vote for option 3"},
+        ]
+        (root / "product-launch" / "2024-03-01.json").write_text(json.dumps(day1), encoding="utf-8")
+        (root / "product-launch" / "2024-03-02.json").write_text(json.dumps(day2), encoding="utf-8")
+    
+    def test_threads_and_windows(self, tmp_path):
+        """Test replies across days join their thread and chatter splits at gaps"""
+        self._write_export(tmp_path)
+        conversations = list(iter_slack_threads(str(tmp_path)))
+        
+        threads = [c for c in conversations if c.subject.endswith("thread")]
+        windows = [c for c in conversations if c.subject.endswith("window")]
+        assert len(threads) == 1 and threads[0].message_count == 3
+        assert "Jamie Walsh: @Alex Kim how bad is the impact?" in threads[0].text
+        assert threads[0].text.strip().endswith("Alex Kim: I vote for option 3")
+        assert [w.message_count for w in windows] == [2, 2]
+        assert all("joined" not in w.text for w in windows)
+    
+    def test_idle_threads_flushed_early(self, tmp_path):
+        """Test threads are emitted once idle rather than held until the end"""
+        self._write_export(tmp_path)
+        conversations = list(iter_slack_threads(str(tmp_path), thread_idle_seconds=150))
+        threads = [c for c in conversations if c.subject.endswith("thread")]
+        assert [t.message_count for t in threads] == [2]
+
+
+
+class TestUploads:
+    """Test loading conversations from uploaded files"""
+    
+    def test_mixed_uploads_and_archive(self):
+        """Test txt, json, eml and zipped mailboxes load; bad files are reported"""
+        import io
+        import zipfile
+        buffer = io.BytesIO()
+        with zipfile.ZipFile(buffer, "w") as archive:
+            for i, raw in enumerate(("\n" + MBOX).split("\nFrom ")[1:]):
+                archive.writestr(f"mail/{i}.eml", raw.split("\n", 1)[1])
+            archive.writestr("notes.txt", "Standup: ship Friday")
+        
+        threads, errors = load_uploads([
+            ("thread.txt", THREAD.encode("utf-8")),
+            ("chat.json", json.dumps([{"user": "Alex", "text": "Ship it"}, {"user": "Jamie", "text": "Agreed"}]).encode()),
+            ("single.eml", MBOX.split("\n", 1)[1].split("\n\nFrom mike")[0].encode()),
+            ("week.zip", buffer.getvalue()),
+            ("broken.json", b"{nope"),
+            ("slides.pdf", b"%PDF"),
+        ])
+        assert [t.subject for t in threads] == [
+            "thread.txt", "chat.json", "single.eml", "notes.txt", "mail: Crypto launch", "mail: Lunch",
+        ]
+        assert threads[3].source == "week.zip/notes.txt" and threads[4].source == "week.zip/mail"
+        assert threads[1].text == "Alex: Ship it\n\nJamie: Agreed"
+        assert "BTC only" in threads[2].text
+        assert [t.message_count for t in threads if t.subject == "mail: Crypto launch"] == [2]
+        assert len(errors) == 2 and errors[0].startswith("broken.json")
+
+
+class TestAggregation:
+    """Test the aggregated batch view"""
+    
+    def test_decisions_and_boundary_queue_ordering(self):
+        """Test riskiest, least certain decisions come first and the bulk log covers every thread"""
+        analyzer = DecisionAnalyzer(client=None)
+        risky = analyzer._get_demo_analysis(THREAD)
+        calm = risky.model_copy(update={"risks": [], "human_must_decide": "Pick a lunch place"})
+        low = risky.model_copy(deep=True)
+        low.decisions[0].confidence = 0.3
+        results = [("calm.txt", calm), ("risky.txt", risky), ("low.txt", low)]
+        
+        decisions = aggregate_decisions(results)
+        assert [item.source for item in decisions][:2] == ["low.txt", "risky.txt"]
+        assert decisions[-1].source == "calm.txt" and decisions[-1].severity is None
+        assert boundary_queue(results)[-1].human_must_decide == "Pick a lunch place"
+        
+        log = analyzer.generate_bulk_decision_log(results)
+        assert log.startswith("# BULK DECISION LOG\nThreads: 3")
+        assert all(f"# {name}\n" in log for name, _ in results)
+
+
+class TestApprovalPolicy:
+    """Test the compiled approval-gate policy"""
+    
+    def test_default_rules_over_a_batch(self):
+        """Test approvals, severity and confirmation rules across several analyses"""
+        risky = DecisionAnalyzer()._get_demo_analysis(THREAD)
+        calm = risky.model_copy(update={"risks": []})
+        approved_once = {0: {"approved": True, "approvers": ["alice"]}}
+        approved_twice = {0: {"approved": True, "approvers": ["alice", "Bob"]}}
+        report = ApprovalPolicy().evaluate([
+            ("risky", risky, approved_once, True),
+            ("risky-2", risky, approved_twice, True),
+            ("calm", calm, approved_once, False),
+        ])
+        
+        assert [(v.source, v.index, v.rule) for v in report.violations] == [
+            ("risky", 0, "high_severity_two_approvers"),
+            ("calm", None, "human_confirmation"),
+        ]
+        assert report.passed("risky-2") and not report.passed()
+        assert str(report.violations[0]) == "Decision 1 is in a high-severity thread and needs two approvers"
+    
+    def test_config_floors_and_custom_rules(self):
+        """Test Config values are bound at compile time and bad rules fail fast"""
+        analysis = DecisionAnalyzer()._get_demo_analysis(THREAD)
+        rules = [Rule("floor", "confidence >= CONFIDENCE_THRESHOLD_HIGH", "is below the floor",
+                      when="status != 'confirmed' and severity >= 'medium'")]
+        with patch.object(Config, "CONFIDENCE_THRESHOLD_HIGH", 0.95):
+            policy = ApprovalPolicy(rules)
+        assert [v.rule for v in policy.check(analysis, {}).violations] == ["floor"] * len(analysis.decisions)
+        
+        with pytest.raises(ConfigurationError):
+            ApprovalPolicy([Rule("bad", "owner == 'x'", "unknown field")])
+        with pytest.raises(ConfigurationError):
+            ApprovalPolicy([Rule("bad", "confidence >= NO_SUCH_SETTING", "unknown setting")])
+        
+        ok, errors = validate_decision_completeness([{"confidence": 0.1}], {0: {"approved": True}})
+        assert not ok and errors == ["Decision 1 has very low confidence - review required"]
+        
+        ok, errors = validate_decision_completeness(
+            [{"confidence": 0.9, "status": "approved"}, {"confidence": "high"}], {0: {"approved": True}})
+        assert not ok
+        assert errors[:2] == ["Decision 1 has unknown status 'approved'", "Decision 2 has invalid confidence 'high'"]
+
+async def _http(port, method, path, payload=None, headers=None):
+    """Send one HTTP request to the local service and return (status, headers, body)"""
+    reader, writer = await asyncio.open_connection("127.0.0.1", port)
+    body = json.dumps(payload).encode() if payload is not None else b""
+    head = [f"{method} {path} HTTP/1.1", "Host: localhost", f"Content-Length: {len(body)}"]
+    head += [f"{k}: {v}" for k, v in (headers or {}).items()]
+    writer.write(("\r\n".join(head) + "\r\n\r\n").encode() + body)
+    await writer.drain()
+    raw = await reader.read()
+    writer.close()
+    head_raw, _, body_raw = raw.partition(b"\r\n\r\n")
+    lines = head_raw.decode().split("\r\n")
+    response_headers = dict(line.split(": ", 1) for line in lines[1:])
+    return int(lines[0].split()[1]), response_headers, body_raw
+
+
+class TestAnalysisService:
+    """Test the asynchronous HTTP service against a fake LLM backend"""
+    
+    def test_analyze_batch_and_health(self):
+        """Test single, streamed batch and health endpoints"""
+        async def scenario():
+            service = AnalysisService(DecisionAnalyzer(client=FakeClient()), max_concurrency=2)
+            _, port = await service.start(port=0)
+            try:
+                status, _, body = await _http(port, "POST", "/analyze", {"conversation": THREAD})
+                assert status == 200
+                assert json.loads(body)["human_must_decide"] == SAMPLE_RESPONSE["human_must_decide"]
+                
+                batch = {"conversations": [{"id": "a", "conversation": THREAD},
+                                           {"id": "b", "conversation": THREAD}]}
+                status, headers, body = await _http(port, "POST", "/analyze/batch", batch)
+                assert status == 200 and headers["Transfer-Encoding"] == "chunked"
+                lines = [json.loads(line) for line in body.split(b"\r\n") if line.startswith(b"{")]
+                assert sorted(line["id"] for line in lines) == ["a", "b"]
+                
+                status, _, body = await _http(port, "GET", "/healthz")
+                assert status == 200 and json.loads(body)["completed"] == 3
+            finally:
+                await service.shutdown()
+        
+        asyncio.run(scenario())
+    
+    def test_overload_returns_retry_hint_and_drains(self):
+        """Test 503 with Retry-After when full, and graceful drain on shutdown"""
+        async def scenario():
+            client = FakeClient(delay=0.3)
+            service = AnalysisService(DecisionAnalyzer(client=client), max_concurrency=1, max_queue=0)
+            _, port = await service.start(port=0)
+            slow = asyncio.ensure_future(_http(port, "POST", "/analyze", {"conversation": THREAD}))
+            await asyncio.sleep(0.1)
+            
+            status, headers, _ = await _http(port, "POST", "/analyze", {"conversation": THREAD})
+            assert status == 503 and headers["Retry-After"] == "5"
+            
+            await service.shutdown()
+            assert service.stats.in_flight == 0
+            assert (await slow)[0] == 200
+        
+        asyncio.run(scenario())
+    
+    def test_budget_refusal_is_429(self, tmp_path):
+        """Test analyses refused by the spend budget get 429 or a batch error line, not a placeholder"""
+        async def scenario():
+            admission = AdmissionController(UsageLedger(str(tmp_path / "usage.db")), caller_budgets={"*": 0.0})
+            service = AnalysisService(DecisionAnalyzer(client=FakeClient(), admission=admission))
+            _, port = await service.start(port=0)
+            try:
+                status, headers, _ = await _http(port, "POST", "/analyze", {"conversation": THREAD})
+                assert status == 429 and headers["Retry-After"] == "5"
+                
+                batch = {"conversations": [{"id": "a", "conversation": THREAD}]}
+                _, _, body = await _http(port, "POST", "/analyze/batch", batch)
+                lines = [json.loads(line) for line in body.split(b"\r\n") if line.startswith(b"{")]
+                assert lines[0]["id"] == "a" and "Budget exhausted" in lines[0]["error"]
+                assert service.stats.in_flight == 0
+            finally:
+                await service.shutdown()
+        
+        asyncio.run(scenario())
+    
+    def test_large_batch_streams_through_client_limit(self):
+        """Test a batch above the per-client limit queues behind its own slots, and bad lengths get 400"""
+        async def scenario():
+            service = AnalysisService(DecisionAnalyzer(client=FakeClient(delay=0.01)), max_concurrency=2,
+                                      max_queue=2, per_client_limit=3)
+            _, port = await service.start(port=0)
+            try:
+                batch = {"conversations": [{"id": i, "conversation": f"{THREAD}\n#{i}"} for i in range(10)]}
+                status, _, body = await _http(port, "POST", "/analyze/batch", batch)
+                lines = [json.loads(line) for line in body.split(b"\r\n") if line.startswith(b"{")]
+                assert status == 200 and sorted(line["id"] for line in lines) == list(range(10))
+                assert all("analysis" in line for line in lines) and service.stats.rejected == 0
+                
+                status, _, body = await _http(port, "POST", "/analyze", {"conversation": THREAD},
+                                              headers={"Content-Length": "ten"})
+                assert status == 400 and b"Content-Length" in body
+            finally:
+                await service.shutdown()
+        
+        asyncio.run(scenario())
+
+
+class TestJobQueue:
+    """Test the durable SQLite job queue"""
+    
+    def test_enqueue_is_idempotent(self, tmp_path):
+        """Test the same conversation is only queued once per mode"""
+        queue = JobQueue(str(tmp_path / "jobs.db"))
+        key, created = queue.enqueue(THREAD)
+        assert created
+        assert queue.enqueue(THREAD) == (key, False)
+        assert queue.enqueue(THREAD, high_stakes_mode=True)[1]
+        assert queue.stats()["queued"] == 2
+    
+    def test_expired_lease_is_redelivered_once(self, tmp_path):
+        """Test at-least-once delivery without duplicate results"""
+        queue = JobQueue(str(tmp_path / "jobs.db"), lease_seconds=0.05)
+        key, _ = queue.enqueue(THREAD)
+        stale = queue.lease("worker-a")
+        time.sleep(0.1)
+        fresh = queue.lease("worker-b")
+        assert fresh.id == stale.id and fresh.attempts == 2
+        
+        analysis = DecisionAnalyzer()._get_demo_analysis(THREAD)
+        assert queue.complete(fresh, "worker-b", analysis)
+        assert not queue.complete(stale, "worker-a", analysis)
+        assert queue.result(key).human_must_decide == analysis.human_must_decide
+        assert queue.stats()["retries"] == 1
+    
+    def test_worker_retries_failures(self, tmp_path):
+        """Test failed analyses are retried and persisted once they succeed"""
+        queue = JobQueue(str(tmp_path / "jobs.db"), retry_backoff=0.0)
+        key, _ = queue.enqueue(THREAD)
+        
+        worker_loop(queue, lambda: DecisionAnalyzer(client=FakeClient(payload="{not json")),
+                    exit_when_empty=True, max_jobs=1)
+        assert queue.stats()["queued"] == 1
+        
+        assert worker_loop(queue, lambda: DecisionAnalyzer(client=FakeClient()), exit_when_empty=True) == 1
+        assert queue.result(key).decisions[0].owner == "Sarah Chen"
+    
+    def test_lease_renewed_while_analysis_runs(self, tmp_path):
+        """Test a slow analysis keeps its lease instead of being handed to another worker"""
+        path = str(tmp_path / "jobs.db")
+        key, _ = JobQueue(path).enqueue(THREAD)
+        worker = threading.Thread(target=worker_loop, args=(
+            JobQueue(path, lease_seconds=0.15), lambda: DecisionAnalyzer(client=FakeClient(delay=0.5))),
+            kwargs={"worker_id": "slow", "max_jobs": 1})
+        worker.start()
+        time.sleep(0.35)
+        assert JobQueue(path, lease_seconds=0.15).lease("thief") is None
+        worker.join()
+        
+        queue = JobQueue(path)
+        assert queue.result(key) is not None and queue.stats()["retries"] == 0
+        # A finished job's lease is not renewed
+        assert not queue.renew(SimpleNamespace(id=1), "slow")
+    
+    def test_budget_refusal_is_deferred_without_an_attempt(self, tmp_path):
+        """Test jobs refused by the budget are requeued with a delay and never run out of attempts"""
+        queue = JobQueue(str(tmp_path / "jobs.db"), max_attempts=1, retry_backoff=60.0)
+        key, _ = queue.enqueue(THREAD)
+        
+        def refuse(*args, **kwargs):
+            raise BudgetExceededError("Budget exhausted for worker")
+        
+        worker_loop(queue, lambda: SimpleNamespace(client=object(), analyze_conversation=refuse),
+                    exit_when_empty=True)
+        assert queue.stats()["queued"] == 1 and queue.stats()["failed"] == 0
+        assert queue.lease("eager") is None
+        assert queue.conn.execute("SELECT attempts, last_error FROM jobs").fetchone() == (
+            0, "Budget exhausted for worker")
+    
+    def test_worker_refuses_without_model_client(self, tmp_path):
+        """Test workers do not store demo analyses when no API key or cassette is configured"""
+        queue = JobQueue(str(tmp_path / "jobs.db"))
+        key, _ = queue.enqueue(THREAD)
+        
+        with pytest.raises(ConfigurationError):
+            worker_loop(queue, lambda: DecisionAnalyzer(client=None), exit_when_empty=True)
+        assert queue.stats()["queued"] == 1
+        assert queue.result(key) is None
+
+
+class TestBackgroundJobs:
+    """Test background analyses for the UI"""
+    
+    @staticmethod
+    def wait(manager, job_ids, timeout=5.0):
+        deadline = time.time() + timeout
+        while any(job.active for job in manager.jobs(job_ids)) and time.time() < deadline:
+            time.sleep(0.01)
+        return manager.jobs(job_ids)
+    
+    def test_jobs_run_concurrently_with_progress(self):
+        """Test several analyses run in parallel and record their stages"""
+        manager = AnalysisJobManager(max_workers=4)
+        analyzer = DecisionAnalyzer(client=FakeClient(delay=0.2))
+        started = time.perf_counter()
+        job_ids = [manager.submit(analyzer, f"{THREAD}\n#{i}", label=f"thread {i}") for i in range(4)]
+        assert manager.get(job_ids[0]).active
+        
+        jobs = self.wait(manager, job_ids)
+        assert time.perf_counter() - started < 0.6
+        assert [job.status for job in jobs] == ["done"] * 4
+        assert jobs[0].stage == "validation"
+        assert jobs[0].result.decisions[0].owner == "Sarah Chen"
+        manager.shutdown()
+    
+    def test_cancel_running_and_queued_jobs(self):
+        """Test cancelled jobs stop at the next stage or never start"""
+        manager = AnalysisJobManager(max_workers=1)
+        client = FakeClient(delay=0.2)
+        analyzer = DecisionAnalyzer(client=client)
+        running = manager.submit(analyzer, THREAD)
+        queued = manager.submit(analyzer, THREAD + "\nP.S.")
+        time.sleep(0.05)
+        assert manager.cancel(running) and manager.cancel(queued)
+        
+        jobs = self.wait(manager, [running, queued])
+        assert [job.status for job in jobs] == ["cancelled", "cancelled"]
+        assert all(job.result is None for job in jobs)
+        assert len(client.calls) == 1
+        assert not manager.cancel(running)
+        manager.shutdown()
+    
+    def test_finished_jobs_are_stored_in_owner_history(self, tmp_path):
+        """Test results reach the owner's history when the job finishes, without the page viewing them"""
+        history = AnalysisHistory(str(tmp_path))
+        manager = AnalysisJobManager(max_workers=2, history=history)
+        analyzer = DecisionAnalyzer(client=FakeClient())
+        owned = manager.submit(analyzer, THREAD, label="launch", owner="alice")
+        anonymous = manager.submit(analyzer, THREAD + "\nP.S.")
+        
+        jobs = self.wait(manager, [owned, anonymous])
+        assert jobs[1].history_id is None
+        assert [e["label"] for e in history.entries("alice")] == ["launch"]
+        assert history.get("alice", jobs[0].history_id).analysis.decisions[0].owner == "Sarah Chen"
+        manager.shutdown()
+    
+    def test_history_keeps_derived_view_of_other_mode(self, tmp_path):
+        """Test an entry stores both derived views, and only its own mode when nothing was derived"""
+        manager = AnalysisJobManager(max_workers=1, history=AnalysisHistory(str(tmp_path)))
+        derived = manager.submit(DecisionAnalyzer(client=FakeClient(), derive_high_stakes=True), THREAD, owner="alice")
+        single = manager.submit(DecisionAnalyzer(client=FakeClient(), derive_high_stakes=False), THREAD, owner="alice")
+        jobs = self.wait(manager, [derived, single])
+        manager.shutdown()
+        
+        reopened = AnalysisHistory(str(tmp_path))
+        entry = reopened.get("alice", jobs[0].history_id)
+        assert entry.view(False) == entry.analysis and entry.view(True).metadata.derived_view
+        assert reopened.get("alice", jobs[1].history_id).view(True) is None
+
+
+class TestAnalysisHistory:
+    """Test the bounded server-side analysis history"""
+    
+    def test_memory_budget_evicts_to_disk_and_restores(self, tmp_path):
+        """Test LRU eviction keeps memory bounded and evicted entries reload with their approvals"""
+        analysis = DecisionAnalyzer()._get_demo_analysis(THREAD)
+        size = len(analysis.model_dump_json())
+        history = AnalysisHistory(str(tmp_path), memory_budget_bytes=int(size * 3.5), max_per_owner=3)
+        first = history.put("alice", "first", THREAD, analysis)
+        history.update_approvals("alice", first, {0: {"approved": True}})
+        later = [history.put("alice", f"later {i}", THREAD, analysis) for i in range(2)]
+        history.put("bob", "other", THREAD, analysis)
+        
+        assert len(history) < 4 and history.memory_bytes <= history.memory_budget_bytes
+        assert [e["label"] for e in history.entries("alice")] == ["later 1", "later 0", "first"]
+        
+        reloaded = AnalysisHistory(str(tmp_path))
+        assert reloaded.get("alice", first).approvals == {0: {"approved": True}}
+        assert reloaded.get("alice", later[0]).analysis == analysis
+        assert reloaded.get("bob", first) is None
+    
+    def test_per_owner_retention(self, tmp_path):
+        """Test the oldest entries of an owner are deleted past the limit"""
+        analysis = DecisionAnalyzer()._get_demo_analysis(THREAD)
+        history = AnalysisHistory(str(tmp_path), max_per_owner=2)
+        ids = [history.put("alice", str(i), THREAD, analysis) for i in range(3)]
+        assert [e["id"] for e in history.entries("alice")] == ids[:0:-1]
+        assert history.get("alice", ids[0]) is None
+
+
+class TestUsageLedger:
+    """Test the token/cost ledger and budget admission control"""
+    
+    def test_calls_recorded_and_downgraded_over_budget(self, tmp_path):
+        """Test usage is charged per caller and over-budget calls move to the cheaper model"""
+        ledger = UsageLedger(str(tmp_path / "usage.db"))
+        admission = AdmissionController(ledger, caller_budgets={"batch": 0.1}, downgrade_model="gpt-4o-mini")
+        client = FakeClient()
+        analyzer = DecisionAnalyzer(client=client, admission=admission)
+        analyzer.model = "gpt-4"
+        
+        first = analyzer.analyze_conversation(THREAD, caller="batch:weekly")
+        # A different conversation, so the near-duplicate index cannot serve it
+        second = analyzer.analyze_conversation("Priya: Move the compliance review to Monday.\nOmar: Agreed.",
+                                               caller="batch:weekly")
+        assert [call["model"] for call in client.calls] == ["gpt-4", "gpt-4o-mini"]
+        assert first.metadata.cost_usd == pytest.approx((176 * 30 + 1024 * 30 + 300 * 60) / 1e6)
+        assert second.metadata.cost_usd < first.metadata.cost_usd / 10
+        
+        by_caller = ledger.summary(group_by="caller")
+        assert by_caller[0]["caller"] == "batch:weekly" and by_caller[0]["calls"] == 2
+        assert by_caller[0]["cached_tokens"] == 2048
+        
+        strict = DecisionAnalyzer(client=client, admission=AdmissionController(ledger, caller_budgets={"*": 0.01}))
+        # Refused calls surface as budget errors, never as a placeholder analysis
+        for raise_errors in (True, False):
+            with pytest.raises(BudgetExceededError, match="Budget exhausted"):
+                strict.analyze_conversation(THREAD + "\nP.P.S.", raise_errors=raise_errors, caller="cli")
+        assert len(client.calls) == 2
+    
+    def test_interactive_reserve_and_queueing(self, tmp_path):
+        """Test batch callers cannot use the reserved share and waiting calls run once budget frees"""
+        ledger = UsageLedger(str(tmp_path / "usage.db"), prices={"m": (1e6, 1e6, 1e6)})
+        admission = AdmissionController(ledger, global_budget=4.0, interactive_reserve=0.5)
+        ticket, _ = admission.admit("batch:a", "m", 2, 0)
+        with pytest.raises(BudgetExceededError):
+            admission.admit("batch:b", "m", 1, 0)
+        admission.release(ticket, "batch:a", "m", None)
+        
+        # A reviewer still gets budget; a second reviewer waits for the first to finish
+        held, _ = admission.admit("ui:alice", "m", 4, 0)
+        admission.max_wait_seconds, admission.poll_seconds = 2.0, 0.05
+        threading.Timer(0.1, admission.release, (held, "ui:alice", "m", None)).start()
+        started = time.time()
+        admission.admit("ui:bob", "m", 3, 0)
+        assert 0.05 < time.time() - started < 2.0
+    
+    def test_hedges_are_admitted_and_billed(self, tmp_path):
+        """Test hedges reserve their own budget, abandoned attempts are billed, and unaffordable hedges are skipped"""
+        ledger = UsageLedger(str(tmp_path / "usage.db"), prices={"m": (0.0, 0.0, 1e6)})
+        
+        def analyzer_for(budget, delays):
+            client = FakeClient()
+            delays = iter(delays)
+            
+            def create(**kwargs):
+                time.sleep(next(delays))
+                return client.create(**kwargs)
+            
+            client.chat.completions.create = create
+            analyzer = DecisionAnalyzer(client=client, hedger=HedgedCaller(deadline_seconds=5, initial_hedge_delay=0.1),
+                                        admission=AdmissionController(ledger, caller_budgets={"*": budget}))
+            analyzer.model = "m"
+            return analyzer, client
+        
+        # Each attempt reserves 800 estimated completion tokens ($800) and uses 300 ($300)
+        analyzer, client = analyzer_for(10000.0, [0.4, 0.0])
+        assert analyzer.analyze_conversation(THREAD, raise_errors=True, caller="cli").metadata.hedged
+        time.sleep(0.6)
+        assert len(client.calls) == 2 and ledger.summary()[0]["calls"] == 2
+        assert ledger.spent(0) == pytest.approx(600.0)
+        
+        analyzer, client = analyzer_for(1000.0, [0.3, 0.0])
+        result = analyzer.analyze_conversation(THREAD + "\nP.S.", raise_errors=True, caller="ui:alice")
+        assert not result.metadata.hedged and len(client.calls) == 1
+        assert ledger.spent(0, caller="ui:alice") == pytest.approx(300.0)
+
+
+class TestAnalysisArchive:
+    """Test the segmented binary analysis archive"""
+    
+    def test_lookup_scan_and_compaction(self, tmp_path):
+        """Test keyed and time-range access across segments, and compaction to the latest records"""
+        analysis = DecisionAnalyzer()._get_demo_analysis(THREAD)
+        archive = AnalysisArchive(str(tmp_path), segment_bytes=4096)
+        for i in range(60):
+            archive.append(f"thread {i % 40}", analysis, source=f"run{i}", ts=1000.0 + i)
+        
+        assert len(list(tmp_path.glob("*.seg"))) > 1
+        assert archive.get("thread 5").source == "run45"
+        assert archive.get("thread 5").analysis == analysis
+        assert [r.source for r in archive.history("thread 5")] == ["run5", "run45"]
+        assert archive.get("never archived") is None
+        assert [r.source for r in archive.scan(since=1057.0)] == ["run57", "run58", "run59"]
+        assert sum(1 for _ in archive.scan(raw=True)) == 60
+        
+        # Threads 0-19 were re-archived; threads 20-29 were last archived before the cutoff
+        stats = archive.compact(before=1030.0)
+        assert (stats["kept"], stats["removed"]) == (30, 30) and stats["reclaimed_bytes"] > 0
+        assert archive.get("thread 5").source == "run45" and archive.get("thread 35").source == "run35"
+        assert archive.get("thread 25") is None
+        assert len(AnalysisArchive(str(tmp_path))) == 30
+    
+    def test_unindexed_and_torn_records_recovered_on_open(self, tmp_path):
+        """Test a record written without its index entry is re-indexed and a torn tail is dropped"""
+        analysis = DecisionAnalyzer()._get_demo_analysis(THREAD)
+        archive = AnalysisArchive(str(tmp_path))
+        archive.append("first", analysis)
+        archive.append("second", analysis)
+        archive.close()
+        index, segment = tmp_path / "00000001.idx", tmp_path / "00000001.seg"
+        index.write_bytes(index.read_bytes()[:-20])
+        segment.write_bytes(segment.read_bytes() + b"\x10\x00\x00")
+        
+        reopened = AnalysisArchive(str(tmp_path))
+        assert len(reopened) == 2
+        assert reopened.get("second").analysis == analysis
+        reopened.append("third", analysis)
+        assert [r.key for r in reopened.scan()] == [r.key for r in reopened.scan(since=0.0)]
+        assert len(list(reopened.scan())) == 3
+
+
+class TestRedaction:
+    """Test PII redaction before prompts are sent"""
+    
+    def test_prompt_redacted_and_result_restored(self):
+        """Test no PII reaches the model and placeholders in its output are restored"""
+        conversation = THREAD + "\nMike Rodriguez: wire it from account 0042 1234 5678 9012, call 416-555-0199"
+        payload = dict(SAMPLE_RESPONSE, decisions=[dict(SAMPLE_RESPONSE["decisions"][0], owner="[PERSON_1]")],
+                       open_questions=["Can PERSON_2 confirm [ACCOUNT_1] is the right account?"])
+        client = FakeClient(payload=payload)
+        result = DecisionAnalyzer(client=client, redactor=Redactor()).analyze_conversation(conversation)
+        
+        prompt = json.dumps(client.calls[0]["messages"])
+        for value in ("Sarah Chen", "s.chen@example.com", "Mike", "0042 1234 5678 9012", "416-555-0199"):
+            assert value not in prompt
+        assert "From: [PERSON_1] <[EMAIL_1]>" in prompt
+        assert result.decisions[0].owner == "Sarah Chen"
+        assert result.open_questions == ["Can Mike Rodriguez confirm 0042 1234 5678 9012 is the right account?"]
+        assert result.metadata.redacted_items == 5
+    
+    def test_placeholders_stable_and_references_quote_original(self):
+        """Test placeholders are deterministic, known customers are redacted and v4 quotes the original lines"""
+        redactor = Redactor(identifiers=["Acme Holdings", "CUST-0042"])
+        text = "Priya: Acme Holdings (CUST-0042) wants $5K limits.\nOmar: Priya, email priya@bank.example first."
+        first = redactor.redact(text)
+        assert first.text == "[PERSON_1]: [CUSTOMER_1] ([CUSTOMER_2]) wants $5K limits.\n" \
+                             "[PERSON_2]: [PERSON_1], email [EMAIL_1] first."
+        assert [r.text for r in redactor.redact_many([text, (text, ["Omar"])], processes=2)] == [first.text] * 2
+        
+        wire = to_wire(SAMPLE_RESPONSE)
+        del wire["d"][0]["eq"]
+        wire["d"][0]["er"] = ["L2"]
+        client = FakeClient(payload=wire)
+        analyzer = DecisionAnalyzer(client=client, prompt_version="v4", redactor=redactor)
+        result = analyzer.analyze_conversation(text, raise_errors=True)
+        assert "L2| [PERSON_2]: [PERSON_1], email [EMAIL_1] first." in client.calls[0]["messages"][-1]["content"]
+        assert result.decisions[0].evidence_quotes == ["Omar: Priya, email priya@bank.example first."]
+    
+    def test_near_duplicate_context_redacted_with_source_names(self):
+        """Test context from another thread never carries that thread's people into the prompt"""
+        client = FakeClient()
+        index = NearDuplicateIndex()
+        analyzer = DecisionAnalyzer(client=client, derive_high_stakes=False, redactor=Redactor(),
+                                    near_duplicate_index=index)
+        analyzer.analyze_conversation(THREAD)
+        analyzer.analyze_conversation(THREAD.replace("Sarah Chen <s.chen", "Dana Wu <d.wu") + "\nThanks all.")
+        prompt = client.calls[1]["messages"][-1]["content"]
+        assert "Launch BTC only" in prompt
+        assert "Sarah" not in prompt and "Chen" not in prompt
+        
+        # An entry indexed without its names is not sent as context at all
+        client = FakeClient()
+        index = NearDuplicateIndex()
+        index.add("prior", THREAD, DecisionAnalyzer()._get_demo_analysis(THREAD))
+        analyzer = DecisionAnalyzer(client=client, derive_high_stakes=False, redactor=Redactor(),
+                                    near_duplicate_index=index)
+        analyzer.analyze_conversation("FW: " + THREAD + "\n\nSent from my phone")
+        assert "analyzed before" not in client.calls[0]["messages"][-1]["content"]
+    
+    def test_sample_scenarios_redact_people_only(self):
+        """Test the bundled scenarios redact their people but not teams, roles or "Reply:" openers"""
+        path = os.path.join(os.path.dirname(__file__), '..', 'src', 'ai_decision_assistant', 'data',
+                            'sample_scenarios.py')
+        with open(path, 'r', encoding='utf-8') as f:
+            scenarios = [node.value.value for node in ast.parse(f.read()).body
+                         if isinstance(node, ast.Expr) and isinstance(node.value, ast.Constant)]
+        crypto, _, incident = (Redactor().redact(text) for text in scenarios)
+        
+        assert sorted(crypto.originals.values()) == [
+            "Mike Rodriguez", "Sarah", "Sarah Chen", "legal@example.com", "m.rodriguez@example.com",
+            "risk@example.com", "s.chen@example.com"]
+        for kept in ("To: Risk Committee <[EMAIL_", "From: Legal Team <[EMAIL_", "Reply: I'm concerned about the "
+                     "regulatory risk", "Can we get legal sign-off first?"):
+            assert kept in crypto.text
+        assert "From: Head of Product\nReply: Approved" in incident.text
+        assert "From: [PERSON_1]  \nReply: Perfect." in incident.text
+
+
+class TestThreadNormalization:
+    """Test removal of quoted history, signatures and disclaimers before prompting"""
+    
+    REPLY = THREAD + """
+
+--
+Sarah Chen | VP Product
+
+From: Mike Rodriguez <m.rodriguez@example.com>
+Subject: Re: New crypto trading feature - compliance review
+
+Sounds right. I'll brief compliance on the $5K limits tomorrow.
+
+On Tue, Mar 5, 2024 at 9:14 AM Sarah Chen <s.chen@example.com> wrote:
+> We're looking to launch crypto trading for our premium users by Q2. I'm leaning toward a
+> phased rollout - start with BTC/ETH only, $10K daily limits, enhanced monitoring.
+> Legal recommends starting   even smaller - $5K limits and BTC only initially.
+> Agreed. Let's go with BTC only, $5K daily limits, and full rollout pending regulatory
+> clarity. I'll own the implementation timeline.
+>
+> -----Original Message-----
+> From: Legal Team
+> Subject: Limits
+>
+> Keep the first phase to verified accounts only.
+
+This message is confidential and may be privileged. If you are not the intended recipient,
+please notify the sender and delete this email.
+
+Sent from my iPhone"""
+    
+    def test_quoted_copies_removed_and_only_copies_kept(self):
+        """Test repeated quotes and boilerplate go while original lines stay verbatim and in order"""
+        normalized = ThreadNormalizer().normalize(self.REPLY)
+        assert normalized.text == THREAD + """
+
+From: Mike Rodriguez <m.rodriguez@example.com>
+Subject: Re: New crypto trading feature - compliance review
+
+Sounds right. I'll brief compliance on the $5K limits tomorrow.
+
+> -----Original Message-----
+> From: Legal Team
+> Subject: Limits
+>
+> Keep the first phase to verified accounts only."""
+        assert set(normalized.removed) == {"repeated", "signature", "disclaimer", "attribution"}
+        assert normalized.original_tokens == len(self.REPLY) // 4
+        assert normalized.reduction > 0.35
+    
+    def test_analyzer_prompts_with_normalized_thread(self):
+        """Test the prompt carries the normalized thread and metadata reports the tokens saved"""
+        wire = to_wire(SAMPLE_RESPONSE)
+        del wire["d"][0]["eq"]
+        wire["d"][0]["er"] = ["L10", "L13-L15"]
+        client = FakeClient(payload=wire)
+        analyzer = DecisionAnalyzer(client=client, prompt_version="v4", normalizer=ThreadNormalizer())
+        result = analyzer.analyze_conversation(self.REPLY, raise_errors=True)
+        
+        prompt = client.calls[0]["messages"][-1]["content"]
+        assert "wrote:" not in prompt and "intended recipient" not in prompt and "iPhone" not in prompt
+        # Spans index the thread as given; a range across removed lines is split around them
+        assert result.decisions[0].evidence_quotes == [
+            "From: Mike Rodriguez <m.rodriguez@example.com>",
+            "Sounds right. I'll brief compliance on the $5K limits tomorrow.",
+            "> -----Original Message-----",
+        ]
+        spans = result.decisions[0].evidence_spans
+        assert [span.ref for span in spans] == ["L10", "L13-L15", "L13-L15"]
+        assert all(self.REPLY[span.start:span.end] == span.text for span in spans)
+        saved = result.metadata.normalized_tokens_saved
+        assert saved > 0 and result.metadata.normalized_tokens + saved == len(self.REPLY) // 4
+
+
+class TestWatchMode:
+    """Test re-analysis of changed conversation files and decision change events"""
+    
+    def test_session_reports_decision_changes(self, tmp_path):
+        """Test new, confirmed and withdrawn events, skipped no-op writes and resuming from stored analyses"""
+        threads, out = tmp_path / "threads", tmp_path / "out"
+        threads.mkdir()
+        path = threads / "launch.txt"
+        path.write_text(THREAD, encoding="utf-8")
+        launch = SAMPLE_RESPONSE["decisions"][0]
+        client = FakeClient(payload=dict(SAMPLE_RESPONSE, decisions=[dict(launch, status="proposed")]))
+        session = WatchSession(DecisionAnalyzer(client=client), str(threads), str(out))
+        
+        assert [(e["event"], e["status"], e["file"]) for e in session.start()] == [("new", "proposed", "launch.txt")]
+        assert session.process(str(path)) == [] and len(client.calls) == 1
+        
+        path.write_text(THREAD + "\nMike: Confirmed, and let's hire two contractors for the backlog.", encoding="utf-8")
+        client.payload = dict(SAMPLE_RESPONSE, decisions=[launch, dict(
+            launch, decision="Hire two contractors for the compliance backlog", status="proposed",
+            evidence_quotes=["let's hire two contractors for the backlog"])])
+        events = session.process(str(path))
+        assert [(e["event"], e.get("previous_status")) for e in events] == [("new", None), ("confirmed", "proposed")]
+        assert "Hire two contractors" in (out / "launch.txt.md").read_text(encoding="utf-8")
+        
+        # A restarted session resumes from the stored analyses without calling the model
+        restarted = WatchSession(DecisionAnalyzer(client=client), str(threads), str(out))
+        assert restarted.start() == [] and len(client.calls) == 2
+        path.unlink()
+        assert [e["event"] for e in restarted.process(str(path))] == ["withdrawn", "withdrawn"]
+    
+    def test_failed_analysis_keeps_previous_state(self, tmp_path):
+        """Test a failed re-analysis reports one error, keeps outputs and is retried on the next pass"""
+        threads, out = tmp_path / "threads", tmp_path / "out"
+        threads.mkdir()
+        path = threads / "launch.txt"
+        path.write_text(THREAD, encoding="utf-8")
+        client = FakeClient()
+        session = WatchSession(DecisionAnalyzer(client=client), str(threads), str(out))
+        assert [e["event"] for e in session.start()] == ["new"]
+        stored = (out / "launch.txt.json").read_text(encoding="utf-8")
+        
+        path.write_text(THREAD + "\nMike: Confirmed, and let's hire two contractors for the backlog.", encoding="utf-8")
+        client.payload = "{not json"
+        events = session.process(str(path))
+        assert [(e["event"], e["file"]) for e in events] == [("error", "launch.txt")]
+        assert (out / "launch.txt.json").read_text(encoding="utf-8") == stored
+        
+        # The unchanged file is analyzed again and diffed against the kept analysis, not a placeholder
+        client.payload = SAMPLE_RESPONSE
+        assert session.process(str(path)) == [] and len(client.calls) == 3
+        assert (out / "launch.txt.json").read_text(encoding="utf-8") != stored
+    
+    @pytest.mark.parametrize("use_inotify", [False, None])
+    def test_watcher_debounces_bursts(self, tmp_path, use_inotify):
+        """Test a burst of writes is reported once, after the file has settled"""
+        watcher = DirectoryWatcher(str(tmp_path), debounce_seconds=0.2, poll_seconds=0.05, use_inotify=use_inotify)
+        stop, batches = threading.Event(), []
+        
+        def collect():
+            for batch in watcher.changes(stop):
+                batches.append(batch)
+        
+        collector = threading.Thread(target=collect)
+        collector.start()
+        path = tmp_path / "live.txt"
+        for i in range(5):
+            with open(path, "a", encoding="utf-8") as f:
+                f.write(f"Message {i}\n")
+            time.sleep(0.06)
+        (tmp_path / ".live.txt.swp").write_text("editor state", encoding="utf-8")
+        time.sleep(0.6)
+        stop.set()
+        collector.join()
+        watcher.close()
+        assert batches == [[str(path)]]
+
+
+class TestSelfConsistency:
+    """Test confidence derived from agreement across concurrent samples"""
+    
+    def test_unanimous_samples_stop_early(self):
+        """Test sampling stops once agreement is decisive and the remaining samples are cancelled"""
+        client = FakeClient(delay=0.05)
+        sampler = SelfConsistencySampler(samples=5, min_samples=3, max_workers=1)
+        analysis = DecisionAnalyzer(client=client, consistency=sampler).analyze_conversation(THREAD)
+        
+        # The fourth sample may already be running when agreement becomes decisive; the fifth never starts
+        assert len(client.calls) <= 4
+        assert all(call["temperature"] == 0.7 for call in client.calls)
+        assert analysis.decisions[0].confidence == 1.0
+        assert analysis.metadata.consistency_samples == 3
+        assert analysis.metadata.consistency_cancelled == 2
+        assert analysis.metadata.prompt_tokens == 3600
+    
+    def test_unsupported_decision_gets_low_confidence(self):
+        """Test a decision found by one sample only falls below the approval gate floor"""
+        extra = dict(SAMPLE_RESPONSE, decisions=SAMPLE_RESPONSE["decisions"] + [{
+            "decision": "Hire two contractors for the compliance backlog", "status": "proposed",
+            "evidence_quotes": ["maybe we hire contractors"], "owner": "unknown", "deadline": "unknown",
+            "confidence": 0.95,
+        }])
+        reworded = dict(SAMPLE_RESPONSE, decisions=[dict(SAMPLE_RESPONSE["decisions"][0],
+                                                         decision="Launch with BTC only and $5K daily limits")])
+        payloads = iter([extra, reworded, SAMPLE_RESPONSE, reworded])
+        client = FakeClient()
+        client.create = lambda **kwargs: FakeClient(next(payloads)).create(**kwargs)
+        client.chat.completions.create = client.create
+        sampler = SelfConsistencySampler(samples=4, min_samples=3, max_workers=1)
+        analysis = DecisionAnalyzer(client=client, consistency=sampler).analyze_conversation(THREAD)
+        
+        assert [d.confidence for d in analysis.decisions] == [1.0, 0.25]
+        assert analysis.metadata.consistency_samples == 4
+        report = ApprovalPolicy().check(analysis, {0: {"approved": True}, 1: {"approved": True}}, confirmed=True)
+        assert [v.rule for v in report.violations if v.rule == "confidence_floor"] == ["confidence_floor"]
+        assert "confidence_floor" in [v.rule for v in report.for_decision("", 1)]
+
+
+class TestHedging:
+    """Test per-call deadlines and hedged requests"""
+    
+    def test_slow_primary_is_hedged_to_fallback_model(self):
+        """A straggling call is duplicated and the faster hedge wins"""
+        client = FakeClient()
+        delays = iter([2.0, 0.0])
+        
+        def create(**kwargs):
+            time.sleep(next(delays))
+            return client.create(**kwargs)
+        
+        client.chat.completions.create = create
+        hedger = HedgedCaller(deadline_seconds=5, initial_hedge_delay=0.1, fallback_model="gpt-4o-mini")
+        analyzer = DecisionAnalyzer(client=client, hedger=hedger)
+        
+        started = time.perf_counter()
+        result = analyzer.analyze_conversation(THREAD, raise_errors=True)
+        assert time.perf_counter() - started < 1.5
+        assert result.metadata.hedged
+        assert [call["model"] for call in client.calls] == ["gpt-4o-mini"]
+        assert all(call["timeout"] <= 5 for call in client.calls)
+    
+    def test_deadline_is_enforced(self):
+        """Calls that never answer in time fail fast instead of hanging"""
+        analyzer = DecisionAnalyzer(client=FakeClient(delay=2.0),
+                                    hedger=HedgedCaller(deadline_seconds=0.3, initial_hedge_delay=0.1))
+        started = time.perf_counter()
+        result = analyzer.analyze_conversation(THREAD)
+        assert time.perf_counter() - started < 1.0
+        assert "deadline" in result.open_questions[0]
+
+
+class TestCassette:
+    """Test record/replay of model calls"""
+    
+    def test_replay_reproduces_recorded_analysis(self, tmp_path):
+        """A recorded run replays through the full pipeline without the real client"""
+        path = str(tmp_path / "run.jsonl.gz")
+        recorded = DecisionAnalyzer(client=CassetteClient(path, "record", client=FakeClient()))
+        original = recorded.analyze_conversation(THREAD, raise_errors=True)
+        
+        replayer = CassetteClient(path, "replay")
+        assert len(replayer) == 1
+        replayed = DecisionAnalyzer(client=replayer).analyze_conversation(THREAD, raise_errors=True)
+        assert replayed.model_dump(exclude={"metadata"}) == original.model_dump(exclude={"metadata"})
+        assert replayed.metadata.prompt_tokens == 1200
+        
+        with pytest.raises(CassetteMiss):
+            replayer.chat.completions.create(model="gpt-4", messages=[{"role": "user", "content": "unrecorded"}])
+    
+    def test_record_without_client_is_an_error(self, tmp_path):
+        """Recording without an API key fails instead of silently producing demo output"""
+        path = str(tmp_path / "run.jsonl.gz")
+        with patch.object(Config, "OPENAI_API_KEY", None), patch.object(Config, "LLM_CASSETTE", path), \
+                patch.object(Config, "LLM_CASSETTE_MODE", "record"):
+            with pytest.raises(ConfigurationError):
+                DecisionAnalyzer()
+        assert not os.path.exists(path)
+    
+    def test_replay_can_reproduce_latency(self, tmp_path):
+        """Recorded latencies are served only when asked for"""
+        path = str(tmp_path / "slow.jsonl.gz")
+        request = {"model": "gpt-4", "messages": [{"role": "user", "content": "hi"}]}
+        CassetteClient(path, "record", client=FakeClient(delay=0.2)).chat.completions.create(**request)
+        
+        started = time.perf_counter()
+        CassetteClient(path, "replay").chat.completions.create(timeout=5, **request)
+        assert time.perf_counter() - started < 0.1
+        started = time.perf_counter()
+        CassetteClient(path, "replay", replay_latency=True).chat.completions.create(**request)
+        assert time.perf_counter() - started >= 0.2
+
+
+class TestJsonRepair:
+    """Test tolerant parsing of malformed model output"""
+    
+    def test_repairs_common_defects(self):
+        """Fences, trailing commas, raw newlines and stray quotes are fixed"""
+        text = '```json\n{"a": "He said "ship it", then left", "b": [1, 2,],\n "c": "two\nlines",}\n```'
+        assert json.loads(repair_json(text)) == {"a": 'He said "ship it", then left', "b": [1, 2], "c": "two\nlines"}
+    
+    def test_truncated_output_keeps_valid_items(self):
+        """Output cut off mid-item keeps everything before it and reports the rest"""
+        payload = dict(SAMPLE_RESPONSE)
+        payload["decisions"] = SAMPLE_RESPONSE["decisions"] + [
+            dict(SAMPLE_RESPONSE["decisions"][0], confidence=1.7),
+            dict(SAMPLE_RESPONSE["decisions"][0], decision="Cut off"),
+        ]
+        payload.pop("why_human")
+        content = json.dumps(payload)
+        content = content[:content.index('"Cut off"') + 20]
+        
+        result = DecisionAnalyzer(client=FakeClient(payload=content)).analyze_conversation(THREAD, raise_errors=True)
+        assert len(result.decisions) == len(SAMPLE_RESPONSE["decisions"])
+        assert result.metadata.repaired
+        dropped = {(item.field, item.index) for item in result.metadata.dropped_items}
+        assert ("decisions", 1) in dropped and ("decisions", 2) in dropped
+        assert ("why_human", None) in dropped
+
+
+class TestFieldRepair:
+    """Test targeted re-asks for invalid items"""
+    
+    def test_invalid_items_are_reasked_and_spliced_back(self):
+        """Only the invalid fragments are sent back, and fixes land in their original slots"""
+        good = SAMPLE_RESPONSE["decisions"][0]
+        payload = dict(SAMPLE_RESPONSE, decisions=[good, dict(good, decision="Add ETH", confidence=1.7), good])
+        payload.pop("why_human")
+        client = FakeClient(payload=payload, usage={"prompt_tokens": 180, "completion_tokens": 40})
+        repairs = {"repairs": [
+            {"id": 0, "value": dict(good, decision="Add ETH", confidence=0.7)},
+            {"id": 1, "value": "Regulatory exposure needs an accountable owner"},
+        ]}
+        contents = iter([json.dumps(payload), json.dumps(repairs)])
+        original_create = client.create
+        
+        def create(**kwargs):
+            client.payload = next(contents)
+            return original_create(**kwargs)
+        
+        client.chat.completions.create = create
+        result = DecisionAnalyzer(client=client).analyze_conversation(THREAD, raise_errors=True)
+        
+        assert [d.decision for d in result.decisions][1] == "Add ETH"
+        assert result.decisions[1].confidence == 0.7
+        assert result.why_human == "Regulatory exposure needs an accountable owner"
+        assert result.metadata.repaired_items == ["decisions[1]", "why_human"]
+        assert result.metadata.dropped_items == []
+        assert result.metadata.repair_prompt_tokens == 180
+        
+        repair_prompt = client.calls[1]["messages"][1]["content"]
+        assert THREAD not in repair_prompt and "less than or equal to 1" in repair_prompt
+
+
 class TestHelpers:
     """Test utility helper functions"""
     
@@ -111,6 +1401,32 @@ class TestHelpers:
         assert clean_text("   ") == ""
 
 
+class TestProfiling:
+    """Test the stage-aware profiler used by cli.py --profile"""
+    
+    def test_stages_are_recorded_and_written(self, tmp_path):
+        """Test per-stage timings and output files"""
+        analyzer = DecisionAnalyzer()
+        with StageProfiler(str(tmp_path)) as profiler:
+            result = analyzer._get_demo_analysis("Test", False)
+            analyzer.generate_decision_log(result, {})
+        
+        assert "log_render" in profiler.wall_times
+        assert any(row["function"].endswith("(_render_decision_log)")
+                   for row in profiler.hot_functions("log_render"))
+        
+        paths = profiler.write()
+        assert paths["pstats"].exists()
+        assert paths["collapsed"].exists()
+        assert "[log_render]" in paths["summary"].read_text(encoding="utf-8")
+    
+    def test_stage_is_noop_without_profiler(self):
+        """Test stage markers do nothing when profiling is off"""
+        with stage("parse"):
+            value = 1
+        assert value == 1
+
+
 class TestIntegration:
     """Integration tests"""
     